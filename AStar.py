@@ -1,135 +1,501 @@
 import heapq
 import math
+import time
+from array import array
+
+from core import SearchGrid, bidirectionalSearch, pathCost, searchStats, traceLevel
+from costToGo import gridKey
+from landmarks import LandmarkIndex
+from queues import QUEUES, makeQueue
 
 # PSEUDO CODE REFERENCE: https://www.geeksforgeeks.org/dsa/a-search-algorithm/
+# epsilon > 1 gives weighted A* (f = g + epsilon * h): usually far fewer expansions, and the path costs at most
+# epsilon times the optimum. landmarks switches the heuristic to ALT (see landmarks.py): a landmark count builds a
+# LandmarkIndex on first use and keeps it until the grid contents change, or pass a prebuilt LandmarkIndex to share one
+# between planners. Each query evaluates the landmark bound only for the cells it pushes (LandmarkIndex.estimator),
+# caching it per cell, so a short query on a large map does not pay for the whole grid
 class AStarGraph:
-    def __init__(self, motion):
+    def __init__(self, motion, instrument = False, queue = "heap", epsilon = 1.0, landmarks = None):
+        if queue not in QUEUES:
+            raise ValueError(f"queue must be one of {list(QUEUES)}")
+        if epsilon < 1:
+            raise ValueError("epsilon must be at least 1")
         self.motion = motion
+        self.queue = queue                          # Open-set backend: "heap", "bucket" or "indexed" (see queues.py)
+        self.epsilon = epsilon
+        self.diagonal = (1,1) in motion
+        self.instrument = instrument                # Fill self.stats with per-run counters (see core.searchStats)
+        self.stats = {}
+        self.landmarks = landmarks                  # None, a landmark count, or a LandmarkIndex
+        self.index = landmarks if isinstance(landmarks, LandmarkIndex) else None
+        self.indexKey = None
 
     def heuristic(self, a, b):                      # Heuristic function (Euclidean or Manhattan)
-        diagonal = (1,1) in self.motion             # Check if diagonal movement is allowed
         dy = abs(a[0] - b[0])
         dx = abs(a[1] - b[1])
-        if diagonal:
+        if self.diagonal:                           # Diagonal movement allowed (checked once, in __init__)
             return math.hypot(dy, dx)               # Euclidean distance for 8 movements
         else:
             return dy + dx                          # Manhattan distace for 4 movements
 
-    def traversal(self, grid, start, goal):
-  
-        open_heap = []                              # Min-heap priority queue for open set
-        heapq.heappush(open_heap, (self.heuristic(start, goal), 0, start))
+    def landmarkIndex(self, grid):
+        key = gridKey(grid)
+        if isinstance(self.landmarks, LandmarkIndex):
+            if not self.landmarks.matches(grid, self.motion, key):
+                raise ValueError("landmarks were built for a different grid or motion model")
+        elif key != self.indexKey:
+            self.index = LandmarkIndex(grid, self.motion, self.landmarks)
+            self.indexKey = key
+        return self.index
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        cellMoves = sg.moves()                      # (offset, step cost) per cell: move length * the cell's multiplier
+        weighted = sg.weighted                      # Binary grids: cellMoves is just the neighbour list
+        stride = sg.stride
+        source, target = sg.index(start), sg.index(goal)
+        goalY, goalX = divmod(target, stride)       # Goal in padded coordinates for the inlined heuristic
+        diagonal = self.diagonal
+        scale = sg.minWeight * self.epsilon         # Distance times the cheapest multiplier never overestimates (before epsilon)
+        level = traceLevel(trace)
+        counting = level or self.instrument         # Frontier peak (and tree unique cells) only tracked when someone reads them
+
+        estimate = None                             # ALT: landmark bound per padded cell, before epsilon
+        if self.landmarks is not None:
+            estimate = self.landmarkIndex(grid).estimator(target)
+        epsilon = self.epsilon
+        hCache = {}                                 # ALT bounds already computed this query, times epsilon
+
+        open_heap, push, pop = makeQueue(self.queue, sg, self.epsilon)     # Priority queue for open set (heapq by default)
+        push(open_heap, (self.heuristic(start, goal) * scale if estimate is None else estimate(source) * epsilon, 0, source))
+
+        came_from = sg.parents()                    # For path reconstruction
+        gScore = sg.gScores()                       # Cost from start to node (flat array indexed by cell)
+        gScore[source] = 0
 
-        came_from = {}                              # For path reconstruction
-        gScore = {start: 0}                         # Cost from start to node (dict for faster indexing)
-        
         # Track closed set to avoid re-processing nodes
-        closed = set()
-        visitedList = []
+        closed = sg.flags()
+        visitedOrder = array('i')                   # Expansion order, only filled for a full trace
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
+        pruned = 0                                  # Relaxations rejected as no cheaper than the known gScore
 
         if start == goal:                           # Immediate check for start equals goal
-            return [start], closed, visitedList
+            if self.instrument:
+                self.stats = searchStats(0, (0, 0, 0), stale_pops = 0, pruned = 0)
+            return sg.result(trace, [start], closed, visitedOrder, 0)
 
+        path = None
         while open_heap:
-            f, g, current = heapq.heappop(open_heap)
+            if counting and len(open_heap) > peak:
+                peak = len(open_heap)
+            f, g, current = pop(open_heap)
+            pops += 1
 
             # If we have already processed this node, skip it
-            if current in closed:
+            if closed[current]:
                 continue
-            
-            closed.add(current)
-            visitedList.append(current)
-
-            if current == goal:                     # Reconstruct path back to start (for visualisation) if goal reached
-                path = [current]
-                while path[-1] in came_from:
-                    path.append(came_from[path[-1]])
-                path.reverse()
-                return path, closed, visitedList    # Exit if goal reached
-
-            y, x = current                          # Explore neighbours
-            for dy, dx in self.motion:
-                ny, nx = y + dy, x + dx             # Check bounds
-                if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1]:
-                    if grid[ny, nx] != 0:           # Obstacle check
-                        continue
 
-                    neighbour = (ny, nx)
-                    step_cost = math.hypot(dy, dx)  # Cost to move to neighbour
-                    neighbourG = g + step_cost      # Total cost to move from start to neighbour
+            closed[current] = 1
+            expansions += 1
+            if level == 2:
+                visitedOrder.append(current)
 
-                    if neighbour in gScore and neighbourG >= gScore[neighbour]:
-                        continue                    # Ignore if not a better path than what we already found
+            if current == target:                   # Reconstruct path back to start (for visualisation) if goal reached
+                path = sg.path(came_from, current)
+                break                               # Exit if goal reached
 
-                    came_from[neighbour] = current  # Record best path to neighbour
-                    gScore[neighbour] = neighbourG
-                    f_score = neighbourG + self.heuristic(neighbour, goal) # Estimated total cost (from start to goal through neighbour)
-                    heapq.heappush(open_heap, (f_score, neighbourG, neighbour))
+            for offset, step_cost in (cellMoves[current] if weighted else cellMoves):    # Explore neighbours
+                neighbour = current + offset
+                if blocked[neighbour]:              # Obstacle check (padding covers the bounds)
+                    continue
+
+                neighbourG = g + step_cost          # Total cost to move from start to neighbour
+
+                if neighbourG >= gScore[neighbour]:
+                    pruned += 1
+                    continue                        # Ignore if not a better path than what we already found
+
+                came_from[neighbour] = current      # Record best path to neighbour
+                gScore[neighbour] = neighbourG
+                if estimate is None:
+                    ny, nx = divmod(neighbour, stride)
+                    dy, dx = abs(ny - goalY), abs(nx - goalX)
+                    h = (math.hypot(dy, dx) if diagonal else dy + dx) * scale
+                else:
+                    h = hCache.get(neighbour)
+                    if h is None:
+                        h = hCache[neighbour] = estimate(neighbour) * epsilon
+                push(open_heap, (neighbourG + h, neighbourG, neighbour))    # Estimated total cost (from start to goal through neighbour)
+
+        if self.instrument:                         # Every pop that did not expand was a stale entry for a closed cell
+            self.stats = searchStats(expansions, (pops, len(open_heap), peak), stale_pops = pops - expansions, pruned = pruned)
+        return sg.result(trace, path, closed, visitedOrder, expansions, (pops, len(open_heap), peak))
 
-        return None, closed, visitedList
-    
 class AStarTree:
-    def __init__(self, motion):
+    def __init__(self, motion, instrument = False):
         self.motion = motion
+        self.diagonal = (1,1) in motion
+        self.instrument = instrument
+        self.stats = {}
 
     def heuristic(self, a, b):                      # Heuristic function (Euclidean or Manhattan)
-        diagonal = (1,1) in self.motion             # Check if diagonal movement is allowed
         dy = abs(a[0] - b[0])
         dx = abs(a[1] - b[1])
-        if diagonal:
+        if self.diagonal:                           # Diagonal movement allowed (checked once, in __init__)
             return math.hypot(dy, dx)               # Euclidean distance for 8 movements
         else:
             return dy + dx                          # Manhattan distace for 4 movements
 
-    def traversal(self, grid, start, goal):
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        cellMoves = sg.moves()
+        weighted = sg.weighted
+        stride = sg.stride
+        source, target = sg.index(start), sg.index(goal)
+        goalY, goalX = divmod(target, stride)
+        diagonal = (1,1) in self.motion
+        scale = sg.minWeight
+        level = traceLevel(trace)
+        counting = level or self.instrument         # Frontier peak (and tree unique cells) only tracked when someone reads them
 
         open_heap = []
-        heapq.heappush(open_heap, (self.heuristic(start, goal), 0, start))
+        heapq.heappush(open_heap, (self.heuristic(start, goal) * scale, 0, source))
 
-        cameFrom = {}
-        gScore = {start: 0}
+        cameFrom = sg.parents()
+        gScore = sg.gScores()
+        gScore[source] = 0
 
         # Tree search
-        visitedUnique = set() 
-        visitedList = []
+        visitedUnique = sg.flags()
+        visitedOrder = array('i')
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
+        pruned = 0                                  # Relaxations rejected as no cheaper than the known gScore
 
         if start == goal:                           # Immediate check for start equals goal
-            return [start], visitedUnique, visitedList
-        
+            if self.instrument:
+                self.stats = searchStats(0, (0, 0, 0), pruned = 0, unique = 0, reexpansions = 0)
+            return sg.result(trace, [start], visitedUnique, visitedOrder, 0)
+
+        path = None
         while open_heap:
+            if counting and len(open_heap) > peak:
+                peak = len(open_heap)
             f, g, current = heapq.heappop(open_heap)
+            pops += 1
 
             # As we don't have a closed set, we always process the node
-            
-            visitedUnique.add(current) 
-            visitedList.append(current)
-
-            if current == goal:                # Reconstruct path for visualisation if goal reached
-                path = [current]
-                while path[-1] in cameFrom:
-                    path.append(cameFrom[path[-1]])
-                path.reverse()
-                return path, visitedUnique, visitedList
-
-            y, x = current                    # Explore neighbours
-            for dy, dx in self.motion:
-                ny, nx = y + dy, x + dx
-
-                if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1]:     # obstacle / boundary check
-                    if grid[ny, nx] != 0:
-                        continue
 
-                    neighbour = (ny, nx)
-                    step_cost = math.hypot(dy, dx)
-                    neighbourG = g + step_cost
+            expansions += 1
+            if counting:                            # Unique cells for a counts trace, plus the order for a full one
+                visitedUnique[current] = 1
+                if level == 2:
+                    visitedOrder.append(current)
 
-                    # Check if the new path is worse (to avoid infinite cycles)
-                    if neighbour in gScore and neighbourG >= gScore[neighbour]:
-                        continue
+            if current == target:              # Reconstruct path for visualisation if goal reached
+                path = sg.path(cameFrom, current)
+                break
+
+            for offset, step_cost in (cellMoves[current] if weighted else cellMoves):    # Explore neighbours
+                neighbour = current + offset
+
+                if blocked[neighbour]:              # obstacle / boundary check
+                    continue
+
+                neighbourG = g + step_cost
+
+                # Check if the new path is worse (to avoid infinite cycles)
+                if neighbourG >= gScore[neighbour]:
+                    pruned += 1
+                    continue
+
+                cameFrom[neighbour] = current   # Record best path to neighbour
+                gScore[neighbour] = neighbourG
+                ny, nx = divmod(neighbour, stride)
+                dy, dx = abs(ny - goalY), abs(nx - goalX)
+                h = (math.hypot(dy, dx) if diagonal else dy + dx) * scale
+                heapq.heappush(open_heap, (neighbourG + h, neighbourG, neighbour))
+
+        if self.instrument:                         # Re-expansions are what a closed set would have saved
+            unique = visitedUnique.count(1)
+            self.stats = searchStats(expansions, (pops, len(open_heap), peak), pruned = pruned, unique = unique,
+                                     reexpansions = expansions - unique)
+        return sg.result(trace, path, visitedUnique, visitedOrder, expansions, (pops, len(open_heap), peak))
+
+
+# Anytime Repairing A* (Likhachev, Gordon & Thrun 2003): weighted A* with epsilon lowered by decrement after each
+# solution, reusing the previous search instead of starting over. Cells improved after being closed wait in INCONS
+# until the next iteration. solutions() yields (path, cost, bound) each time the path or its bound improves, where
+# cost <= bound * optimal; bound is min(epsilon, cost / lower bound), the lower bound being the smallest g + h
+# still open or inconsistent. time_limit (seconds) and max_expansions stop the search early with the best path so far
+class ARAStarGraph:
+    def __init__(self, motion, epsilon = 3.0, decrement = 0.5, time_limit = None, max_expansions = None):
+        if epsilon < 1:
+            raise ValueError("epsilon must be at least 1")
+        self.motion = motion
+        self.epsilon = epsilon
+        self.decrement = decrement
+        self.time_limit = time_limit
+        self.max_expansions = max_expansions
+        self.stats = {}
+
+    def solutions(self, grid, start, goal):
+        return self.search(grid, start, goal, 0)
+
+    def traversal(self, grid, start, goal, trace = None):
+        level = traceLevel(trace)
+        path = None
+        for path, cost, bound in self.search(grid, start, goal, level):
+            pass
+        sg, flags, order, expansions, frontier = self.last
+        return sg.result(trace, path, flags, order, expansions, frontier)
+
+    def search(self, grid, start, goal, level):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        cellMoves = sg.moves()
+        weighted = sg.weighted
+        stride = sg.stride
+        source, target = sg.index(start), sg.index(goal)
+        goalY, goalX = divmod(target, stride)
+        diagonal = (1,1) in self.motion
+        scale = sg.minWeight
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        budget = math.inf if self.max_expansions is None else self.max_expansions
+
+        def h(n):
+            ny, nx = divmod(n, stride)
+            dy, dx = abs(ny - goalY), abs(nx - goalX)
+            return (math.hypot(dy, dx) if diagonal else dy + dx) * scale
+
+        expandedEver = sg.flags()                   # Unique cells over all iterations (traced runs only)
+        visitedOrder = array('i')
+        expansions = pops = peak = 0
+        epsilon = self.epsilon
+        self.stats = {"epsilon": epsilon, "bound": math.inf, "cost": math.inf, "solutions": 0, "iterations": 0, "expansions": 0,
+                      "stale_pops": 0}
+        self.last = (sg, expandedEver, visitedOrder, 0, (0, 0, 0))
+
+        if start == goal:                           # Immediate check for start equals goal
+            self.stats.update(bound = 1.0, cost = 0.0, solutions = 1)
+            yield [start], 0.0, 1.0
+            return
+
+        came_from = sg.parents()
+        gScore = sg.gScores()
+        gScore[source] = 0
+        queued = sg.flags()                         # In OPEN; heap entries for cells not queued, or with an old g, are stale
+        inconsistent = sg.flags()
+        incons = []
+        open_heap = [(epsilon * h(source), 0, source)]
+        queued[source] = 1
+        best = (math.inf, math.inf)                 # (cost, bound) last yielded
+
+        while True:
+            self.stats["iterations"] += 1
+            self.stats["epsilon"] = epsilon
+            closed = sg.flags()
+            exhausted = False
 
-                    cameFrom[neighbour] = current   # Record best path to neighbour
+            # ImprovePath: expand until no open cell has a smaller key than the goal's g
+            while open_heap:
+                if level and len(open_heap) > peak:
+                    peak = len(open_heap)
+                f, g, current = open_heap[0]
+                if not queued[current] or g != gScore[current]:
+                    heapq.heappop(open_heap)
+                    pops += 1
+                    continue
+                if gScore[target] <= f:
+                    break
+                if expansions >= budget or (deadline is not None and not expansions & 255 and time.perf_counter() > deadline):
+                    exhausted = True
+                    break
+                heapq.heappop(open_heap)
+                pops += 1
+                queued[current] = 0
+                closed[current] = 1
+                expansions += 1
+                if level:
+                    expandedEver[current] = 1
+                    if level == 2:
+                        visitedOrder.append(current)
+
+                for offset, step_cost in (cellMoves[current] if weighted else cellMoves):
+                    neighbour = current + offset
+                    if blocked[neighbour]:
+                        continue
+                    neighbourG = g + step_cost
+                    if neighbourG >= gScore[neighbour]:
+                        continue
+                    came_from[neighbour] = current
                     gScore[neighbour] = neighbourG
-                    fScore = neighbourG + self.heuristic(neighbour, goal)
-                    heapq.heappush(open_heap, (fScore, neighbourG, neighbour))
+                    if closed[neighbour]:           # Already expanded this iteration: repaired in the next one
+                        if not inconsistent[neighbour]:
+                            inconsistent[neighbour] = 1
+                            incons.append(neighbour)
+                    else:
+                        queued[neighbour] = 1
+                        heapq.heappush(open_heap, (neighbourG + epsilon * h(neighbour), neighbourG, neighbour))
+
+            self.stats.update(expansions = expansions, stale_pops = pops - expansions)
+            self.last = (sg, expandedEver, visitedOrder, expansions, (pops, len(open_heap), peak))
+            pending = [n for f, g, n in open_heap if queued[n] and g == gScore[n]] + incons
+            if gScore[target] < math.inf:
+                path = sg.path(came_from, target)
+                cost = pathCost(grid, path)         # Parents improved after being linked can make it cheaper than g(goal)
+                lower = min((gScore[n] + h(n) for n in pending), default = cost)
+                bound = cost / lower if lower > 0 else math.inf
+                if not exhausted:
+                    bound = min(bound, epsilon)     # ImprovePath finished: cost <= epsilon * optimal
+                if best[0] < math.inf:
+                    bound = min(bound, best[1] * cost / best[0])    # The previous bound still holds for a cheaper path
+                bound = max(bound, 1.0)
+                if (cost, bound) < best:
+                    best = (cost, bound)
+                    self.stats.update(bound = bound, cost = cost, solutions = self.stats["solutions"] + 1)
+                    yield path, cost, bound
+            if exhausted or not pending or best[1] <= 1:
+                return
+
+            # Next iteration: lower epsilon, move INCONS into OPEN and rebuild the heap with the new keys
+            epsilon = max(1.0, epsilon - self.decrement)
+            for n in incons:
+                inconsistent[n] = 0
+                queued[n] = 1
+            incons = []
+            open_heap = [(gScore[n] + epsilon * h(n), gScore[n], n) for n in pending]
+            heapq.heapify(open_heap)
+
+
+# Searches from both ends at once; see core.bidirectionalSearch for the stopping rule
+class AStarBidirectional:
+    def __init__(self, motion):
+        self.motion = motion
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        stride = sg.stride
+        diagonal = (1,1) in self.motion
+        scale = sg.minWeight                        # Cost maps: the cheapest multiplier keeps it admissible, as in AStarGraph
+
+        def heuristic(a, b):                        # Same Euclidean / Manhattan heuristic on flat indices
+            ay, ax = divmod(a, stride)
+            by, bx = divmod(b, stride)
+            dy, dx = abs(ay - by), abs(ax - bx)
+            return (math.hypot(dy, dx) if diagonal else dy + dx) * scale
+
+        if start == goal:                           # Immediate check for start equals goal
+            return sg.result(trace, [start], sg.flags(), array('i'), 0)
+
+        return bidirectionalSearch(sg, sg.index(start), sg.index(goal), heuristic, trace)
+
+
+# IDA*: repeated depth-first searches bounded by f = g + h, raising the bound to the smallest f that was cut off.
+# Optimal like A* but only the current branch is kept, so memory is O(depth) instead of an open heap.
+# table_size > 0 adds a transposition table of the cheapest g each cell was reached with in the current iteration,
+# capped at table_size entries (once full, known cells are still updated but new ones are not added).
+# Call with trace="off" to keep memory at O(depth): the default visited outputs grow with the number of expansions
+class IDAStarTree:
+    def __init__(self, motion, table_size = 0):
+        self.motion = motion
+        self.table_size = table_size
+        self.stats = {}
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        cellMoves = sg.moves()
+        weighted = sg.weighted
+        moves = len(sg.neighbours)
+        stride = sg.stride
+        level = traceLevel(trace)
+        table_size = self.table_size
+        source, target = sg.index(start), sg.index(goal)
+        goalY, goalX = divmod(target, stride)
+        diagonal = (1,1) in self.motion
+        scale = sg.minWeight
+        epsilon = 1e-9                              # Float slack so sums of sqrt(2) steps don't spawn extra iterations
+
+        visitedOrder = array('i')
+        visited = sg.flags()
+        onBranch = sg.flags()
+        self.stats = {"iterations": 0, "expansions": 0, "peak_depth": 0, "table_entries": 0}
+        expansions = peak = entries = 0
+
+        if start == goal:                           # Immediate check for start equals goal
+            return sg.result(trace, [start], visited, visitedOrder, 0)
+
+        sy, sx = divmod(source, stride)
+        bound = (math.hypot(sy - goalY, sx - goalX) if diagonal else abs(sy - goalY) + abs(sx - goalX)) * scale
+        path = None
+        while path is None and bound < math.inf:
+            self.stats["iterations"] += 1
+            table = {source: 0.0} if table_size else None
+            nextBound = math.inf                    # Smallest f that exceeded the bound this iteration
+
+            # branch[d] is the cell at depth d, gBranch[d] its cost from the start, nextMove[d] the next neighbour to try
+            branch = array('i', [source])
+            gBranch = array('d', [0.0])
+            nextMove = array('b', [0])
+            onBranch[source] = 1
+            expansions += 1
+            if level:
+                visited[source] = 1
+                if level == 2:
+                    visitedOrder.append(source)
+
+            while branch:
+                k = nextMove[-1]
+                if k == moves:                      # All neighbours tried: backtrack
+                    onBranch[branch.pop()] = 0
+                    gBranch.pop()
+                    nextMove.pop()
+                    continue
+                nextMove[-1] = k + 1
+
+                offset, step_cost = (cellMoves[branch[-1]] if weighted else cellMoves)[k]
+                n = branch[-1] + offset
+                if blocked[n] or onBranch[n]:       # Obstacle / padding, or already on this branch (no cycles)
+                    continue
+
+                g = gBranch[-1] + step_cost
+                ny, nx = divmod(n, stride)
+                dy, dx = abs(ny - goalY), abs(nx - goalX)
+                f = g + (math.hypot(dy, dx) if diagonal else dy + dx) * scale
+                if f > bound + epsilon:             # Outside this iteration's contour
+                    if f < nextBound:
+                        nextBound = f
+                    continue
+                if table is not None:
+                    seen = table.get(n)
+                    if seen is not None and seen <= g + epsilon:
+                        continue                    # Already searched from here at least as cheaply
+                    if seen is not None or len(table) < table_size:
+                        table[n] = g
+
+                expansions += 1
+                if level:
+                    visited[n] = 1
+                    if level == 2:
+                        visitedOrder.append(n)
+
+                branch.append(n)
+                if len(branch) > peak:
+                    peak = len(branch)
+                if n == target:                     # g <= bound <= optimal cost, so this path is optimal
+                    path = sg.cells(branch)
+                    break
+                gBranch.append(g)
+                nextMove.append(0)
+                onBranch[n] = 1
+
+            if table is not None and len(table) > entries:
+                entries = len(table)
+            bound = nextBound
 
-        return None, visitedUnique, visitedList
\ No newline at end of file
+        self.stats.update(expansions = expansions, peak_depth = peak - 1 if peak else 0, table_entries = entries)
+        return sg.result(trace, path, visited, visitedOrder, expansions, (expansions, 0, peak))     # Frontier = branch
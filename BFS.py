@@ -1,101 +1,299 @@
 from collections import deque
+from array import array
+
+import numpy as np
+
+from core import SearchGrid, searchStats, traceLevel
 
 
 class BFSGraph:
-    def __init__(self, motion):
+    def __init__(self, motion, instrument = False):
         self.motion = motion
+        self.instrument = instrument                # Fill self.stats with per-run counters (see core.searchStats)
+        self.stats = {}
 
-    def traversal(self, grid, start, goal):
-        
-        # Initialise set for visited nodes, and queue for the seen nodes to be visited
-        visitedList = [] # For visualisation
-        came_from = {}
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        offsets = sg.offsets
+        source, target = sg.index(start), sg.index(goal)
+        level = traceLevel(trace)
+        counting = level or self.instrument         # Frontier peak is only tracked when someone reads it
 
-        visited = set()
-        visited.add(start)
+        # Initialise flags for visited nodes, and queue for the seen nodes to be visited
+        visitedOrder = array('i')   # For visualisation (flat indices), only filled for a full trace
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
+        came_from = sg.parents()
+
+        visited = sg.flags()
+        visited[source] = 1
         queue = deque()
-        queue.append(start)
-        
+        queue.append(source)
+
         # Immediate check for start equals goal
         if start == goal:
-            return [start], visited, visitedList
-        
-        while queue:                    
+            if self.instrument:
+                self.stats = searchStats(0, (0, 0, 0))
+            return sg.result(trace, [start], visited, visitedOrder, 0)
+
+        path = None
+        while queue:
+            if counting and len(queue) > peak:
+                peak = len(queue)
             current = queue.popleft()
-            visitedList.append(current)
+            pops += 1
+            expansions += 1
+            if level == 2:
+                visitedOrder.append(current)
 
-            if current == goal: # If goal is found
+            if current == target: # If goal is found
                 # Reconstruct path backwards from goal to start
-                path = []
-                while current in came_from: 
-                    path.append(current)
-                    current = came_from[current]
-                path.append(start)
-                path.reverse()
-                return path, visited, visitedList
+                path = sg.path(came_from, current)
+                break
 
             # Explore neighbours (4 or 8 depending on motion mode)
-            y, x = current
-            for dy, dx in self.motion:
-                ny, nx = y + dy, x + dx
-                # Check bounds and obstacles
-                if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1]:
-                    if grid[ny, nx] == 0 and (ny, nx) not in visited:
-                        # Mark neighbour as visited and record its parent
-                        visited.add((ny, nx))
-                        came_from[(ny, nx)] = current
-                        queue.append((ny, nx))
+            for offset in offsets:
+                n = current + offset
+                # Padding makes the bounds check unnecessary
+                if not blocked[n] and not visited[n]:
+                    # Mark neighbour as visited and record its parent
+                    visited[n] = 1
+                    came_from[n] = current
+                    queue.append(n)
+
+        if self.instrument:
+            self.stats = searchStats(expansions, (pops, len(queue), peak))
+        return sg.result(trace, path, visited, visitedOrder, expansions, (pops, len(queue), peak))
 
 
 class BFSTree:
-    def __init__(self, motion):
+    def __init__(self, motion, instrument = False):
         self.motion = motion
+        self.instrument = instrument
+        self.stats = {}
 
-    def traversal(self, grid, start, goal):
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        offsets = sg.offsets
+        source, target = sg.index(start), sg.index(goal)
+        level = traceLevel(trace)
+        counting = level or self.instrument         # Peak frontier and unique cells are only tracked when someone reads them
 
-        # In tree search we store the path in the queue because we need to check strictly against the current branch's history, not the global visited set
+        # Tree search keeps one node per queue entry rather than one per cell. Nodes live in a shared table of
+        # (cell, parent node, depth) so each branch is a parent chain instead of its own copied path list
+        nodeCell = array('i', [source])
+        nodeParent = array('i', [-1])
+        nodeDepth = array('i', [0])
         queue = deque()
-        queue.append((start, [start])) 
-        expanded_unique = set()
-        
-        # for visualisation
-        visitedList = []
+        queue.append(0)
+        expanded_unique = sg.flags()
+
+        # for visualisation (unique cells from a counts trace up, expansion order only for a full trace)
+        visitedOrder = array('i')
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
 
         # Store the best depth reached for each node to prevent re-expanding at greater depths
-        best_depth = {start: 0}
+        best_depth = array('i', [2**31 - 1]) * sg.size
+        best_depth[source] = 0
 
         # Immediate check for start equals goal
         if start == goal:
-            return [start], expanded_unique, visitedList
+            if self.instrument:
+                self.stats = searchStats(0, (0, 0, 0), unique = 0, reexpansions = 0)
+            return sg.result(trace, [start], expanded_unique, visitedOrder, 0)
 
+        path = None
         while queue:
-            (y, x), path = queue.popleft()
+            if counting and len(queue) > peak:
+                peak = len(queue)
+            node = queue.popleft()
+            pops += 1
+            current = nodeCell[node]
 
-            current_depth = len(path) - 1
-            
-            expanded_unique.add((y, x))
-            visitedList.append((y, x))
+            expansions += 1
+            if counting:
+                expanded_unique[current] = 1
+                if level == 2:
+                    visitedOrder.append(current)
 
             # If the goal is found
-            if (y, x) == goal:
-                return path, expanded_unique, visitedList
+            if current == target:
+                path = sg.branch(nodeCell, nodeParent, node)
+                break
+
+            # Calculate depth of the neighbour
+            next_depth = nodeDepth[node] + 1
 
             # Explore neighbours (4 or 8 depending on motion mode)
-            for dy, dx in self.motion:
-                ny, nx = y + dy, x + dx
+            for offset in offsets:
+                n = current + offset
+
+                # Only add neighbour if we have not reached it at a shallower depth before (path pruning).
+                # This is also the on-branch check: a cell on the current branch sits at depth <= current depth,
+                # so best_depth[n] < next_depth already rules it out in O(1)
+                if not blocked[n] and next_depth <= best_depth[n]:
+                    best_depth[n] = next_depth
+                    nodeCell.append(n)
+                    nodeParent.append(node)
+                    nodeDepth.append(next_depth)
+                    queue.append(len(nodeCell) - 1)
+
+        if self.instrument:
+            unique = expanded_unique.count(1)
+            self.stats = searchStats(expansions, (pops, len(queue), peak), unique = unique, reexpansions = expansions - unique)
+        return sg.result(trace, path, expanded_unique, visitedOrder, expansions, (pops, len(queue), peak))
+
+
+# Layer-at-a-time BFS: each wavefront is expanded with NumPy index arrays instead of one cell at a time through a deque.
+# Computes the hop-count distance field from the start (or from the goal) and recovers the path by descending its gradient
+class BFSWavefront:
+    def __init__(self, motion, root = "start"):
+        if root not in ("start", "goal"):
+            raise ValueError("root must be 'start' or 'goal'")
+        self.motion = motion
+        self.root = root
+
+    def wavefront(self, sg, source, target = None):
+        free = np.frombuffer(sg.blocked, dtype=np.uint8) == 0
+        offsets = np.asarray(sg.offsets, dtype=np.int64)
+
+        dist = np.full(sg.size, -1, dtype=np.int32)         # -1 = not reached
+        owner = np.zeros(sg.size, dtype=np.int64)           # Scratch buffer used to drop duplicate candidates without sorting
+        dist[source] = 0
+        frontier = np.array([source], dtype=np.int64)
+        layers = [frontier]
+        depth = 0
+
+        while frontier.size:
+            if target is not None and dist[target] >= 0:    # Stop once the layer holding the target is complete
+                break
+            depth += 1
+            candidates = (frontier[:, None] + offsets[None, :]).ravel()    # Every neighbour of the whole layer at once
+            candidates = candidates[free[candidates]]                      # Padding makes the bounds check unnecessary
+            candidates = candidates[dist[candidates] < 0]
+            slots = np.arange(candidates.size)
+            owner[candidates] = slots                                       # Last write wins, so each cell keeps exactly one slot
+            frontier = candidates[owner[candidates] == slots]
+            dist[frontier] = depth
+            if frontier.size:
+                layers.append(frontier)
+
+        return dist, layers
+
+    def distanceField(self, grid, cell):                    # Hop-count field over the whole grid, -1 where unreachable
+        sg = SearchGrid(grid, self.motion)
+        dist, _ = self.wavefront(sg, sg.index(cell))
+        return dist.reshape(sg.height + 2, sg.stride)[1:-1, 1:-1]
+
+    def descend(self, sg, dist, current):                   # Follow the gradient of the field down to its root
+        path = [current]
+        offsets = sg.offsets
+        while dist[current] > 0:
+            target = dist[current] - 1
+            for offset in offsets:
+                if dist[current + offset] == target:
+                    current += offset
+                    break
+            path.append(current)
+        return path
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        source, target = sg.index(start), sg.index(goal)
+        level = traceLevel(trace)
+
+        if start == goal:                                   # Immediate check for start equals goal
+            reached = sg.flags()
+            reached[source] = 1
+            return sg.result(trace, [start], reached, array('i'), 0)
+
+        if self.root == "start":
+            dist, layers = self.wavefront(sg, source, target)
+            end = target
+        else:
+            dist, layers = self.wavefront(sg, target, source)
+            end = source
+
+        # Layers hold every reached cell exactly once. Flags and order are only materialised for the levels that
+        # report them: building them costs more than the wavefront itself on large open maps
+        expansions = sum(layer.size for layer in layers)
+        peak = max(layer.size for layer in layers)
+        reached = bytearray((dist >= 0).view(np.uint8)) if level else None
+        order = array('i', np.concatenate(layers).astype(np.int32).tobytes()) if level == 2 else None
+
+        path = None
+        if dist[end] >= 0:
+            path = self.descend(sg, dist, end)
+            if self.root == "start":
+                path.reverse()                              # Descent runs goal -> start
+            path = sg.cells(path)
+        return sg.result(trace, path, reached, order, expansions, (expansions, 0, peak))
+
+
+# Grows a BFS tree from each end, one full layer at a time, always on the side with the smaller frontier.
+# After the first layer that touches the other tree the shortest meeting in that layer is optimal
+class BFSBidirectional:
+    def __init__(self, motion):
+        self.motion = motion
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        offsets = sg.offsets
+        source, target = sg.index(start), sg.index(goal)
+        level = traceLevel(trace)
+
+        if start == goal:                   # Immediate check for start equals goal
+            reached = sg.flags()
+            reached[source] = 1
+            return sg.result(trace, [start], reached, array('i'), 0)
+
+        unseen = 2**31 - 1
+        depth = (array('i', [unseen]) * sg.size, array('i', [unseen]) * sg.size)
+        came_from = (sg.parents(), sg.parents())    # Backward parents point towards the goal
+        depth[0][source] = 0
+        depth[1][target] = 0
+        frontiers = ([source], [target])
+        visitedOrder = array('i')           # Expansion order, only filled for a full trace
+        expansions = peak = 0
 
-                if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1]:
-                    if grid[ny, nx] == 0:
+        meet = None
+        while frontiers[0] and frontiers[1] and meet is None:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            expansions += len(frontiers[side])
+            peak = max(peak, len(frontiers[0]) + len(frontiers[1]))
+            own, other = depth[side], depth[1 - side]
+            parents = came_from[side]
+            step = [offset if side == 0 else -offset for offset in offsets]
+            nextDepth = own[frontiers[side][0]] + 1     # Every cell in a layer has the same depth
+            best = unseen
+            layer = []
 
-                        # Calculate depth of the neighbour
-                        next_depth = current_depth + 1
+            if level == 2:
+                visitedOrder.extend(frontiers[side])
+            for current in frontiers[side]:
+                for offset in step:
+                    n = current + offset
+                    if blocked[n]:
+                        continue
+                    if other[n] != unseen and nextDepth + other[n] < best:
+                        best = nextDepth + other[n]                 # Contact with the other tree
+                        meet = (current, n) if side == 0 else (n, current)
+                    if own[n] == unseen:
+                        own[n] = nextDepth
+                        parents[n] = current
+                        layer.append(n)
 
-                        # Check if the neighbour is already in the current path
-                        if (ny, nx) not in path:
-                            # Only add neighbour if we have not reached it at a shallower depth before (path pruning)
-                            if (ny, nx) not in best_depth or next_depth <= best_depth[(ny, nx)]:
-                                best_depth[(ny, nx)] = next_depth
-                                new_path = path + [(ny, nx)]
-                                queue.append(((ny, nx), new_path))
+            frontiers[side][:] = layer
 
-        return None, expanded_unique, visitedList
\ No newline at end of file
+        reached = None                      # Cells reached by either tree, only built for the levels that report them
+        if level:
+            seen = np.frombuffer(depth[0], dtype=np.int32) != unseen
+            seen |= np.frombuffer(depth[1], dtype=np.int32) != unseen
+            reached = bytearray(seen.view(np.uint8))
+        path = sg.joinPath(came_from[0], came_from[1], *meet) if meet is not None else None
+        left = len(frontiers[0]) + len(frontiers[1])
+        return sg.result(trace, path, reached, visitedOrder, expansions, (expansions, left, peak))
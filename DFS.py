@@ -1,98 +1,241 @@
-class DFSGraph:
-    def __init__(self, motion):
-        self.motion = motion
+from array import array
+
+from core import SearchGrid, searchStats, traceLevel
 
-    def traversal(self, grid, start, goal):
 
-        visited = set()
-        visitedList = [] # For visualisation
+class DFSGraph:
+    def __init__(self, motion, instrument = False):
+        self.motion = motion
+        self.instrument = instrument                # Fill self.stats with per-run counters (see core.searchStats)
+        self.stats = {}
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        offsets = sg.offsets
+        source, target = sg.index(start), sg.index(goal)
+        level = traceLevel(trace)
+        counting = level or self.instrument         # Frontier peak is only tracked when someone reads it
+
+        visited = sg.flags()
+        visitedOrder = array('i') # For visualisation (flat indices), only filled for a full trace
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
 
         stack = []
-        stack.append(start)
-        
+        stack.append(source)
+
         # allows for path reconstruction
-        came_from = {}
+        came_from = sg.parents()
 
+        path = None
         while stack:
+            if counting and len(stack) > peak:
+                peak = len(stack)
             current = stack.pop()
+            pops += 1
 
             # Ignore visited nodes
-            if current in visited:
+            if visited[current]:
                 continue
 
-            visited.add(current)
-            visitedList.append(current)
+            visited[current] = 1
+            expansions += 1
+            if level == 2:
+                visitedOrder.append(current)
 
-            if current == goal:
+            if current == target:
                 # Reconstruct path backwards
-                path = []
-                while current in came_from:
-                    path.append(current)
-                    current = came_from[current]
-                path.append(start)
-                path.reverse()
-                return path, visited, visitedList
-
-            y, x = current
-            
+                path = sg.path(came_from, current)
+                break
+
             # Explore neighbours (4 or 8 depending on motion mode)
-            for dy, dx in self.motion:
-                ny, nx = y + dy, x + dx
-                # Check bounds and obstacles
-                if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1]:
-                    if grid[ny, nx] == 0 and (ny, nx) not in visited:
-                        # Add neighbour to stack and record its parent
-                        came_from[(ny, nx)] = current
-                        stack.append((ny, nx))
+            for offset in offsets:
+                n = current + offset
+                # Padding makes the bounds check unnecessary
+                if not blocked[n] and not visited[n]:
+                    # Add neighbour to stack and record its parent
+                    came_from[n] = current
+                    stack.append(n)
 
-        return None, visited, visitedList
+        if self.instrument:                         # Every pop that did not expand found its cell already visited
+            self.stats = searchStats(expansions, (pops, len(stack), peak), stale_pops = pops - expansions)
+        return sg.result(trace, path, visited, visitedOrder, expansions, (pops, len(stack), peak))
 
 
 
 
 class DFSTree:
-    def __init__(self, motion, max_depth = 1000): 
+    def __init__(self, motion, max_depth = 1000, instrument = False):
         self.motion = motion
         self.max_depth = max_depth
+        self.instrument = instrument
+        self.stats = {}
 
-    def traversal(self, grid, start, goal):
-        motion = self.motion
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        offsets = sg.offsets
         max_depth = self.max_depth
+        source, target = sg.index(start), sg.index(goal)
+        level = traceLevel(trace)
+        counting = level or self.instrument         # Peak frontier and unique cells are only tracked when someone reads them
+
+        visitedOrder = array('i')
+        visited = sg.flags()  # unique nodes (visualisation only)
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
+
+        # Nodes live in a shared table of (cell, parent node, depth); the stack only holds node ids
+        nodeCell = array('i', [source])
+        nodeParent = array('i', [-1])
+        nodeDepth = array('i', [1])
 
-        visitedList = []      
-        visited = set()       # unique nodes (visualisation only)
+        # The branch being explored, root first, with a per-cell flag for O(1) "is n on my path" checks.
+        # A popped node's parent is always branch[depth - 2], so unwinding to depth - 1 restores its ancestors
+        branch = array('i')
+        onBranch = sg.flags()
 
         stack = []
-        stack.append((start, [start]))
+        stack.append(0)
 
+        path = None
         while stack:
-            (y, x), path = stack.pop()
-            
+            if counting and len(stack) > peak:
+                peak = len(stack)
+            node = stack.pop()
+            pops += 1
+            current = nodeCell[node]
+
             # Calculate current depth for depth limiting
-            depth = len(path)
+            depth = nodeDepth[node]
+
+            while len(branch) >= depth:
+                onBranch[branch.pop()] = 0
+            branch.append(current)
+            onBranch[current] = 1
 
-            visitedList.append((y, x))
-            visited.add((y, x))
+            expansions += 1
+            if counting:
+                visited[current] = 1
+                if level == 2:
+                    visitedOrder.append(current)
 
-            if (y, x) == goal:
-                return path, visited, visitedList
+            if current == target:
+                path = sg.branch(nodeCell, nodeParent, node)
+                break
 
             # Stop if we hit depth limit
             if depth >= max_depth:
                 continue
-            
-            # explore neighbours (4 or 8 depending on motion mode)
-            for dy, dx in motion:
-                ny, nx = y + dy, x + dx
-
-                # Check bounds and obstacles
-                if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1]:
-                    if grid[ny, nx] == 0:
-                        # Make sure node isnt in current path
-                        if (ny, nx) not in path:
-                            new_path = path + [(ny, nx)]
-                            stack.append(((ny, nx), new_path))
-
-        return None, visited, visitedList
-    
 
+            # explore neighbours (4 or 8 depending on motion mode)
+            for offset in offsets:
+                n = current + offset
+
+                # Padding makes the bounds check unnecessary
+                # Make sure node isnt in current path
+                if not blocked[n] and not onBranch[n]:
+                    nodeCell.append(n)
+                    nodeParent.append(node)
+                    nodeDepth.append(depth + 1)
+                    stack.append(len(nodeCell) - 1)
+
+        if self.instrument:
+            unique = visited.count(1)
+            self.stats = searchStats(expansions, (pops, len(stack), peak), unique = unique, reexpansions = expansions - unique)
+        return sg.result(trace, path, visited, visitedOrder, expansions, (pops, len(stack), peak))
+
+
+# Iterative deepening DFS: depth-limited tree searches with limits 0, 1, 2, ... so the first hit uses the fewest moves.
+# Only the current branch is kept (cells plus the next move to try at each depth), so memory is O(depth).
+# table_size > 0 adds a transposition table of the shallowest depth each cell was reached at in the current iteration,
+# capped at table_size entries (once full, known cells are still updated but new ones are not added).
+# Call with trace="off" to keep memory at O(depth): the default visited outputs grow with the number of expansions
+class IDDFSTree:
+    def __init__(self, motion, max_depth = None, table_size = 0):
+        self.motion = motion
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.stats = {}
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        offsets = sg.offsets
+        moves = len(offsets)
+        level = traceLevel(trace)
+        table_size = self.table_size
+        max_depth = sg.size if self.max_depth is None else self.max_depth
+        source, target = sg.index(start), sg.index(goal)
+
+        visitedOrder = array('i')
+        visited = sg.flags()
+        onBranch = sg.flags()
+        self.stats = {"iterations": 0, "expansions": 0, "peak_depth": 0, "table_entries": 0}
+        expansions = peak = entries = 0
+
+        if start == goal:                           # Immediate check for start equals goal
+            return sg.result(trace, [start], visited, visitedOrder, 0)
+
+        path = None
+        for limit in range(1, max_depth + 1):
+            self.stats["iterations"] = limit
+            table = {source: 0} if table_size else None
+            cutoff = False                          # Did anything stop at the limit? If not, deeper limits are pointless
+
+            # branch[d] is the cell at depth d, nextMove[d] the index of the next offset to try from it
+            branch = array('i', [source])
+            nextMove = array('b', [0])
+            onBranch[source] = 1
+            expansions += 1
+            if level:
+                visited[source] = 1
+                if level == 2:
+                    visitedOrder.append(source)
+
+            while branch:
+                depth = len(branch) - 1
+                current = branch[-1]
+                k = nextMove[-1]
+
+                if depth == limit or k == moves:    # Depth limit or all moves tried: backtrack
+                    if depth == limit:
+                        cutoff = True
+                    onBranch[branch.pop()] = 0
+                    nextMove.pop()
+                    continue
+                nextMove[-1] = k + 1
+
+                n = current + offsets[k]
+                if blocked[n] or onBranch[n]:       # Obstacle / padding, or already on this branch (no cycles)
+                    continue
+                if table is not None:
+                    seen = table.get(n)
+                    if seen is not None and seen <= depth + 1:
+                        continue                    # Already searched from here with at least as much depth left
+                    if seen is not None or len(table) < table_size:
+                        table[n] = depth + 1
+
+                expansions += 1
+                if level:
+                    visited[n] = 1
+                    if level == 2:
+                        visitedOrder.append(n)
+
+                branch.append(n)
+                if depth >= peak:
+                    peak = depth + 1
+                if n == target:
+                    path = sg.cells(branch)
+                    break
+                nextMove.append(0)
+                onBranch[n] = 1
+
+            if table is not None and len(table) > entries:
+                entries = len(table)
+            if path is not None or not cutoff:
+                break
+
+        self.stats.update(expansions = expansions, peak_depth = peak, table_entries = entries)
+        return sg.result(trace, path, visited, visitedOrder, expansions, (expansions, 0, peak + 1))     # Frontier = branch
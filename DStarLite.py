@@ -0,0 +1,176 @@
+import heapq
+import math
+from array import array
+
+import numpy as np
+
+from core import SearchGrid, freeMask, isCostMap, traceLevel
+
+
+# D* Lite (Koenig & Likhachev 2002): searches backwards from the goal and keeps g / rhs values alive between calls,
+# so after update_cells or move_start only the inconsistent part of the search is repaired.
+# Usage: traversal(grid, start, goal) once, then update_cells([...]) / move_start((y, x)) followed by plan()
+# On cost maps a move costs its length times the multiplier of the cell left, as in the other planners; the weights
+# are kept in a mutable array next to blocked so update_cells can change a multiplier as well as block / free a cell
+class DStarLite:
+    def __init__(self, motion):
+        self.motion = motion
+        self.diagonal = (1,1) in motion
+        self.sg = None
+
+    def reset(self, grid, start, goal):
+        self.grid = np.array(grid)                          # Own copy, kept in sync by update_cells
+        sg = SearchGrid(self.grid, self.motion)
+        self.sg = sg
+        self.blocked = bytearray(sg.blocked)                # Mutable, cells can change between calls
+        self.weights = sg.weights()                         # Mutable too: update_cells can change a multiplier
+        self.costMap = isCostMap(self.grid)
+        self.scale = sg.minWeight                           # Heuristic factor, admissible while no multiplier drops below it
+        self.start = sg.index(start)
+        self.goal = sg.index(goal)
+        self.last = self.start
+        self.km = 0                                         # Key modifier, grows as the robot moves
+
+        self.g = sg.gScores()
+        self.rhs = sg.gScores()
+        self.rhs[self.goal] = 0
+        self.open_heap = []
+        self.openKeys = {}                                  # Current key of every queued node (heap entries may be stale)
+        self.push(self.goal, self.key(self.goal))
+
+    def heuristic(self, a, b):                              # Euclidean or Manhattan on flat indices, same as AStarGraph
+        ay, ax = divmod(a, self.sg.stride)
+        by, bx = divmod(b, self.sg.stride)
+        dy, dx = abs(ay - by), abs(ax - bx)
+        return (math.hypot(dy, dx) if self.diagonal else dy + dx) * self.scale
+
+    def key(self, n):
+        best = min(self.g[n], self.rhs[n])
+        return (best + self.heuristic(self.start, n) + self.km, best)
+
+    def push(self, n, key):
+        self.openKeys[n] = key
+        heapq.heappush(self.open_heap, (key[0], key[1], n))
+
+    def topKey(self):                                       # Drop stale heap entries until the top is current
+        open_heap = self.open_heap
+        while open_heap:
+            k1, k2, n = open_heap[0]
+            if self.openKeys.get(n) == (k1, k2):
+                return (k1, k2)
+            heapq.heappop(open_heap)
+        return (math.inf, math.inf)
+
+    def updateVertex(self, n):
+        g, rhs, blocked = self.g, self.rhs, self.blocked
+        if n != self.goal:
+            best = math.inf
+            if not blocked[n]:
+                weight = self.weights[n]                    # Every move out of n pays n's multiplier
+                for offset, step_cost in self.sg.neighbours:    # rhs = one-step lookahead over successors
+                    successor = n + offset
+                    if not blocked[successor] and step_cost * weight + g[successor] < best:
+                        best = step_cost * weight + g[successor]
+            rhs[n] = best
+        self.openKeys.pop(n, None)
+        if g[n] != rhs[n]:
+            self.push(n, self.key(n))
+
+    def computeShortestPath(self, visitedOrder):
+        g, rhs = self.g, self.rhs
+        offsets = self.sg.offsets
+        start = self.start
+        while self.topKey() < self.key(start) or rhs[start] != g[start]:
+            if not self.open_heap:
+                break
+            k1, k2, n = heapq.heappop(self.open_heap)
+            del self.openKeys[n]
+            newKey = self.key(n)
+            if (k1, k2) < newKey:                           # Key went up since it was queued (robot moved): requeue
+                self.push(n, newKey)
+                continue
+
+            visitedOrder.append(n)
+            if g[n] > rhs[n]:                               # Overconsistent: settle it
+                g[n] = rhs[n]
+            else:                                           # Underconsistent: invalidate and recompute
+                g[n] = math.inf
+                self.updateVertex(n)
+            for offset in offsets:                          # Predecessors: cells that can move into n
+                predecessor = n - offset
+                if not self.blocked[predecessor]:
+                    self.updateVertex(predecessor)
+
+    def extractPath(self):                                  # Greedy descent over g from the start to the goal
+        g, blocked = self.g, self.blocked
+        current = self.start
+        if self.rhs[current] == math.inf:
+            return None
+        path = [current]
+        while current != self.goal:
+            best, nextCell = math.inf, -1
+            weight = self.weights[current]
+            for offset, step_cost in self.sg.neighbours:
+                successor = current + offset
+                if not blocked[successor] and step_cost * weight + g[successor] < best:
+                    best, nextCell = step_cost * weight + g[successor], successor
+            if nextCell == -1 or len(path) > self.sg.size:
+                return None
+            current = nextCell
+            path.append(current)
+        return self.sg.cells(path)
+
+    def plan(self, trace = None):
+        sg = self.sg
+        visitedOrder = array('i')                           # Only the nodes expanded by this (re)plan
+        if self.start == self.goal:
+            return sg.result(trace, [sg.cell(self.start)], sg.flags(), visitedOrder, 0)
+        self.computeShortestPath(visitedOrder)
+        expanded = None
+        if traceLevel(trace):
+            flags = np.zeros(sg.size, dtype=np.uint8)
+            flags[np.frombuffer(visitedOrder, dtype=np.int32)] = 1
+            expanded = bytearray(flags)
+        return sg.result(trace, self.extractPath(), expanded, visitedOrder, len(visitedOrder))
+
+    def traversal(self, grid, start, goal, trace = None):
+        self.reset(grid, start, goal)
+        return self.plan(trace)
+
+    def move_start(self, cell):
+        self.start = self.sg.index(cell)
+        self.km += self.heuristic(self.last, self.start)
+        self.last = self.start
+
+    def update_cells(self, changes):
+        # changes: iterable of (y, x, new_value), a multiplier or IMPASSABLE on cost maps and 0 / 1 on binary grids.
+        # A multiplier below the cheapest one at reset would make the heuristic inadmissible, so that restarts the
+        # search from scratch on the edited grid instead of repairing it
+        sg = self.sg
+        rescale = False
+        for y, x, value in changes:
+            if not (0 <= y < sg.height and 0 <= x < sg.width):
+                raise ValueError(f"Cell {(y, x)} is outside the {sg.height}x{sg.width} grid")
+            self.grid[y, x] = value
+            free = bool(freeMask(self.grid[y:y + 1, x:x + 1])[0, 0])    # Same test (and value check) as SearchGrid
+            weight = float(self.grid[y, x]) if self.costMap and free else 1.0
+            n = sg.index((y, x))
+            nowBlocked = 0 if free else 1
+            if self.blocked[n] == nowBlocked and self.weights[n] == weight:
+                continue
+            rescale = rescale or weight < self.scale
+            reroute = self.blocked[n] != nowBlocked         # Only blocking / freeing n changes the moves into it
+            self.blocked[n] = nowBlocked
+            self.weights[n] = weight
+            if rescale:
+                continue
+            # Edges out of n changed cost, and into it too if it was blocked or freed: recheck n and its predecessors
+            self.updateVertex(n)
+            if reroute:
+                for offset in sg.offsets:
+                    predecessor = n - offset
+                    if not self.blocked[predecessor]:
+                        self.updateVertex(predecessor)
+        if rescale:
+            start = sg.cell(self.start)
+            self.reset(self.grid, start, sg.cell(self.goal))
@@ -0,0 +1,433 @@
+import heapq
+import math
+from array import array
+
+import numpy as np
+
+from core import SearchGrid, freeMask, isCostMap
+from costToGo import gridKey
+from AStar import AStarGraph
+
+
+# Hierarchical path-finding index (HPA*, Botea et al. 2004). The grid is cut into clusterSize x clusterSize clusters;
+# entrances on shared borders become abstract nodes, and distances between the nodes of each cluster are precomputed.
+# Queries search the small abstract graph and then refine each abstract edge into cells inside one cluster.
+# Border crossings are grouped by the pair of within-cluster components they join, so every group needs only one or
+# two entrances and the abstract graph stays complete (diagonal and cluster-corner crossings included).
+# Only the impassable mask of a cost map is indexed, so the index itself ignores the multipliers; HPAGraph sends cost
+# maps to AStarGraph instead
+class HPAIndex:
+    def __init__(self, grid, motion, clusterSize = 32, build = True):
+        self.motion = [tuple(m) for m in motion]
+        self.diagonal = (1,1) in self.motion
+        self.clusterSize = clusterSize
+        self.grid = (~freeMask(grid)).astype(np.uint8)          # 1 = blocked (cost maps: impassable cells)
+        self.height, self.width = self.grid.shape
+        self.clusterRows = -(-self.height // clusterSize)
+        self.clusterCols = -(-self.width // clusterSize)
+
+        sg = SearchGrid(self.grid, self.motion)
+        self.sg = sg                                        # Buffers and result() for queries (padded layout, fixed size)
+        self.stride = sg.stride
+        self.blocked = bytearray(sg.blocked)                # Mutable copy, kept in sync by update_cells
+        self.neighbours = sg.neighbours
+
+        self.borders = {}                                   # (cluster, cluster) -> [(node, node, cost)] crossing edges
+        self.cross = {}                                     # node -> {node in a neighbouring cluster: cost}
+        self.intra = {}                                     # cluster -> (nodes, {node: row}, distance matrix)
+        labelType = np.uint16 if clusterSize * clusterSize < 2**16 - 1 else np.int32
+        self.labels = np.zeros((self.clusterRows * clusterSize, self.clusterCols * clusterSize), dtype=labelType)
+        self.unlabelled = np.iinfo(labelType).max           # Label of blocked cells
+        if build:
+            self.buildLabels(range(self.clusterRows * self.clusterCols))
+            for pair in self.clusterPairs():
+                self.setBorder(pair, self.borderEntrances(*pair))
+            self.buildIntra(range(self.clusterRows * self.clusterCols))
+
+    # Cluster bookkeeping
+
+    def clusterOf(self, n):                                 # Flat (padded) index -> cluster id
+        y, x = divmod(n, self.stride)
+        return ((y - 1) // self.clusterSize) * self.clusterCols + (x - 1) // self.clusterSize
+
+    def cell(self, n):                                      # Flat (padded) index -> (y, x)
+        y, x = divmod(n, self.stride)
+        return (y - 1, x - 1)
+
+    def clusterRect(self, c):                               # Cluster id -> (y0, y1, x0, x1) in grid coordinates
+        cy, cx = divmod(c, self.clusterCols)
+        size = self.clusterSize
+        return cy * size, min((cy + 1) * size, self.height), cx * size, min((cx + 1) * size, self.width)
+
+    def adjacentClusters(self, c):
+        cy, cx = divmod(c, self.clusterCols)
+        steps = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)] if self.diagonal else [(-1, 0), (0, -1), (0, 1), (1, 0)]
+        for dy, dx in steps:
+            if 0 <= cy + dy < self.clusterRows and 0 <= cx + dx < self.clusterCols:
+                yield (cy + dy) * self.clusterCols + cx + dx
+
+    def clusterPairs(self):
+        for c in range(self.clusterRows * self.clusterCols):
+            for d in self.adjacentClusters(c):
+                if c < d:
+                    yield (c, d)
+
+    def nodesOf(self, c):
+        nodes = set()
+        for d in self.adjacentClusters(c):
+            for a, b, _ in self.borders.get((min(c, d), max(c, d)), ()):
+                nodes.add(a if self.clusterOf(a) == c else b)
+        return sorted(nodes)
+
+    # Entrances
+
+    def borderEntrances(self, p, q):                        # Crossing edges between two adjacent clusters (p < q)
+        free = lambda y, x: self.grid[y, x] == 0
+        size = self.clusterSize
+        py, px = divmod(p, self.clusterCols)
+        qy, qx = divmod(q, self.clusterCols)
+        index = lambda y, x: int((y + 1) * self.stride + x + 1)
+        entrances = []
+
+        if py != qy and px != qx:                           # Diagonal neighbours only touch at a corner
+            y, x = qy * size, max(px, qx) * size
+            if px < qx and free(y - 1, x - 1) and free(y, x):
+                entrances.append((index(y - 1, x - 1), index(y, x), math.sqrt(2)))
+            if px > qx and free(y - 1, x) and free(y, x - 1):
+                entrances.append((index(y - 1, x), index(y, x - 1), math.sqrt(2)))
+            return entrances
+
+        y0, y1, x0, x1 = self.clusterRect(p)
+        if py == qy:                                        # Vertical border: p on the left, q on the right
+            line = np.arange(y0, y1)
+            cellA = lambda i: index(line[i], x1 - 1)
+            cellB = lambda i: index(line[i], x1)
+            labelA, labelB = self.labels[y0:y1, x1 - 1], self.labels[y0:y1, x1]
+        else:                                               # Horizontal border: p above, q below
+            line = np.arange(x0, x1)
+            cellA = lambda i: index(y1 - 1, line[i])
+            cellB = lambda i: index(y1, line[i])
+            labelA, labelB = self.labels[y1 - 1, x0:x1], self.labels[y1, x0:x1]
+        freeA, freeB = labelA != self.unlabelled, labelB != self.unlabelled
+
+        groups = {}                                         # (component in p, component in q) -> crossings (i, j, cost)
+        for shift in ((-1, 0, 1) if self.diagonal else (0,)):
+            lo, hi = max(0, -shift), len(line) - max(0, shift)
+            for i in np.flatnonzero(freeA[lo:hi] & freeB[lo + shift:hi + shift]).tolist():
+                i += lo
+                key = (int(labelA[i]), int(labelB[i + shift]))
+                groups.setdefault(key, []).append((i, i + shift, 1.0 if shift == 0 else math.sqrt(2)))
+
+        for crossings in groups.values():
+            straight = [c for c in crossings if c[2] == 1.0]
+            pool = sorted(straight or crossings)
+            if pool[-1][0] - pool[0][0] < 6:                # Narrow group: one entrance in the middle, wide group: one at each end
+                picks = [pool[(len(pool) - 1) // 2]]
+            else:
+                picks = [pool[0], pool[-1]]
+            for i, j, cost in picks:
+                entrances.append((cellA(i), cellB(j), cost))
+        return sorted(entrances)
+
+    def setBorder(self, pair, entrances):
+        for a, b, _ in self.borders.get(pair, ()):          # Drop the old crossing edges of this border
+            for u, v in ((a, b), (b, a)):
+                links = self.cross.get(u)
+                if links is not None:
+                    links.pop(v, None)
+                    if not links:
+                        del self.cross[u]
+        self.borders[pair] = entrances
+        for a, b, cost in entrances:
+            self.cross.setdefault(a, {})[b] = cost
+            self.cross.setdefault(b, {})[a] = cost
+
+    # Intra-cluster distances
+
+    def relax(self, values, blocked, unit):
+        # In-place raster (chamfer) passes over values shaped (size, size + 2, batch, sources), vectorised over every
+        # (cluster, source) pair: rows are swept top-down then bottom-up, each row relaxing from the previous row and
+        # then along itself with a segmented running minimum (blocked cells start a new segment). unit = 1 relaxes
+        # path costs, unit = 0 spreads minimum labels. Passes repeat until nothing improves
+        size = self.clusterSize
+        if any(abs(dy) > 1 or abs(dx) > 1 for dy, dx in self.motion):
+            raise ValueError("HPAIndex only supports single-step motion models")
+        reach = 4.0 * size * size                           # Larger than any distance or label inside one cluster
+        down = [(dx, unit * math.hypot(dy, dx)) for dy, dx in self.motion if dy == 1]
+        up = [(dx, unit * math.hypot(dy, dx)) for dy, dx in self.motion if dy == -1]
+        columns = unit * np.arange(size)[:, None, None]
+        segments = np.cumsum(blocked, axis=1) * (2 * reach)
+        segmentsBack = np.cumsum(blocked[:, ::-1], axis=1) * (2 * reach)
+
+        inner = values[:, 1:-1]
+        while True:
+            before = inner.copy()
+            for rows, moves, previous in ((range(size), down, -1), (range(size - 1, -1, -1), up, 1)):
+                for y in rows:
+                    row = inner[y]
+                    if 0 <= y + previous < size:
+                        for dx, cost in moves:              # From the row just swept
+                            np.minimum(row, values[y + previous, 1 - dx:size + 1 - dx] + cost, out=row)
+                        np.copyto(row, np.inf, where=blocked[y])    # Blocked cells must not seed their segment
+                    for line, segment, step in ((row, segments[y], (0, 1)), (row[::-1], segmentsBack[y], (0, -1))):
+                        if step not in self.motion:
+                            continue
+                        running = np.minimum.accumulate(line - columns - segment, axis=0) + columns + segment
+                        running[running >= reach] = np.inf  # Anything carried over from an earlier segment
+                        np.minimum(line, running, out=line)
+            if not (inner < before - 1e-9).any():
+                return inner
+
+    def clusterBlocked(self, clusters):                     # (size, size, batch, 1) obstacle masks, outside the grid counts as blocked
+        size = self.clusterSize
+        blocked = np.ones((size, size, len(clusters), 1), dtype=bool)
+        for b, c in enumerate(clusters):
+            y0, y1, x0, x1 = self.clusterRect(c)
+            blocked[:y1 - y0, :x1 - x0, b, 0] = self.grid[y0:y1, x0:x1] != 0
+        return blocked
+
+    def buildLabels(self, clusters, budget = 2**23):        # Connected components inside each cluster (local ids)
+        size = self.clusterSize
+        clusters = list(clusters)
+        count = max(1, budget // (size * (size + 2)))
+        ids = np.arange(size * size, dtype=float).reshape(size, size, 1, 1)
+        for first in range(0, len(clusters), count):
+            batch = clusters[first:first + count]
+            blocked = self.clusterBlocked(batch)
+            values = np.full((size, size + 2, len(batch), 1), np.inf)
+            values[:, 1:-1] = np.where(blocked, np.inf, ids)
+            labels = self.relax(values, blocked, 0)
+            for b, c in enumerate(batch):
+                cy, cx = divmod(c, self.clusterCols)
+                self.labels[cy * size:(cy + 1) * size, cx * size:(cx + 1) * size] = np.where(blocked[:, :, b, 0], self.unlabelled, labels[:, :, b, 0])
+
+    def buildIntra(self, clusters, budget = 2**23):
+        # Distances from every node of a cluster to every other node, restricted to the cluster
+        size = self.clusterSize
+        pending = [(c, self.nodesOf(c)) for c in clusters]
+        for c, nodes in pending:
+            if not nodes:
+                self.intra[c] = ([], {}, np.zeros((0, 0)))
+
+        pending = [(c, nodes) for c, nodes in pending if nodes]
+        while pending:
+            widest = max(len(nodes) for _, nodes in pending[:64])
+            count = max(1, min(len(pending), budget // (widest * size * (size + 2))))
+            batch, pending = pending[:count], pending[count:]
+            widest = max(len(nodes) for _, nodes in batch)
+
+            dist = np.full((size, size + 2, len(batch), widest), np.inf)     # One padding column each side for diagonal moves
+            local = []
+            for b, (c, nodes) in enumerate(batch):
+                y0, _, x0, _ = self.clusterRect(c)
+                cells = []
+                for k, n in enumerate(nodes):
+                    ly, lx = self.cell(n)
+                    dist[ly - y0, lx - x0 + 1, b, k] = 0
+                    cells.append((ly - y0, lx - x0))
+                local.append(cells)
+            inner = self.relax(dist, self.clusterBlocked([c for c, _ in batch]), 1)
+
+            for b, (c, nodes) in enumerate(batch):
+                ys, xs = zip(*local[b])
+                matrix = inner[ys, xs, b, :len(nodes)].T.copy()     # Row k: distances from node k
+                self.intra[c] = (nodes, {n: i for i, n in enumerate(nodes)}, matrix)
+
+    # Edits
+
+    def update_cells(self, changes):                        # changes: iterable of (y, x, new_value); rebuilds only touched clusters
+        touched = set()
+        for y, x, value in changes:
+            if not (0 <= y < self.height and 0 <= x < self.width):
+                raise ValueError(f"Cell {(y, x)} is outside the {self.height}x{self.width} grid")
+            value = 1 if value != 0 else 0
+            if self.grid[y, x] == value:
+                continue
+            self.grid[y, x] = value
+            self.blocked[(y + 1) * self.stride + x + 1] = value
+            touched.add((y // self.clusterSize) * self.clusterCols + x // self.clusterSize)
+        if not touched:
+            return
+
+        self.buildLabels(sorted(touched))
+        rebuild = set(touched)
+        for c in touched:
+            for d in self.adjacentClusters(c):
+                pair = (min(c, d), max(c, d))
+                entrances = self.borderEntrances(*pair)
+                if entrances != self.borders.get(pair, []):
+                    self.setBorder(pair, entrances)
+                    rebuild.add(d)                          # Its node set changed, so its distances are stale
+        self.buildIntra(sorted(rebuild))
+
+    # Queries
+
+    def heuristic(self, a, b):                              # Euclidean or Manhattan on flat indices, same as AStarGraph
+        ay, ax = divmod(a, self.stride)
+        by, bx = divmod(b, self.stride)
+        dy, dx = abs(ay - by), abs(ax - bx)
+        return math.hypot(dy, dx) if self.diagonal else dy + dx
+
+    def localSearch(self, source, targets, cluster):        # Dijkstra from source that never leaves the cluster
+        targets = set(targets)
+        gScore = {source: 0}
+        came_from = {}
+        found = {}
+        open_heap = [(0, source)]
+        while open_heap and len(found) < len(targets):
+            g, current = heapq.heappop(open_heap)
+            if g > gScore[current]:
+                continue
+            if current in targets:
+                found[current] = g
+            for offset, step_cost in self.neighbours:
+                neighbour = current + offset
+                if self.blocked[neighbour] or self.clusterOf(neighbour) != cluster:
+                    continue
+                neighbourG = g + step_cost
+                if neighbourG < gScore.get(neighbour, math.inf):
+                    gScore[neighbour] = neighbourG
+                    came_from[neighbour] = current
+                    heapq.heappush(open_heap, (neighbourG, neighbour))
+        return found, came_from
+
+    def refine(self, a, b):                                 # Cell path for one abstract edge (without a)
+        if self.clusterOf(a) != self.clusterOf(b):          # Crossing edge: the two cells are adjacent
+            return [b]
+        _, came_from = self.localSearch(a, [b], self.clusterOf(a))
+        path = [b]
+        while path[-1] != a:
+            path.append(came_from[path[-1]])
+        path.pop()
+        path.reverse()
+        return path
+
+    def query(self, start, goal, weight = 1.0, trace = None):
+        # weight > 1 runs weighted A* on the abstract graph: the abstract path costs at most weight x the abstract optimum.
+        # The trace (see core.Trace) counts the abstract nodes expanded, not cells touched by the local searches
+        source = (start[0] + 1) * self.stride + start[1] + 1
+        target = (goal[0] + 1) * self.stride + goal[1] + 1
+        if source == target:
+            return self.sg.result(trace, [tuple(start)], self.sg.flags(), array('i'), 0)
+
+        sourceCluster, targetCluster = self.clusterOf(source), self.clusterOf(target)
+        extra = {}                                          # Temporary edges linking start and goal into the abstract graph
+        startLinks, _ = self.localSearch(source, self.intra[sourceCluster][0] + [target], sourceCluster)
+        goalLinks, _ = self.localSearch(target, self.intra[targetCluster][0], targetCluster)
+        extra[source] = dict(startLinks)
+        for n, cost in goalLinks.items():
+            extra.setdefault(n, {})[target] = cost
+
+        gScore = {source: 0}
+        came_from = {}
+        closed = set()
+        visitedOrder = array('i')
+        pops = peak = 0
+        path = None
+        open_heap = [(weight * self.heuristic(source, target), 0, source)]
+        while open_heap:
+            peak = max(peak, len(open_heap))
+            f, g, current = heapq.heappop(open_heap)
+            pops += 1
+            if current in closed:
+                continue
+            closed.add(current)
+            visitedOrder.append(current)
+
+            if current == target:
+                abstract = [current]
+                while abstract[-1] in came_from:
+                    abstract.append(came_from[abstract[-1]])
+                abstract.reverse()
+                path = [source]
+                for a, b in zip(abstract, abstract[1:]):
+                    path.extend(self.refine(a, b))
+                path = [self.cell(n) for n in path]
+                break
+
+            links = list(self.cross.get(current, {}).items()) + list(extra.get(current, {}).items())
+            if current != source and current != target:
+                nodes, rows, matrix = self.intra[self.clusterOf(current)]
+                row = matrix[rows[current]]
+                links += [(n, row[i]) for i, n in enumerate(nodes) if n != current and row[i] < math.inf]
+
+            for neighbour, cost in links:
+                neighbourG = g + cost
+                if neighbour in closed or neighbourG >= gScore.get(neighbour, math.inf):
+                    continue
+                gScore[neighbour] = neighbourG
+                came_from[neighbour] = current
+                heapq.heappush(open_heap, (neighbourG + weight * self.heuristic(neighbour, target), neighbourG, neighbour))
+
+        flags = self.sg.flags()
+        for n in closed:
+            flags[n] = 1
+        return self.sg.result(trace, path, flags, visitedOrder, len(visitedOrder), (pops, len(open_heap), peak))
+
+    # Persistence
+
+    def save(self, path):
+        pairs = sorted(self.borders)
+        entrances = [e for pair in pairs for e in self.borders[pair]]
+        clusters = sorted(self.intra)
+        np.savez_compressed(
+            path,
+            grid=np.packbits(self.grid),
+            shape=np.array(self.grid.shape),
+            motion=np.array(self.motion),
+            clusterSize=np.array(self.clusterSize),
+            borderPairs=np.array(pairs, dtype=np.int64).reshape(-1, 2),
+            borderCounts=np.array([len(self.borders[p]) for p in pairs], dtype=np.int64),
+            entrances=np.array([(a, b) for a, b, _ in entrances], dtype=np.int64).reshape(-1, 2),
+            entranceCosts=np.array([cost for _, _, cost in entrances]),
+            clusters=np.array(clusters, dtype=np.int64),
+            nodeCounts=np.array([len(self.intra[c][0]) for c in clusters], dtype=np.int64),
+            nodes=np.array([n for c in clusters for n in self.intra[c][0]], dtype=np.int64),
+            distances=np.concatenate([self.intra[c][2].ravel() for c in clusters] + [np.zeros(0)]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        shape = tuple(data["shape"])
+        grid = np.unpackbits(data["grid"])[:shape[0] * shape[1]].reshape(shape)
+        index = cls(grid, [tuple(m) for m in data["motion"].tolist()], int(data["clusterSize"]), build=False)
+        index.buildLabels(range(index.clusterRows * index.clusterCols))     # Cheap, and only needed for later edits
+
+        entrances, costs = data["entrances"].tolist(), data["entranceCosts"].tolist()
+        position = 0
+        for pair, count in zip(data["borderPairs"].tolist(), data["borderCounts"].tolist()):
+            border = [(a, b, cost) for (a, b), cost in zip(entrances[position:position + count], costs[position:position + count])]
+            index.setBorder(tuple(pair), border)
+            position += count
+
+        nodes, distances = data["nodes"].tolist(), data["distances"]
+        nodeStart = distanceStart = 0
+        for c, count in zip(data["clusters"].tolist(), data["nodeCounts"].tolist()):
+            clusterNodes = nodes[nodeStart:nodeStart + count]
+            matrix = distances[distanceStart:distanceStart + count * count].reshape(count, count)
+            index.intra[c] = (clusterNodes, {n: i for i, n in enumerate(clusterNodes)}, matrix)
+            nodeStart += count
+            distanceStart += count * count
+        return index
+
+
+# Planner front-end with the usual traversal signature. The index is built on first use and rebuilt only when the
+# grid content changes; visited / visitedList hold the abstract nodes expanded by the query. Cost maps fall back to
+# AStarGraph, since the index only knows which cells are impassable
+class HPAGraph:
+    def __init__(self, motion, clusterSize = 32, weight = 1.0):
+        self.motion = motion
+        self.clusterSize = clusterSize
+        self.weight = weight
+        self.index = None
+        self.key = None
+
+    def traversal(self, grid, start, goal, trace = None):
+        if isCostMap(grid):
+            return AStarGraph(self.motion).traversal(grid, start, goal, trace)
+        key = gridKey(grid)
+        if self.index is None or key != self.key:
+            self.index = HPAIndex(grid, self.motion, self.clusterSize)
+            self.key = key
+        return self.index.query(start, goal, self.weight, trace)
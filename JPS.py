@@ -0,0 +1,172 @@
+import heapq
+import math
+from array import array
+
+from core import SearchGrid, isCostMap, searchStats, traceLevel
+from AStar import AStarGraph
+
+SQRT2 = math.sqrt(2)
+
+
+# Jump Point Search (Harabor & Grastien 2011) for uniform-cost 8-connected grids, with diagonal moves allowed
+# past obstacle corners like the other planners. Symmetric paths are pruned so only jump points reach the heap
+class JPSGraph:
+    def __init__(self, motion, instrument = False):
+        self.motion = motion
+        self.diagonal = (1,1) in motion
+        self.instrument = instrument                # Fill self.stats with per-run counters (see core.searchStats)
+        self.stats = {}
+
+    def heuristic(self, a, b):                      # Octile distance (exact on an empty 8-connected grid)
+        dy = abs(a[0] - b[0])
+        dx = abs(a[1] - b[1])
+        return max(dy, dx) + (SQRT2 - 1) * min(dy, dx)
+
+    def jumpStraight(self, blocked, n, step, side, target):
+        # Walk along a row (side = stride) or column (side = 1) until blocked, the goal, or a forced neighbour
+        while True:
+            if blocked[n]:
+                return -1
+            if n == target:
+                return n
+            if (not blocked[n + step + side] and blocked[n + side]) or (not blocked[n + step - side] and blocked[n - side]):
+                return n
+            n += step
+
+    def jumpDiagonal(self, blocked, n, dy, dx, stride, target):
+        vertical = dy * stride
+        step = vertical + dx
+        while True:
+            if blocked[n]:
+                return -1
+            if n == target:
+                return n
+            if (not blocked[n - dx + vertical] and blocked[n - dx]) or (not blocked[n + dx - vertical] and blocked[n - vertical]):
+                return n
+            # A diagonal cell is also a jump point if either straight sweep from it finds one
+            if self.jumpStraight(blocked, n + dx, dx, stride, target) != -1 or self.jumpStraight(blocked, n + vertical, vertical, 1, target) != -1:
+                return n
+            n += step
+
+    def jump(self, blocked, n, dy, dx, stride, target):
+        if dy and dx:
+            return self.jumpDiagonal(blocked, n, dy, dx, stride, target)
+        if dx:
+            return self.jumpStraight(blocked, n, dx, stride, target)
+        return self.jumpStraight(blocked, n, dy * stride, 1, target)
+
+    def directions(self, blocked, current, parent, stride):     # Pruned set of directions to jump in from current
+        if parent == -1:
+            return [(dy, dx) for dy, dx in self.motion]
+
+        cy, cx = divmod(current, stride)
+        py, px = divmod(parent, stride)
+        dy = (cy > py) - (cy < py)
+        dx = (cx > px) - (cx < px)
+        vertical = dy * stride
+
+        if dy and dx:                                           # Natural: both straight parts and the diagonal; forced: blocked corners behind
+            directions = [(dy, 0), (0, dx), (dy, dx)]
+            if blocked[current - dx]:
+                directions.append((dy, -dx))
+            if blocked[current - vertical]:
+                directions.append((-dy, dx))
+        elif dx:
+            directions = [(0, dx)]
+            if blocked[current + stride]:
+                directions.append((1, dx))
+            if blocked[current - stride]:
+                directions.append((-1, dx))
+        else:
+            directions = [(dy, 0)]
+            if blocked[current + 1]:
+                directions.append((dy, 1))
+            if blocked[current - 1]:
+                directions.append((dy, -1))
+        return directions
+
+    def traversal(self, grid, start, goal, trace = None):
+        if not self.diagonal or isCostMap(grid):                # Jump points need 8-connected motion and uniform step costs
+            planner = AStarGraph(self.motion, self.instrument)
+            result = planner.traversal(grid, start, goal, trace)
+            self.stats = planner.stats
+            return result
+
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        stride = sg.stride
+        source, target = sg.index(start), sg.index(goal)
+        goalY, goalX = divmod(target, stride)
+        level = traceLevel(trace)
+        counting = level or self.instrument                     # Frontier peak is only tracked when someone reads it
+
+        open_heap = []
+        heapq.heappush(open_heap, (self.heuristic(start, goal), 0, source))
+
+        came_from = sg.parents()                                # Parent jump point
+        gScore = sg.gScores()
+        gScore[source] = 0
+
+        closed = sg.flags()
+        visitedOrder = array('i')                               # Expanded jump points (full trace only)
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
+        pruned = 0                                              # Jumps rejected as no cheaper than the known gScore
+
+        if start == goal:                                       # Immediate check for start equals goal
+            if self.instrument:
+                self.stats = searchStats(0, (0, 0, 0), stale_pops = 0, pruned = 0)
+            return sg.result(trace, [start], closed, visitedOrder, 0)
+
+        path = None
+        while open_heap:
+            if counting and len(open_heap) > peak:
+                peak = len(open_heap)
+            f, g, current = heapq.heappop(open_heap)
+            pops += 1
+
+            if closed[current]:
+                continue
+
+            closed[current] = 1
+            expansions += 1
+            if level == 2:
+                visitedOrder.append(current)
+
+            if current == target:
+                path = self.expand(sg, sg.path(came_from, current))
+                break
+
+            cy, cx = divmod(current, stride)
+            for dy, dx in self.directions(blocked, current, came_from[current], stride):
+                jumpPoint = self.jump(blocked, current + dy * stride + dx, dy, dx, stride, target)
+                if jumpPoint == -1 or closed[jumpPoint]:
+                    continue
+
+                jy, jx = divmod(jumpPoint, stride)
+                ly, lx = abs(jy - cy), abs(jx - cx)             # Jumps are straight or diagonal, so the octile distance is exact
+                neighbourG = g + max(ly, lx) + (SQRT2 - 1) * min(ly, lx)
+
+                if neighbourG >= gScore[jumpPoint]:
+                    pruned += 1
+                    continue
+
+                came_from[jumpPoint] = current
+                gScore[jumpPoint] = neighbourG
+                hy, hx = abs(jy - goalY), abs(jx - goalX)
+                heapq.heappush(open_heap, (neighbourG + max(hy, hx) + (SQRT2 - 1) * min(hy, hx), neighbourG, jumpPoint))
+
+        if self.instrument:                                     # Every pop that did not expand was a stale entry
+            self.stats = searchStats(expansions, (pops, len(open_heap), peak), stale_pops = pops - expansions, pruned = pruned)
+        return sg.result(trace, path, closed, visitedOrder, expansions, (pops, len(open_heap), peak))
+
+    def expand(self, sg, jumpPoints):                           # Fill in the cells between consecutive jump points
+        path = [jumpPoints[0]]
+        for y, x in jumpPoints[1:]:
+            py, px = path[-1]
+            dy = (y > py) - (y < py)
+            dx = (x > px) - (x < px)
+            while path[-1] != (y, x):
+                py, px = py + dy, px + dx
+                path.append((py, px))
+        return path
@@ -0,0 +1,412 @@
+import heapq
+import itertools
+import math
+import time
+from array import array
+
+from core import SearchGrid
+
+NEVER = 2**31 - 1
+
+
+# Space-time reservations for agents on one grid, keyed by flat cell index and absolute time step (tick).
+# Times live in a ring of `horizon` slots, so only [now, now + horizon) can be reserved and advance() recycles the slots
+# of ticks that have passed: memory is bounded by agents * horizon however long the run. Each slot is a dict
+# cell -> agent (vertex reservations) plus a dict of moves a -> b (as a * size + b) starting at that tick, so every
+# lookup is O(1). An agent's plan ends in a park: it holds its last cell from then on (its goal, or where it waits to be
+# replanned), kept in two per-cell arrays rather than in the ring
+class ReservationTable:
+    def __init__(self, size, horizon = 1024):
+        self.size = size
+        self.horizon = horizon
+        self.now = 0
+        self.vertex = [{} for _ in range(horizon)]
+        self.edges = [{} for _ in range(horizon)]
+        self.parkedFrom = array('i', [NEVER]) * size        # Tick the cell is held from for good, NEVER if not parked
+        self.parkedBy = array('i', [-1]) * size
+        self.lastHeld = array('i', [-1]) * size             # Latest tick any agent reserved the cell (only ever raised)
+        self.plans = {}                                     # agent -> (first tick, flat cells), for release()
+
+    def advance(self, t):                                   # Forget every tick before t
+        for s in range(self.now, min(t, self.now + self.horizon)):
+            self.vertex[s % self.horizon].clear()
+            self.edges[s % self.horizon].clear()
+        self.now = t
+
+    def claim(self, cell, t, agent):
+        if not self.now <= t < self.now + self.horizon:
+            raise ValueError(f"tick {t} is outside the reservation window [{self.now}, {self.now + self.horizon})")
+        self.vertex[t % self.horizon][cell] = agent
+        if t > self.lastHeld[cell]:
+            self.lastHeld[cell] = t
+
+    def claimMove(self, a, b, t, agent):                    # Move a -> b leaving at tick t
+        self.edges[t % self.horizon][a * self.size + b] = agent
+
+    def park(self, cell, t, agent):
+        self.parkedFrom[cell] = t
+        self.parkedBy[cell] = agent
+
+    def reserve(self, agent, cells, t0):                    # cells[k] is the agent's cell at tick t0 + k; parks on the last
+        self.release(agent)
+        for k, cell in enumerate(cells):
+            self.claim(cell, t0 + k, agent)
+            if k and cell != cells[k - 1]:
+                self.claimMove(cells[k - 1], cell, t0 + k - 1, agent)
+        self.park(cells[-1], t0 + len(cells) - 1, agent)
+        self.plans[agent] = (t0, cells)
+
+    def release(self, agent):
+        t0, cells = self.plans.pop(agent, (0, ()))
+        horizon = self.horizon
+        for k, cell in enumerate(cells):
+            t = t0 + k
+            if t < self.now:
+                continue
+            slot = self.vertex[t % horizon]
+            if slot.get(cell) == agent:
+                del slot[cell]
+            if k + 1 < len(cells):
+                slot = self.edges[t % horizon]
+                if slot.get(cell * self.size + cells[k + 1]) == agent:
+                    del slot[cell * self.size + cells[k + 1]]
+        if cells and self.parkedBy[cells[-1]] == agent:
+            self.parkedFrom[cells[-1]] = NEVER
+            self.parkedBy[cells[-1]] = -1
+
+    def free(self, cell, t, agent):                         # Can agent be in cell at tick t?
+        owner = self.vertex[t % self.horizon].get(cell)
+        if owner is not None and owner != agent:
+            return False
+        return self.parkedFrom[cell] > t or self.parkedBy[cell] == agent
+
+    def swapped(self, a, b, t, agent):                      # Would a -> b at tick t swap places with another agent?
+        owner = self.edges[t % self.horizon].get(b * self.size + a)
+        return owner is not None and owner != agent
+
+    def canHold(self, cell, t, agent):                      # Can agent stay in cell from tick t on?
+        if self.parkedBy[cell] not in (-1, agent):
+            return False
+        if self.lastHeld[cell] <= t:                        # Fast path: nobody has reserved it after t
+            return True
+        horizon = self.horizon
+        for s in range(t + 1, min(self.lastHeld[cell], self.now + horizon - 1) + 1):
+            owner = self.vertex[s % horizon].get(cell)
+            if owner is not None and owner != agent:
+                return False
+        return True
+
+
+def spaceTimeSearch(sg, cellMoves, waitCosts, table, agent, source, target, t0, depth, windowed, scale, diagonal,
+                    max_expansions):
+    # A* over (cell, tick) states from source at tick t0, against the reservations of every other agent. Moves are
+    # AStarGraph's (same step costs and heuristic) plus waiting in place. The search ends at the target once the agent
+    # can stay there; windowed=True also accepts any cell it can hold at tick t0 + depth (Silver's WHCA*), which
+    # A* order makes the one with the least g + h. Returns (flat cells per tick from t0, cost, expansions), or
+    # (None, inf, expansions) when no plan fits in depth ticks or max_expansions
+    blocked = sg.blocked
+    weighted = sg.weighted                                  # Binary grids: cellMoves is just the neighbour list
+    size = sg.size
+    stride = sg.stride
+    goalY, goalX = divmod(target, stride)
+
+    def h(n):
+        ny, nx = divmod(n, stride)
+        dy, dx = abs(ny - goalY), abs(nx - goalX)
+        return (math.hypot(dy, dx) if diagonal else dy + dx) * scale
+
+    gScore = {source: 0.0}                                  # Keyed by dt * size + cell, dt = ticks since t0
+    came_from = {}
+    closed = set()
+    open_heap = [(h(source), -0.0, 0, source)]              # Ties go to the state with more cost behind it
+    expansions = 0
+    end = None
+    while open_heap:
+        f, negG, dt, current = heapq.heappop(open_heap)
+        key = dt * size + current
+        if key in closed:
+            continue
+        closed.add(key)
+        expansions += 1
+        t = t0 + dt
+        if current == target and table.canHold(current, t, agent):
+            end = key
+            break
+        if dt == depth:
+            if windowed and table.canHold(current, t, agent):
+                end = key
+                break
+            continue
+        if expansions >= max_expansions:
+            break
+
+        g = -negG
+        for offset, step_cost in (cellMoves[current] if weighted else cellMoves):
+            n = current + offset
+            if blocked[n] or not table.free(n, t + 1, agent) or table.swapped(current, n, t, agent):
+                continue
+            nKey = key + size + offset
+            nG = g + step_cost
+            if nG < gScore.get(nKey, math.inf):
+                gScore[nKey] = nG
+                came_from[nKey] = key
+                heapq.heappush(open_heap, (nG + h(n), -nG, dt + 1, n))
+        if table.free(current, t + 1, agent):               # Wait
+            nKey = key + size
+            nG = g + waitCosts[current]
+            if nG < gScore.get(nKey, math.inf):
+                gScore[nKey] = nG
+                came_from[nKey] = key
+                heapq.heappush(open_heap, (nG + h(current), -nG, dt + 1, current))
+
+    if end is None:
+        return None, math.inf, expansions
+    keys = [end]
+    while keys[-1] in came_from:
+        keys.append(came_from[keys[-1]])
+    keys.reverse()
+    return [key % size for key in keys], gScore[end], expansions
+
+
+def findConflict(paths):
+    # First collision between paths of flat cells (or (y, x) tuples) per tick, agents staying on their last cell:
+    # ("vertex", a, b, cell, t) for two agents in one cell at tick t, ("swap", a, b, cell, other, t) for a moving
+    # cell -> other while b moves other -> cell between ticks t and t + 1, or None
+    live = [(agent, path) for agent, path in enumerate(paths) if path]
+    for t in range(max((len(path) for _, path in live), default = 0)):
+        seen = {}
+        moves = {}
+        for agent, path in live:
+            cell = path[min(t, len(path) - 1)]
+            if cell in seen:
+                return ("vertex", seen[cell], agent, cell, t)
+            seen[cell] = agent
+            if t + 1 < len(path) and path[t + 1] != cell:
+                other = moves.get((path[t + 1], cell))
+                if other is not None:
+                    return ("swap", other, agent, path[t + 1], cell, t)
+                moves[cell, path[t + 1]] = agent
+    return None
+
+
+def checkAgents(sg, starts, goals):
+    if len(starts) != len(goals):
+        raise ValueError("need one goal per start")
+    sources = [sg.index(s) for s in starts]
+    targets = [sg.index(g) for g in goals]
+    if len(set(sources)) < len(sources) or len(set(targets)) < len(targets):
+        raise ValueError("agents need distinct starts and distinct goals")
+    for cell in sources + targets:
+        if sg.blocked[cell]:
+            raise ValueError(f"agent start or goal {sg.cell(cell)} is blocked")
+    return sources, targets
+
+
+# Cooperative A* (Silver 2005): agents are planned one at a time, in list order, each in (cell, tick) space around the
+# reservations of the ones already planned. Every agent parks on its start before planning starts, so earlier agents
+# route around later ones that have not moved yet.
+# window=None plans every agent to its goal once, up to horizon ticks. With a window of w ticks (WHCA*) plans only
+# reach w ticks ahead and are redone as they run out: tick() replans the agents whose plans end soonest, while
+# tick_budget seconds last (at least one per tick), then moves everyone one step. Agents not replanned in time stay
+# parked where their plan ends, so a tick never produces a collision however small the budget.
+# Only solve() records the cells visited per tick (history); callers driving tick() themselves get the positions back
+# from each tick, so a long-running loop keeps no per-tick state
+class CooperativeAStar:
+    def __init__(self, motion, window = None, horizon = 1024, tick_budget = None, max_expansions = 100000):
+        if window is not None and not 0 < window < horizon:
+            raise ValueError("window must be between 1 and horizon - 1")
+        self.motion = motion
+        self.window = window
+        self.horizon = horizon
+        self.tick_budget = tick_budget
+        self.max_expansions = max_expansions
+        self.stats = {}
+
+    def reset(self, grid, starts, goals):
+        sg = SearchGrid(grid, self.motion)
+        self.sg = sg
+        self.cellMoves = sg.moves()
+        self.waitCosts = sg.weights()                       # Waiting a tick costs the cell's multiplier (1 on binary grids)
+        self.scale = sg.minWeight
+        self.diagonal = (1,1) in self.motion
+        self.sources, self.targets = checkAgents(sg, starts, goals)
+        self.table = ReservationTable(sg.size, self.horizon)
+        self.positions = list(self.sources)
+        self.history = None                                 # Per-agent array of flat cells per tick, while solve() runs
+        self.costs = [0.0] * len(self.sources)
+        for agent, cell in enumerate(self.sources):
+            self.table.reserve(agent, [cell], 0)
+        self.stats = {"agents": len(self.sources), "ticks": 0, "replans": 0, "failed_replans": 0, "expansions": 0,
+                      "max_tick_s": 0.0, "budget_overruns": 0}
+
+    def plan(self, agent):                                  # Replan one agent from its position now; False if nothing fits
+        table = self.table
+        depth = self.window if self.window is not None else self.horizon - 1
+        cells, cost, expansions = spaceTimeSearch(self.sg, self.cellMoves, self.waitCosts, table, agent,
+                                                  self.positions[agent], self.targets[agent], table.now, depth,
+                                                  self.window is not None, self.scale, self.diagonal, self.max_expansions)
+        self.stats["replans"] += 1
+        self.stats["expansions"] += expansions
+        if cells is None:
+            self.stats["failed_replans"] += 1
+            return False
+        table.reserve(agent, cells, table.now)
+        return True
+
+    def arrived(self, agent):                               # Plan ends parked on the goal
+        t0, cells = self.table.plans[agent]
+        return cells[-1] == self.targets[agent]
+
+    def tick(self):
+        # One time step: replan within the budget, then move every agent along its plan. Returns the positions
+        table = self.table
+        now = table.now
+        begin = time.perf_counter()
+        ahead = max(1, (self.window or 1) // 2)             # Replan once fewer than half a window of ticks are left
+        due = []
+        for agent in range(len(self.positions)):
+            t0, cells = table.plans[agent]
+            end = t0 + len(cells) - 1
+            if end - now < ahead and not self.arrived(agent):
+                due.append((end, agent))
+        due.sort()
+        for count, (_, agent) in enumerate(due):
+            if count and self.tick_budget is not None and time.perf_counter() - begin > self.tick_budget:
+                break
+            self.plan(agent)
+
+        for agent, (t0, cells) in table.plans.items():
+            cell = cells[min(now + 1 - t0, len(cells) - 1)]
+            if cell != self.positions[agent] or cell != self.targets[agent]:
+                self.costs[agent] += self.stepCost(self.positions[agent], cell)
+            self.positions[agent] = cell
+            if self.history is not None:
+                self.history[agent].append(cell)
+        table.advance(now + 1)
+
+        spent = time.perf_counter() - begin
+        self.stats["ticks"] += 1
+        self.stats["max_tick_s"] = max(self.stats["max_tick_s"], spent)
+        if self.tick_budget is not None and spent > self.tick_budget:
+            self.stats["budget_overruns"] += 1
+        return self.sg.cells(self.positions)
+
+    def stepCost(self, a, b):                               # What a move (or wait, a == b) between ticks costs
+        if a == b:
+            return self.waitCosts[a]
+        for offset, step_cost in (self.cellMoves[a] if self.sg.weighted else self.cellMoves):
+            if a + offset == b:
+                return step_cost
+        raise ValueError("not a move")
+
+    def solve(self, grid, starts, goals, max_ticks = None):
+        # Paths as lists of (y, x) per tick from tick 0 to each agent's arrival (None for agents that cannot reach their
+        # goal), sharing the time axis so findConflict(paths) is None. Windowed runs tick until every agent has
+        # arrived or max_ticks (default 4 * (height + width)) pass
+        self.reset(grid, starts, goals)
+        sg = self.sg
+        agents = range(len(self.sources))
+        if self.window is None:
+            for agent in agents:
+                self.plan(agent)
+            paths = [sg.cells(self.table.plans[agent][1]) if self.arrived(agent) else None for agent in agents]
+            costs = [sum(self.stepCost(a, b) for a, b in zip(cells, cells[1:]))
+                     for cells in (self.table.plans[agent][1] for agent in agents)]
+        else:
+            max_ticks = 4 * (sg.height + sg.width) if max_ticks is None else max_ticks
+            self.history = [array('i', [cell]) for cell in self.sources]
+            while self.stats["ticks"] < max_ticks and not all(self.positions[a] == self.targets[a] and self.arrived(a)
+                                                              for a in agents):
+                self.tick()
+            paths = []
+            for agent in agents:
+                cells = self.history[agent]
+                if cells[-1] != self.targets[agent]:
+                    paths.append(None)
+                    continue
+                end = len(cells)
+                while end > 1 and cells[end - 2] == cells[end - 1]:
+                    end -= 1                                # Drop the ticks spent parked on the goal
+                paths.append(sg.cells(cells[:end]))
+            costs = self.costs
+            self.history = None
+        solved = [agent for agent in agents if paths[agent] is not None]
+        self.stats.update(solved = len(solved), sum_of_costs = sum(costs[a] for a in solved),
+                          makespan = max((len(paths[a]) - 1 for a in solved), default = 0))
+        return paths
+
+
+# Conflict-Based Search (Sharon et al. 2015) for small teams: optimal in sum of costs. Each agent is planned alone
+# (space-time A* against its own constraints only); the first collision between the plans splits the search in two,
+# forbidding that cell (or move) at that tick for one agent or the other, cheapest constraint set first. After
+# max_nodes constraint sets it gives up and returns CooperativeAStar's (suboptimal) plans instead
+class CBS:
+    def __init__(self, motion, horizon = 256, max_nodes = 2000, max_expansions = 100000):
+        self.motion = motion
+        self.horizon = horizon
+        self.max_nodes = max_nodes
+        self.max_expansions = max_expansions
+        self.stats = {}
+
+    def lowLevel(self, agent, constraints):
+        # constraints: ("vertex", cell, t) and ("move", a, b, t) the agent may not use, claimed by a dummy agent -2
+        sg = self.sg
+        table = ReservationTable(sg.size, self.horizon)
+        for constraint in constraints:
+            if constraint[0] == "vertex":
+                table.claim(constraint[1], constraint[2], -2)
+            else:
+                table.claimMove(constraint[2], constraint[1], constraint[3], -2)    # a -> b is blocked by a "b -> a"
+        cells, cost, expansions = spaceTimeSearch(sg, self.cellMoves, self.waitCosts, table, agent, self.sources[agent],
+                                                  self.targets[agent], 0, self.horizon - 1, False, sg.minWeight,
+                                                  (1,1) in self.motion, self.max_expansions)
+        self.stats["expansions"] += expansions
+        return cells, cost
+
+    def solve(self, grid, starts, goals):                   # Same result format as CooperativeAStar.solve
+        sg = SearchGrid(grid, self.motion)
+        self.sg = sg
+        self.cellMoves = sg.moves()
+        self.waitCosts = sg.weights()
+        self.sources, self.targets = checkAgents(sg, starts, goals)
+        agents = range(len(self.sources))
+        self.stats = {"agents": len(self.sources), "nodes": 0, "expansions": 0, "optimal": False}
+
+        constraints = [()] * len(self.sources)
+        plans = [self.lowLevel(agent, ()) for agent in agents]
+        if any(cells is None for cells, _ in plans):
+            self.stats.update(solved = 0, sum_of_costs = math.inf, makespan = 0)
+            return [None] * len(self.sources)          # Some agent cannot reach its goal even alone
+
+        order = itertools.count(1)                          # Tie-breaker, so the heap never compares constraint sets
+        open_heap = [(sum(cost for _, cost in plans), 0, constraints, plans)]
+        while open_heap and self.stats["nodes"] < self.max_nodes:
+            total, _, constraints, plans = heapq.heappop(open_heap)
+            self.stats["nodes"] += 1
+            conflict = findConflict([cells for cells, _ in plans])
+            if conflict is None:
+                paths = [sg.cells(cells) for cells, _ in plans]
+                self.stats.update(optimal = True, solved = len(paths), sum_of_costs = total,
+                                  makespan = max(len(p) - 1 for p in paths))
+                return paths
+            if conflict[0] == "vertex":
+                _, a, b, cell, t = conflict
+                branches = [(a, ("vertex", cell, t)), (b, ("vertex", cell, t))]
+            else:
+                _, a, b, cell, other, t = conflict          # a moves cell -> other while b moves other -> cell
+                branches = [(a, ("move", cell, other, t)), (b, ("move", other, cell, t))]
+            for agent, constraint in branches:
+                child = list(constraints)
+                child[agent] = child[agent] + (constraint,)
+                cells, cost = self.lowLevel(agent, child[agent])
+                if cells is None:
+                    continue
+                childPlans = list(plans)
+                childPlans[agent] = (cells, cost)
+                heapq.heappush(open_heap, (total - plans[agent][1] + cost, next(order), child, childPlans))
+
+        fallback = CooperativeAStar(self.motion, horizon = max(self.horizon, 2 * (sg.height + sg.width)),
+                                    max_expansions = self.max_expansions)
+        paths = fallback.solve(grid, starts, goals)
+        self.stats.update(fallback.stats, nodes = self.stats["nodes"], optimal = False)
+        return paths
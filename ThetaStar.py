@@ -0,0 +1,237 @@
+import heapq
+import math
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+from core import SearchGrid, isCostMap, searchStats, traceLevel
+from costToGo import gridKey
+from AStar import AStarGraph
+
+
+# Line of sight between cell centres on the padded grid: the segment is clear when every cell it passes through is
+# free. Cells are found from where the segment crosses the grid lines (exact integer arithmetic, no sampling gaps).
+# Where it passes exactly through a lattice corner it goes diagonally from one cell to the next, like a diagonal move
+# in the other planners, so touching an obstacle's corner does not block it. Short segments are walked in Python
+# (NumPy's per-call cost dominates below vectorMin cells), longer ones are swept in one vectorised pass. Results are
+# kept in an LRU cache of cacheSize (a, b) pairs, and a segment is clear both ways, so (b, a) hits as well
+class LineOfSight:
+    def __init__(self, grid, cacheSize = 1 << 16, vectorMin = 24):
+        sg = SearchGrid(grid, ())
+        self.sg = sg
+        self.stride = sg.stride
+        self.size = sg.size
+        self.blocked = sg.blocked
+        self.blockedArray = np.frombuffer(sg.blocked, dtype=np.uint8)
+        self.cacheSize = cacheSize
+        self.vectorMin = vectorMin
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def index(self, cell):
+        return self.sg.index(cell)
+
+    def clear(self, a, b):                                  # Flat indices a and b
+        key = a * self.size + b if a < b else b * self.size + a
+        cache = self.cache
+        result = cache.get(key)
+        if result is not None:
+            self.hits += 1
+            cache.move_to_end(key)
+            return result
+        self.misses += 1
+        ay, ax = divmod(a, self.stride)
+        by, bx = divmod(b, self.stride)
+        if max(abs(by - ay), abs(bx - ax)) < self.vectorMin:
+            result = self.walk(ay, ax, by - ay, bx - ax)
+        else:
+            result = self.sweep(ay, ax, by - ay, bx - ax)
+        cache[key] = result
+        if len(cache) > self.cacheSize:
+            cache.popitem(last=False)
+        return result
+
+    def walk(self, ay, ax, dy, dx):
+        blocked, stride = self.blocked, self.stride
+        ady, adx = abs(dy), abs(dx)
+        sy, sx = (dy > 0) - (dy < 0), (dx > 0) - (dx < 0)
+        for k in range(adx):                                # Crossing the k-th column boundary at height num / den
+            num, den = 2 * ay * adx + dy * (2 * k + 1), 2 * adx
+            up, down = -((adx - num) // den), (num + adx) // den    # ceil(y - 1/2), floor(y + 1/2): equal unless at a corner
+            before, after = (up, down) if sy > 0 else (down, up)
+            column = ax + sx * k
+            if blocked[before * stride + column] or blocked[after * stride + column + sx]:
+                return False
+        for k in range(ady):                                # Same for the row boundaries
+            num, den = 2 * ax * ady + dx * (2 * k + 1), 2 * ady
+            left, right = -((ady - num) // den), (num + ady) // den
+            before, after = (left, right) if sx > 0 else (right, left)
+            row = ay + sy * k
+            if blocked[row * stride + before] or blocked[(row + sy) * stride + after]:
+                return False
+        return True
+
+    def sweep(self, ay, ax, dy, dx):                        # walk() with every crossing computed at once
+        stride = self.stride
+        ady, adx = abs(dy), abs(dx)
+        sy, sx = (dy > 0) - (dy < 0), (dx > 0) - (dx < 0)
+        cells = []
+        if adx:
+            k = np.arange(adx, dtype=np.int64)
+            num, den = 2 * ay * adx + dy * (2 * k + 1), 2 * adx
+            up, down = -((adx - num) // den), (num + adx) // den
+            before, after = (up, down) if sy > 0 else (down, up)
+            column = ax + sx * k
+            cells += [before * stride + column, after * stride + column + sx]
+        if ady:
+            k = np.arange(ady, dtype=np.int64)
+            num, den = 2 * ax * ady + dx * (2 * k + 1), 2 * ady
+            left, right = -((ady - num) // den), (num + ady) // den
+            before, after = (left, right) if sx > 0 else (right, left)
+            row = ay + sy * k
+            cells += [row * stride + before, (row + sy) * stride + after]
+        return not self.blockedArray[np.concatenate(cells)].any()
+
+
+# Theta* (Nash et al. 2007): A* whose nodes may take their parent's parent as parent when it is in line of sight,
+# so paths are chains of any-angle segments between cell centres instead of 8-connected zig-zags. The returned path
+# lists only the turning points; pathCost gives its Euclidean length. Any-angle segments need diagonal moves and
+# uniform cells, so 4-directional motion and cost maps fall back to AStarGraph. The line-of-sight cache is kept
+# between calls on the same grid contents
+class ThetaStarGraph:
+    def __init__(self, motion, instrument = False, cacheSize = 1 << 16):
+        self.motion = motion
+        self.diagonal = (1,1) in motion
+        self.instrument = instrument                # Fill self.stats with per-run counters (see core.searchStats)
+        self.cacheSize = cacheSize
+        self.stats = {}
+        self.los = None
+        self.losKey = None
+
+    def lineOfSight(self, grid):
+        key = gridKey(grid)
+        if key != self.losKey:
+            self.los = LineOfSight(grid, self.cacheSize)
+            self.losKey = key
+        return self.los
+
+    def traversal(self, grid, start, goal, trace = None):
+        if not self.diagonal or isCostMap(grid):
+            fallback = AStarGraph(self.motion, self.instrument)
+            result = fallback.traversal(grid, start, goal, trace)
+            self.stats = fallback.stats
+            return result
+
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        neighbours = sg.neighbours
+        stride = sg.stride
+        source, target = sg.index(start), sg.index(goal)
+        goalY, goalX = divmod(target, stride)
+        los = self.lineOfSight(grid)
+        clear = los.clear
+        hits, misses = los.hits, los.misses
+        level = traceLevel(trace)
+        counting = level or self.instrument
+
+        open_heap = [(math.hypot(goalY - source // stride, goalX - source % stride), 0, source)]
+        came_from = sg.parents()
+        gScore = sg.gScores()
+        gScore[source] = 0
+        closed = sg.flags()
+        visitedOrder = array('i')
+        expansions = 0
+        pops = peak = 0
+        pruned = 0
+
+        if start == goal:                           # Immediate check for start equals goal
+            if self.instrument:
+                self.stats = searchStats(0, (0, 0, 0), stale_pops = 0, pruned = 0, los_checks = 0, los_cache_hits = 0)
+            return sg.result(trace, [start], closed, visitedOrder, 0)
+
+        path = None
+        while open_heap:
+            if counting and len(open_heap) > peak:
+                peak = len(open_heap)
+            f, g, current = heapq.heappop(open_heap)
+            pops += 1
+            if closed[current]:
+                continue
+            closed[current] = 1
+            expansions += 1
+            if level == 2:
+                visitedOrder.append(current)
+
+            if current == target:
+                path = sg.path(came_from, current)
+                break
+
+            parent = came_from[current]
+            if parent != -1:
+                py, px = divmod(parent, stride)
+                parentG = gScore[parent]
+            for offset, step_cost in neighbours:
+                neighbour = current + offset
+                if blocked[neighbour] or closed[neighbour]:
+                    continue
+                ny, nx = divmod(neighbour, stride)
+                if parent != -1 and clear(parent, neighbour):     # Path 2: straight from the parent
+                    via, neighbourG = parent, parentG + math.hypot(ny - py, nx - px)
+                else:                                               # Path 1: an ordinary move, as in A*
+                    via, neighbourG = current, g + step_cost
+                if neighbourG >= gScore[neighbour]:
+                    pruned += 1
+                    continue
+                came_from[neighbour] = via
+                gScore[neighbour] = neighbourG
+                heapq.heappush(open_heap, (neighbourG + math.hypot(ny - goalY, nx - goalX), neighbourG, neighbour))
+
+        if self.instrument:
+            self.stats = searchStats(expansions, (pops, len(open_heap), peak), stale_pops = pops - expansions, pruned = pruned,
+                                     los_checks = los.hits + los.misses - hits - misses, los_cache_hits = los.hits - hits)
+        return sg.result(trace, path, closed, visitedOrder, expansions, (pops, len(open_heap), peak))
+
+
+def shortcutPath(grid, path, los = None):
+    # Greedy string pulling on any planner's path: from each kept cell, skip ahead to the last later cell still in line
+    # of sight. Returns the turning points. Never longer than the input on binary grids; on cost maps it only keeps the
+    # path clear of obstacles, not cheap. los: a LineOfSight for grid to share its cache between calls
+    if not path or len(path) < 3:
+        return path
+    los = los if los is not None else LineOfSight(grid)
+    nodes = [los.index(cell) for cell in path]
+    kept = [path[0]]
+    i = 0
+    last = len(nodes) - 1
+    while i < last:
+        j = i + 1
+        while j < last and los.clear(nodes[i], nodes[j + 1]):
+            j += 1
+        kept.append(path[j])
+        i = j
+    return kept
+
+
+# Any planner followed by shortcutPath, with the same traversal signature and return values (only the path changes)
+class ShortcutPlanner:
+    def __init__(self, planner):
+        self.planner = planner
+        self.motion = planner.motion
+        self.los = None
+        self.losKey = None
+
+    @property
+    def stats(self):
+        return getattr(self.planner, "stats", {})
+
+    def traversal(self, grid, start, goal, trace = None):
+        result = self.planner.traversal(grid, start, goal, trace)
+        if result[0] is None:
+            return result
+        key = gridKey(grid)
+        if key != self.losKey:
+            self.los = LineOfSight(grid)
+            self.losKey = key
+        return (shortcutPath(grid, result[0], self.los),) + tuple(result[1:])
@@ -1,122 +1,180 @@
 import heapq
-import math
+from array import array
+
+from core import SearchGrid, bidirectionalSearch, searchStats, traceLevel
+from queues import QUEUES, makeQueue
 
 # version of Uniform Cost Search adapted from A* implementation and https://www.geeksforgeeks.org/artificial-intelligence/uniform-cost-search-ucs-in-ai/
 class UCSGraph:
-    def __init__(self, motion):
+    def __init__(self, motion, instrument = False, queue = "heap"):
+        if queue not in QUEUES:
+            raise ValueError(f"queue must be one of {list(QUEUES)}")
         self.motion = motion
+        self.queue = queue                          # Open-set backend: "heap", "bucket" or "indexed" (see queues.py)
+        self.instrument = instrument                # Fill self.stats with per-run counters (see core.searchStats)
+        self.stats = {}
 
-    def traversal(self, grid, start, goal):
+    def traversal(self, grid, start, goal, trace = None):
         # No heuristic function needed for UCS
-
-        # Priority queue (gScore, (y, x))
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        cellMoves = sg.moves()                      # (offset, step cost) per cell: move length * the cell's multiplier
+        weighted = sg.weighted                      # Binary grids: cellMoves is just the neighbour list
+        source, target = sg.index(start), sg.index(goal)
+        level = traceLevel(trace)
+        counting = level or self.instrument         # Frontier peak (and tree unique cells) only tracked when someone reads them
+
+        # Priority queue (gScore, flat index)
         # Unlike A*, we only care about g (cost from start)
-        open_heap = []
-        heapq.heappush(open_heap, (0, start))
+        open_heap, push, pop = makeQueue(self.queue, sg)   # heapq by default
+        push(open_heap, (0, source))
 
-        came_from = {}
-        gScore = {start: 0}
+        came_from = sg.parents()
+        gScore = sg.gScores()
+        gScore[source] = 0
 
         # Track expanded nodes to prevent re-processing of nodes
-        closed = set()
-        visitedList = []                    # Order of visited nodes for visualisation
+        closed = sg.flags()
+        visitedOrder = array('i')           # Order of visited nodes for visualisation (full trace only)
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
+        pruned = 0                                  # Relaxations rejected as no cheaper than the known gScore
 
         if start == goal:                   # Immediate check for start equals goal
-            return [start], closed, visitedList
+            if self.instrument:
+                self.stats = searchStats(0, (0, 0, 0), stale_pops = 0, pruned = 0)
+            return sg.result(trace, [start], closed, visitedOrder, 0)
 
+        path = None
         while open_heap:
+            if counting and len(open_heap) > peak:
+                peak = len(open_heap)
             # Pop the node with the lowest cumulative cost (g)
-            g, current = heapq.heappop(open_heap)
+            g, current = pop(open_heap)
+            pops += 1
 
             # If we have already finalised this node, skip it
-            if current in closed:
+            if closed[current]:
                 continue
 
-            closed.add(current)
-            visitedList.append(current)
+            closed[current] = 1
+            expansions += 1
+            if level == 2:
+                visitedOrder.append(current)
+
+            if current == target:              # Reconstruct path back to start (for visualisation) if goal reached
+                path = sg.path(came_from, current)
+                break
+
+            for offset, step_cost in (cellMoves[current] if weighted else cellMoves):  # Explore neighbours for each direction (4 or 8 depending on motion mode)
+                neighbour = current + offset
 
-            if current == goal:                # Reconstruct path back to start (for visualisation) if goal reached
-                path = [current]
-                while path[-1] in came_from:
-                    path.append(came_from[path[-1]])
-                path.reverse()
-                return path, closed, visitedList
+                if blocked[neighbour]:        # Obstacle check (padding covers the bounds)
+                    continue
 
-            y, x = current
-            for dy, dx in self.motion:        # Explore neighbours for each direction (4 or 8 depending on motion mode)
-                ny, nx = y + dy, x + dx
+                # Calculate cost to move to neighbour
+                neighbourG = g + step_cost
 
-                if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1]:
-                    if grid[ny, nx] != 0:     # Obstacle check
-                        continue
+                # Only a new path or a shorter path to neighbour is pushed
+                if neighbourG >= gScore[neighbour]:
+                    pruned += 1
+                    continue
 
-                    neighbour = (ny, nx)
-                    
-                    # Calculate cost to move to neighbour
-                    step_cost = math.hypot(dy, dx)
-                    neighbourG = g + step_cost
+                came_from[neighbour] = current
+                gScore[neighbour] = neighbourG
+                push(open_heap, (neighbourG, neighbour))
 
-                    # If this is a new path or a shorter path to neighbour
-                    if neighbour not in gScore or neighbourG < gScore[neighbour]:
-                        came_from[neighbour] = current
-                        gScore[neighbour] = neighbourG
-                        heapq.heappush(open_heap, (neighbourG, neighbour))
+        if self.instrument:                 # Every pop that did not expand was a stale entry for a closed cell
+            self.stats = searchStats(expansions, (pops, len(open_heap), peak), stale_pops = pops - expansions, pruned = pruned)
+        return sg.result(trace, path, closed, visitedOrder, expansions, (pops, len(open_heap), peak))
 
-        return None, closed, visitedList
-    
 
 
 class UCSTree:
-    def __init__(self, motion):
+    def __init__(self, motion, instrument = False):
         self.motion = motion
-
-    def traversal(self, grid, start, goal):
-        
-        # Priority queue: (g_score, (y, x))
+        self.instrument = instrument
+        self.stats = {}
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+        blocked = sg.blocked
+        cellMoves = sg.moves()
+        weighted = sg.weighted
+        source, target = sg.index(start), sg.index(goal)
+        level = traceLevel(trace)
+        counting = level or self.instrument         # Frontier peak (and tree unique cells) only tracked when someone reads them
+
+        # Priority queue: (g_score, flat index)
         open_heap = []
-        heapq.heappush(open_heap, (0, start))
+        heapq.heappush(open_heap, (0, source))
 
-        came_from = {}
-        gScore = {start: 0}
+        came_from = sg.parents()
+        gScore = sg.gScores()
+        gScore[source] = 0
 
         # No closed set for tree search
-        expanded_unique = set()
-        visitedList = []
+        expanded_unique = sg.flags()
+        visitedOrder = array('i')
+        expansions = 0
+        pops = peak = 0                             # Frontier pops and peak size (checked before each pop, when traced)
+        pruned = 0                                  # Relaxations rejected as no cheaper than the known gScore
 
         if start == goal:                   # Immediate check for start equals goal
-            return [start], expanded_unique, visitedList
+            if self.instrument:
+                self.stats = searchStats(0, (0, 0, 0), pruned = 0, unique = 0, reexpansions = 0)
+            return sg.result(trace, [start], expanded_unique, visitedOrder, 0)
 
+        path = None
         while open_heap:
+            if counting and len(open_heap) > peak:
+                peak = len(open_heap)
             g, current = heapq.heappop(open_heap)
-            
-            expanded_unique.add(current)
-            visitedList.append(current)
-
-            if current == goal:                         # Reconstruct path back to start (for visualisation) if goal reached
-                path = [current]
-                while path[-1] in came_from:
-                    path.append(came_from[path[-1]])
-                path.reverse()
-                return path, expanded_unique, visitedList
-
-            y, x = current
-            for dy, dx in self.motion:
-                ny, nx = y + dy, x + dx
-
-                if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1]:  # Check bounds
-                    if grid[ny, nx] != 0:               # Obstacle check
-                        continue
-
-                    neighbour = (ny, nx)                
-                    step_cost = math.hypot(dy, dx)
-                    neighbourG = g + step_cost
-
-                    # If we found a cheaper path to the neighbour ealier, don't add it (avoids cyclic loops)
-                    if neighbour in gScore and neighbourG >= gScore[neighbour]:
-                        continue
-
-                    came_from[neighbour] = current      # Record best path to neighbour
-                    gScore[neighbour] = neighbourG
-                    heapq.heappush(open_heap, (neighbourG, neighbour))
-
-        return None, expanded_unique, visitedList
\ No newline at end of file
+            pops += 1
+
+            expansions += 1
+            if counting:                                # Unique cells for a counts trace, plus the order for a full one
+                expanded_unique[current] = 1
+                if level == 2:
+                    visitedOrder.append(current)
+
+            if current == target:                       # Reconstruct path back to start (for visualisation) if goal reached
+                path = sg.path(came_from, current)
+                break
+
+            for offset, step_cost in (cellMoves[current] if weighted else cellMoves):
+                neighbour = current + offset
+
+                if blocked[neighbour]:                  # Obstacle check (padding covers the bounds)
+                    continue
+
+                neighbourG = g + step_cost
+
+                # If we found a cheaper path to the neighbour ealier, don't add it (avoids cyclic loops)
+                if neighbourG >= gScore[neighbour]:
+                    pruned += 1
+                    continue
+
+                came_from[neighbour] = current      # Record best path to neighbour
+                gScore[neighbour] = neighbourG
+                heapq.heappush(open_heap, (neighbourG, neighbour))
+
+        if self.instrument:                 # Re-expansions are what a closed set would have saved
+            unique = expanded_unique.count(1)
+            self.stats = searchStats(expansions, (pops, len(open_heap), peak), pruned = pruned, unique = unique,
+                                     reexpansions = expansions - unique)
+        return sg.result(trace, path, expanded_unique, visitedOrder, expansions, (pops, len(open_heap), peak))
+
+
+# Bidirectional Dijkstra: expands from start and goal and stops once the two cheapest frontiers add up to the best meeting cost
+class UCSBidirectional:
+    def __init__(self, motion):
+        self.motion = motion
+
+    def traversal(self, grid, start, goal, trace = None):
+        sg = SearchGrid(grid, self.motion)
+
+        if start == goal:                   # Immediate check for start equals goal
+            return sg.result(trace, [start], sg.flags(), array('i'), 0)
+
+        return bidirectionalSearch(sg, sg.index(start), sg.index(goal), trace = trace)
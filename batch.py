@@ -0,0 +1,203 @@
+import heapq
+import math
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core import SearchGrid, isCostMap, labelComponents
+
+
+# Compact result of plan_many: every path's cells back to back in one (total, 2) int32 array, split by offsets.
+# Pair i's path is cells[offsets[i]:offsets[i + 1]]; unreachable pairs have an empty slice and an infinite cost
+class PathBatch:
+    def __init__(self, cells, offsets, costs):
+        self.cells = cells
+        self.offsets = offsets
+        self.costs = costs
+
+    @classmethod
+    def fromPaths(cls, paths, grid = None):                 # paths: list of (k, 2) int arrays, or None where no path exists
+        lengths = np.array([0 if p is None else len(p) for p in paths], dtype=np.int64)
+        offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        found = [p for p in paths if p is not None]
+        cells = np.concatenate(found).astype(np.int32) if found else np.zeros((0, 2), dtype=np.int32)
+
+        # Path costs from the cells themselves: every step costs its Euclidean length (1 or sqrt 2), times the
+        # multiplier of the cell it leaves on cost maps (as core.pathCost)
+        steps = np.zeros(len(cells))
+        if len(cells) > 1:
+            delta = np.diff(cells, axis=0)
+            steps[1:] = np.hypot(delta[:, 0], delta[:, 1])
+            if grid is not None and isCostMap(grid):
+                steps[1:] *= np.asarray(grid)[cells[:-1, 0], cells[:-1, 1]]
+        steps[offsets[:-1][lengths > 0]] = 0                # No step into the first cell of a path
+        costs = np.full(len(paths), np.inf)
+        nonEmpty = lengths > 0
+        costs[nonEmpty] = np.add.reduceat(steps, offsets[:-1][nonEmpty]) if len(cells) else 0
+        return cls(cells, offsets, costs)
+
+    @property
+    def found(self):
+        return np.isfinite(self.costs)
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.costs)
+
+    def __getitem__(self, i):                               # (k, 2) view of pair i's path, or None
+        if not np.isfinite(self.costs[i]):
+            return None
+        return self.cells[self.offsets[i]:self.offsets[i + 1]]
+
+    def tolist(self):                                       # Same shape as traversal paths: lists of (y, x) tuples
+        return [None if p is None else list(map(tuple, p.tolist())) for p in (self[i] for i in range(len(self)))]
+
+
+def searchFrom(sg, root, targets, backward = False, heuristic = False):
+    # Dijkstra from root until every target is settled; with a single target and heuristic=True this is A*.
+    # Forward, parents point back towards root. Backward (root is a shared goal) it follows moves in reverse,
+    # so parents are next hops towards root. Callers only pass targets in root's component.
+    # On cost maps a step costs the multiplier of the cell it leaves: the current cell forwards, the predecessor backwards
+    blocked = sg.blocked
+    cellMoves = sg.moves()
+    weighted = sg.weighted
+    backMoves = [(-offset, step_cost) for offset, step_cost in sg.neighbours]
+    weights = sg.weights() if backward and sg.weighted else None
+    stride = sg.stride
+
+    parents = sg.parents()
+    gScore = sg.gScores()
+    closed = sg.flags()
+    isTarget = sg.flags()
+    remaining = 0
+    for t in targets:
+        if not isTarget[t]:
+            isTarget[t] = 1
+            remaining += 1
+
+    aStar = heuristic and remaining == 1
+    if aStar:
+        goalY, goalX = divmod(targets[0], stride)
+        diagonal = any(step_cost > 1 for _, step_cost in sg.neighbours)
+        scale = sg.minWeight                                # Keeps the heuristic admissible on cost maps
+
+    gScore[root] = 0
+    open_heap = [(0, 0, root)]
+    while open_heap and remaining:
+        f, g, current = heapq.heappop(open_heap)
+        if closed[current]:
+            continue
+        closed[current] = 1
+        if isTarget[current]:
+            remaining -= 1
+
+        for offset, step_cost in (backMoves if backward else cellMoves[current] if weighted else cellMoves):
+            n = current + offset
+            if blocked[n] or closed[n]:
+                continue
+            if weights is not None:
+                step_cost *= weights[n]
+            nG = g + step_cost
+            if nG < gScore[n]:
+                gScore[n] = nG
+                parents[n] = current
+                if aStar:
+                    ny, nx = divmod(n, stride)
+                    dy, dx = abs(ny - goalY), abs(nx - goalX)
+                    heapq.heappush(open_heap, (nG + (math.hypot(dy, dx) if diagonal else dy + dx) * scale, nG, n))
+                else:
+                    heapq.heappush(open_heap, (nG, nG, n))
+    return parents
+
+
+def chain(parents, n):                                      # Flat indices from n along parent pointers to the root
+    path = [n]
+    while parents[path[-1]] != -1:
+        path.append(parents[path[-1]])
+    return path
+
+
+def solveTasks(grid, motion, algorithm, tasks, sg = None):
+    # tasks: (kind, root, others). kind "start": root is a shared start and others are goals; "goal": root is a shared
+    # goal and others are starts; "pair": a single start -> goal. Returns one list of (k, 2) paths per task, in order
+    sg = sg if sg is not None else SearchGrid(grid, motion)
+    heuristic = algorithm == "astar"
+    results = []
+    for kind, root, others in tasks:
+        backward = kind == "goal"
+        parents = searchFrom(sg, root, others, backward = backward, heuristic = heuristic)
+        paths = []
+        for n in others:
+            path = chain(parents, n)
+            if not backward:
+                path.reverse()                              # Forward chains run goal -> start
+            ys, xs = np.divmod(np.array(path, dtype=np.int32), sg.stride)
+            paths.append(np.stack((ys - 1, xs - 1), axis=1))
+        results.append(paths)
+    return results
+
+
+def plan_many(grid, pairs, algorithm = "astar", motion = None, workers = 1, minGroup = None, labels = None):
+    # Plans every (start, goal) pair on one grid. Per-grid work (padded grid, neighbour table, component labels) is
+    # done once; pairs in different components are answered from the labels without searching. Pairs sharing a start
+    # or goal (at least minGroup of them) are solved by one multi-target Dijkstra, and the remaining pairs by A*
+    # ("astar") or Dijkstra ("ucs"). workers > 1 spreads the searches over that many processes
+    if algorithm not in ("astar", "ucs"):
+        raise ValueError("algorithm must be 'astar' or 'ucs'")
+    if minGroup is None:                                    # A grouped Dijkstra only beats separate A* runs for larger groups
+        minGroup = 8 if algorithm == "astar" else 2
+    if motion is None:
+        motion = [(-1, 0), (0, 1), (1, 0), (0, -1)]
+    grid = np.asarray(grid)
+    sg = SearchGrid(grid, motion)
+    labels = labelComponents(grid, motion) if labels is None else labels
+
+    paths = [None] * len(pairs)
+    todo = []
+    for i, (start, goal) in enumerate(pairs):
+        start, goal = (int(start[0]), int(start[1])), (int(goal[0]), int(goal[1]))
+        if labels[start] < 0 or labels[start] != labels[goal]:
+            continue                                        # Blocked endpoint or different components: no path
+        if start == goal:
+            paths[i] = np.array([start], dtype=np.int32)
+            continue
+        todo.append((i, sg.index(start), sg.index(goal)))
+
+    # Greedily take the most shared endpoint first; what is left over becomes single-pair tasks
+    byEndpoint = defaultdict(list)
+    for i, source, target in todo:
+        byEndpoint["start", source].append((i, target))
+        byEndpoint["goal", target].append((i, source))
+    assigned = set()
+    tasks, owners = [], []
+    for (kind, root), members in sorted(byEndpoint.items(), key = lambda item: -len(item[1])):
+        members = [(i, other) for i, other in members if i not in assigned]
+        if len(members) < minGroup:
+            continue
+        assigned.update(i for i, _ in members)
+        tasks.append((kind, root, [other for _, other in members]))
+        owners.append([i for i, _ in members])
+    for i, source, target in todo:
+        if i not in assigned:
+            tasks.append(("pair", source, [target]))
+            owners.append([i])
+
+    if workers > 1 and len(tasks) > 1:
+        workers = min(workers, len(tasks))
+        with ProcessPoolExecutor(max_workers = workers) as pool:  # Round-robin chunks keep big groups spread out
+            futures = [(owners[w::workers], pool.submit(solveTasks, grid, motion, algorithm, tasks[w::workers]))
+                       for w in range(workers)]
+            solved = [(chunkOwners, future.result()) for chunkOwners, future in futures]
+    else:
+        solved = [(owners, solveTasks(grid, motion, algorithm, tasks, sg))]
+
+    for chunkOwners, chunkPaths in solved:
+        for members, found in zip(chunkOwners, chunkPaths):
+            for i, path in zip(members, found):
+                paths[i] = path
+    return PathBatch.fromPaths(paths, grid)
@@ -0,0 +1,223 @@
+import argparse
+import itertools
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Import algorithms
+from BFS import BFSGraph, BFSTree
+from DFS import DFSGraph, DFSTree
+from AStar import AStarGraph, AStarTree
+from UCS import UCSGraph, UCSTree
+from ThetaStar import ShortcutPlanner, ThetaStarGraph
+from core import pathCost, pathLength
+from env import defaultDistance, setUpEnv, getMotion
+from queues import QUEUES
+
+
+PLANNERS = {
+    "BFS Graph": BFSGraph,
+    "BFS Tree": BFSTree,
+    "DFS Graph": DFSGraph,
+    "DFS Tree": DFSTree,
+    "A* Graph": AStarGraph,
+    "ALT A* Graph": lambda motion, queue = "heap": AStarGraph(motion, queue = queue, landmarks = 8),   # Index built during warmup
+    "A* Tree": AStarTree,
+    "UCS Graph": UCSGraph,
+    "UCS Tree": UCSTree,
+    "Theta* Graph": ThetaStarGraph,
+    "A* + shortcut": lambda motion: ShortcutPlanner(AStarGraph(motion)),   # A* then shortcutPath, timed together
+}
+TREE_PLANNERS = {"BFS Tree", "DFS Tree", "A* Tree", "UCS Tree"}      # Exponential on open maps; capped by --tree-max-size
+QUEUE_PLANNERS = {"A* Graph", "ALT A* Graph", "UCS Graph"}           # Take a queue backend; see queues.py
+
+# Two-sided 95% Student t critical values by degrees of freedom (1.96 beyond the table)
+T95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+       12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980}
+
+
+def tCritical(df):
+    if df < 1:
+        return math.inf
+    known = [d for d in T95 if d <= df]
+    return T95[max(known)] if df <= 120 else 1.96          # Rounding df down keeps the interval conservative
+
+
+def summarise(samples):                                     # Mean with a 95% confidence interval, all in the samples' unit
+    n = len(samples)
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if n > 1 else 0.0
+    half = tCritical(n - 1) * stdev / math.sqrt(n) if n > 1 else math.inf
+    return {"n": n, "mean": mean, "stdev": stdev, "ci_low": mean - half, "ci_high": mean + half,
+            "median": statistics.median(samples), "min": min(samples)}
+
+
+def scenarioKey(size, prob, direction):
+    return f"{size}x{size} p={prob:g} {direction}-way"
+
+
+def makeMaps(size, prob, direction, count, seed, distance = None):
+    # Same seeds for the same scenario, so a baseline and a later comparison run time identical maps. The start-goal
+    # distance is always passed explicitly (env.defaultDistance of the size when None), so no config file in the
+    # working directory changes the maps
+    seeds = np.random.SeedSequence([seed, size, int(round(prob * 1000)), direction]).spawn(count)
+    motion = getMotion(direction)
+    if distance is None:
+        distance = defaultDistance(size, size)
+    return [setUpEnv(size, size, prob, seed=s, reachable=True, motion=motion, distance=distance) for s in seeds]
+
+
+def measure(planner, grid, start, goal, warmup, repeats, minSampleNs = 5_000_000):
+    # Timing runs use trace="off" so only the search itself is measured; memory and counters get their own runs,
+    # since tracemalloc and the counters would otherwise distort the clock.
+    # Like timeit's autorange, fast searches are looped so each sample lasts at least minSampleNs, and the
+    # sample is the per-call average; single sub-millisecond calls are mostly scheduler noise
+    for _ in range(warmup):
+        planner.traversal(grid, start, goal, trace="off")
+    loops = 1
+    while True:
+        begin = time.perf_counter_ns()
+        for _ in range(loops):
+            planner.traversal(grid, start, goal, trace="off")
+        if time.perf_counter_ns() - begin >= minSampleNs:
+            break
+        loops *= 2
+    times = []
+    for _ in range(repeats):
+        begin = time.perf_counter_ns()
+        for _ in range(loops):
+            planner.traversal(grid, start, goal, trace="off")
+        times.append((time.perf_counter_ns() - begin) / loops)
+
+    tracemalloc.start()
+    planner.traversal(grid, start, goal, trace="off")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    path, trace = planner.traversal(grid, start, goal, trace="counts")
+    return times, peak, trace.stats(), path
+
+
+def runSuite(sizes, probs, directions, planners, maps = 3, warmup = 1, repeats = 5, seed = 0, treeMaxSize = 16,
+             minSampleMs = 5, queues = ("heap",), distance = None, progress = print):
+    results = {}
+    for size, prob, direction in itertools.product(sizes, probs, directions):
+        scenario = scenarioKey(size, prob, direction)
+        grids = makeMaps(size, prob, direction, maps, seed, distance)
+        motion = getMotion(direction)
+        runs = [(name, queue) for name in planners for queue in (queues if name in QUEUE_PLANNERS else ["heap"])]
+        for name, queue in runs:
+            if name in TREE_PLANNERS and size > treeMaxSize:
+                continue
+            planner = PLANNERS[name](motion) if queue == "heap" else PLANNERS[name](motion, queue = queue)
+            label = name if queue == "heap" else f"{name} [{queue}]"
+            times, peaks, counters, lengths, costs = [], [], [], [], []
+            for grid, start, goal in grids:
+                t, peak, stats, path = measure(planner, grid, start, goal, warmup, repeats, minSampleMs * 1_000_000)
+                times += t
+                peaks.append(peak)
+                counters.append(stats)
+                lengths.append(pathLength(path))               # Cells, with any-angle segments expanded
+                costs.append(pathCost(grid, path) if path else 0.0)
+            entry = {
+                "scenario": scenario, "planner": label, "queue": queue,
+                "time_ns": summarise(times),
+                "peak_bytes": max(peaks),
+                "path_length": statistics.fmean(lengths),
+                "path_cost": statistics.fmean(costs),       # Euclidean length on these binary maps
+            }
+            for counter in counters[0]:                     # Mean per map of expansions, pushes, pops, max frontier, ...
+                entry[counter] = statistics.fmean(c[counter] for c in counters)
+            entry["throughput"] = entry["expansions"] / (entry["time_ns"]["mean"] / 1e9)   # Expansions per second
+            results[f"{scenario} | {label}"] = entry
+            if progress:
+                progress(formatRow(entry))
+    return results
+
+
+def formatRow(entry):
+    t = entry["time_ns"]
+    half = (t["ci_high"] - t["mean"]) / 1e6
+    return (f"{entry['scenario']:<20} {entry['planner']:<20} {t['mean'] / 1e6:9.3f} ms ± {half:7.3f}"
+            f"  peak {entry['peak_bytes'] / 1024:9.1f} KiB  expanded {entry['expansions']:10.0f}"
+            f"  push {entry['pushes']:10.0f}  pop {entry['pops']:10.0f}  frontier {entry['max_frontier']:8.0f}"
+            f"  {entry['throughput'] / 1000:8.1f} kexp/s  cost {entry.get('path_cost', math.nan):8.2f}")
+
+
+def compare(baseline, current, threshold):
+    # A time regression needs both a mean slowdown beyond threshold and non-overlapping confidence intervals,
+    # so noise on a quiet machine is not reported; peak memory only has the threshold
+    flagged = []
+    for key, now in current.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        tb, tn = before["time_ns"], now["time_ns"]
+        ratio = tn["mean"] / tb["mean"] if tb["mean"] else math.inf
+        if ratio > 1 + threshold and tn["ci_low"] > tb["ci_high"]:
+            flagged.append((key, "time", ratio))
+        memory = now["peak_bytes"] / before["peak_bytes"] if before["peak_bytes"] else math.inf
+        if memory > 1 + threshold:
+            flagged.append((key, "memory", memory))
+        if now["expansions"] != before["expansions"]:
+            flagged.append((key, "expansions", now["expansions"] / max(before["expansions"], 1)))
+    return flagged
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the grid planners with repeated, statistically summarised runs")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [16, 64])
+    parser.add_argument("--probs", type = float, nargs = "+", default = [0.2])
+    parser.add_argument("--motions", type = int, nargs = "+", default = [4, 8], choices = [4, 8])
+    parser.add_argument("--planners", nargs = "+", default = list(PLANNERS), choices = list(PLANNERS))
+    parser.add_argument("--queues", nargs = "+", default = ["heap"], choices = list(QUEUES),
+                        help = "queue backends to run A* Graph and UCS Graph with")
+    parser.add_argument("--maps", type = int, default = 3, help = "maps per scenario")
+    parser.add_argument("--warmup", type = int, default = 1)
+    parser.add_argument("--repeats", type = int, default = 5, help = "timed runs per map")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--distance", type = float, help = "smallest start-goal Manhattan distance (default: half the map size)")
+    parser.add_argument("--min-sample-ms", type = float, default = 5, help = "loop fast searches until a sample lasts this long")
+    parser.add_argument("--tree-max-size", type = int, default = 16, help = "largest map the tree planners run on")
+    parser.add_argument("--save", metavar = "FILE", help = "write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar = "FILE", help = "rerun a baseline's scenarios and flag regressions")
+    parser.add_argument("--threshold", type = float, default = 0.10, help = "relative slowdown / growth to flag")
+    args = parser.parse_args(argv)
+
+    settings = {"sizes": args.sizes, "probs": args.probs, "directions": args.motions, "planners": args.planners,
+                "maps": args.maps, "warmup": args.warmup, "repeats": args.repeats, "seed": args.seed,
+                "treeMaxSize": args.tree_max_size, "minSampleMs": args.min_sample_ms, "queues": args.queues,
+                "distance": args.distance}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        settings = baseline["settings"]                     # Same scenarios, maps and run counts as the baseline
+
+    results = runSuite(**settings)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"settings": settings, "python": sys.version, "platform": platform.platform(),
+                       "created": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}, file, indent = 1)
+        print(f"Saved baseline to {args.save}")
+
+    if baseline is not None:
+        flagged = compare(baseline["results"], results, args.threshold)
+        for key, metric, ratio in flagged:
+            print(f"REGRESSION {key}: {metric} x{ratio:.2f}" if metric != "expansions"
+                  else f"CHANGED    {key}: expansions x{ratio:.2f}")
+        regressions = [f for f in flagged if f[1] != "expansions"]
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%} against {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+import heapq
+import math
+from array import array
+
+import numpy as np
+
+
+TRACE_LEVELS = {"off": 0, "counts": 1, "full": 2}
+
+# Grids are either binary (non-zero = obstacle) or float32 cost maps: each cell holds the multiplier applied to the
+# length of a step out of it (slow zones > 1, preferred lanes < 1) and IMPASSABLE where it cannot be entered
+IMPASSABLE = np.float32(np.inf)
+
+
+def isCostMap(grid):
+    return np.asarray(grid).dtype == np.float32
+
+
+def freeMask(grid):                                         # Boolean (H, W) array of the cells that can be entered
+    grid = np.asarray(grid)
+    if grid.dtype != np.float32:
+        return grid == 0
+    free = np.isfinite(grid)
+    if np.isnan(grid).any() or (grid[free] <= 0).any():
+        raise ValueError("cost map values must be positive multipliers or IMPASSABLE")
+    return free
+
+
+def pathCost(grid, path):                                   # Sum of step length * multiplier of the cell left
+    if not path:
+        return math.inf
+    cells = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+    steps = np.hypot(*np.diff(cells, axis=0).T)
+    if isCostMap(grid):
+        steps = steps * np.asarray(grid)[cells[:-1, 0], cells[:-1, 1]]
+    return float(steps.sum())
+
+
+def pathLength(path):                                       # Cells on the path, in the same unit for every planner:
+    # any-angle segments (Theta*, shortcutPath) count as the 8-connected steps they span
+    if not path:
+        return 0
+    cells = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+    return int(np.abs(np.diff(cells, axis=0)).max(axis=1, initial=0).sum()) + 1
+
+
+def traceLevel(trace):                                      # trace=None keeps the (path, visited set, visitedList) return
+    if trace is None:
+        return 2
+    if trace not in TRACE_LEVELS:
+        raise ValueError(f"trace must be one of {list(TRACE_LEVELS)} or None")
+    return TRACE_LEVELS[trace]
+
+
+# What a traversal recorded when called with trace="off" | "counts" | "full".
+# expansions = nodes taken off the frontier (len(visitedList) before), unique = distinct cells flagged (len(visited)),
+# pops / pushes / maxFrontier = frontier traffic, including stale entries (counts and full),
+# order = the expansion order as an int32 array of flat padded indices (full only)
+class Trace:
+    def __init__(self, level, stride, expansions = 0, unique = 0, order = None, pops = 0, pushes = 0, maxFrontier = 0):
+        self.level = level
+        self.stride = stride
+        self.expansions = expansions
+        self.unique = unique
+        self.order = order
+        self.pops = pops
+        self.pushes = pushes
+        self.maxFrontier = maxFrontier
+
+    def stats(self):                                        # Plain dict of the counters, for tables and CSV rows
+        return {"expansions": self.expansions, "unique": self.unique, "pops": self.pops,
+                "pushes": self.pushes, "max_frontier": self.maxFrontier}
+
+    def cells(self):                                        # (k, 2) int32 array of (y, x) in expansion order
+        if self.order is None:
+            return np.zeros((0, 2), dtype=np.int32)
+        ys, xs = np.divmod(self.order, self.stride)
+        return np.stack((ys - 1, xs - 1), axis=1)
+
+
+# Per-run counters a planner built with instrument=True leaves in planner.stats. frontier is the same
+# (pops, entries left, peak) triple SearchGrid.result takes; planners add their own counters, e.g.
+# stale_pops (popped after the cell was closed), pruned (relaxations rejected because they were no cheaper),
+# reexpansions (tree searches expanding a cell again)
+def searchStats(expansions, frontier, **counters):
+    pops, left, peak = frontier
+    stats = {"expansions": expansions, "pops": pops, "pushes": pops + left, "max_frontier": peak}
+    stats.update(counters)
+    return stats
+
+
+# Shared search core: cells are addressed by a flat index into a padded copy of the grid
+# (one wall cell all the way round), so neighbours are a single integer add and the bounds check disappears
+class SearchGrid:
+    def __init__(self, grid, motion):
+        grid = np.asarray(grid)
+        self.height, self.width = grid.shape
+        self.stride = self.width + 2                        # Row length of the padded grid
+
+        padded = np.ones((self.height + 2, self.stride), dtype=np.uint8)
+        padded[1:-1, 1:-1] = ~freeMask(grid)                # 1 = blocked (obstacle or padding)
+        self.blocked = padded.tobytes()                     # Indexing bytes is much cheaper than grid[ny, nx]
+        self.size = padded.size
+
+        # Cost maps: minWeight scales the distance heuristics so they stay admissible when some cells are cheaper than 1,
+        # and with maxWeight bounds the step costs (for the bucket queue)
+        self.weighted = grid.dtype == np.float32
+        self.costMap = grid if self.weighted else None
+        free = padded[1:-1, 1:-1] == 0
+        self.minWeight = float(grid[free].min()) if self.weighted and free.any() else 1.0
+        self.maxWeight = float(grid[free].max()) if self.weighted and free.any() else 1.0
+
+        self.motion = motion
+        self.offsets = [dy * self.stride + dx for dy, dx in motion]     # Flat index offset for each move
+        self.costs = [math.hypot(dy, dx) for dy, dx in motion]          # Step cost for each move
+        self.neighbours = list(zip(self.offsets, self.costs))
+
+    def index(self, cell):                                  # (y, x) -> flat index
+        return (int(cell[0]) + 1) * self.stride + int(cell[1]) + 1
+
+    def cell(self, idx):                                    # flat index -> (y, x)
+        y, x = divmod(idx, self.stride)
+        return (y - 1, x - 1)
+
+    # Preallocated buffers, one slot per padded cell
+    def gScores(self):
+        return array('d', [math.inf]) * self.size
+
+    def parents(self):
+        return array('i', [-1]) * self.size                 # int32, -1 = no parent
+
+    def flags(self):
+        return bytearray(self.size)
+
+    def weights(self):                                      # float32 step multiplier per cell: 1 on binary grids and padding
+        weights = np.ones((self.height + 2, self.stride), dtype=np.float32)
+        if self.weighted:
+            inner = self.costMap
+            weights[1:-1, 1:-1] = np.where(np.isfinite(inner), inner, 1)
+        return array('f', weights.tobytes())
+
+    def moves(self):
+        # Per cell, the (offset, step cost) list to expand it with: step length * the cell's multiplier. Cells with the
+        # same multiplier share one list, so the hot loops do one lookup per expansion rather than one per neighbour.
+        # Binary grids get self.neighbours itself (every cell would share it), so callers branch on sg.weighted:
+        #     for offset, step_cost in (cellMoves[current] if weighted else cellMoves):
+        if not self.weighted:
+            return self.neighbours
+        values, inverse = np.unique(np.frombuffer(self.weights(), dtype=np.float32), return_inverse=True)
+        tables = [[(offset, cost * w) for offset, cost in self.neighbours] for w in values.tolist()]
+        return list(map(tables.__getitem__, inverse.tolist()))
+
+    def path(self, came_from, idx):                         # Follow parent pointers back to the root
+        path = [idx]
+        while came_from[path[-1]] != -1:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return self.cells(path)
+
+    def branch(self, nodeCell, nodeParent, node):           # Tree-search node table: follow parent node ids back to the root
+        path = []
+        while node != -1:
+            path.append(nodeCell[node])
+            node = nodeParent[node]
+        path.reverse()
+        return self.cells(path)
+
+    def cells(self, indices):                               # Vectorised flat index -> (y, x) conversion
+        flat = np.asarray(indices, dtype=np.int64)
+        ys, xs = np.divmod(flat, self.stride)
+        return list(zip((ys - 1).tolist(), (xs - 1).tolist()))
+
+    def cellSet(self, flags):                               # Set of (y, x) for every flagged cell
+        return set(self.cells(np.flatnonzero(np.frombuffer(flags, dtype=np.uint8))))
+
+    def result(self, trace, path, flags, order, expansions, frontier = (0, 0, 0)):
+        # Legacy triple when trace is None, otherwise (path, Trace) holding only what the level asked for.
+        # frontier = (pops, entries left in the frontier, peak frontier size); every push is eventually popped or left
+        if trace is None:
+            return path, self.cellSet(flags), self.cells(order)
+        level = TRACE_LEVELS[trace]
+        unique = flags.count(1) if level else 0
+        order = np.frombuffer(order, dtype=np.int32) if level == 2 else None   # Zero-copy view of the array('i')
+        pops, left, peak = frontier if level else (0, 0, 0)
+        return path, Trace(trace, self.stride, expansions, unique, order, pops, pops + left, peak)
+
+    def joinPath(self, forward, backward, meetF, meetB):    # Forward chain to meetF, then backward chain from meetB to its root
+        path = self.path(forward, meetF)
+        path.append(self.cell(meetB))
+        current = meetB
+        while backward[current] != -1:
+            current = backward[current]
+            path.append(self.cell(current))
+        return path
+
+
+# Bidirectional Dijkstra / A* on the flat grid. With a heuristic, both sides use the average potentials
+# p_f = (h_f - h_b) / 2 and p_b = -p_f (Ikeda et al.), which keeps reduced costs non-negative, so the usual
+# meet-in-the-middle rule applies: stop once top_f + top_b >= mu, the cheapest meeting found so far.
+# On cost maps a step is charged the multiplier of the cell it leaves: the current cell going forwards, the
+# predecessor being reached going backwards. heuristic must already be scaled by sg.minWeight
+def bidirectionalSearch(sg, source, target, heuristic = None, trace = None):
+    blocked = sg.blocked
+    cellMoves = sg.moves()                                  # Forward steps out of each cell
+    weighted = sg.weighted
+    backMoves = [(-offset, step_cost) for offset, step_cost in sg.neighbours]
+    weights = sg.weights() if sg.weighted else None         # Backward steps still need the predecessor's multiplier
+    roots = (source, target)
+
+    def potential(side, n):
+        if heuristic is None:
+            return 0
+        p = (heuristic(n, target) - heuristic(n, source)) / 2
+        return p if side == 0 else -p
+
+    gScore = (sg.gScores(), sg.gScores())
+    came_from = (sg.parents(), sg.parents())                # Backward parents point towards the target
+    closed = (sg.flags(), sg.flags())
+    visitedOrder = array('i')                               # Expansions from both sides in the order they happened (full trace)
+    level = traceLevel(trace)
+    expansions = pops = peak = 0
+    open_heaps = ([], [])
+    for side in (0, 1):
+        gScore[side][roots[side]] = 0
+        heapq.heappush(open_heaps[side], (potential(side, roots[side]), 0, roots[side]))
+
+    best = math.inf
+    meet = None                                             # (last node on the forward half, first node on the backward half)
+
+    while open_heaps[0] and open_heaps[1]:
+        if open_heaps[0][0][0] + open_heaps[1][0][0] >= best:
+            break                                           # No unexplored meeting can beat the best one
+
+        side = 0 if len(open_heaps[0]) <= len(open_heaps[1]) else 1    # Grow the smaller frontier
+        other = 1 - side
+        if level and len(open_heaps[0]) + len(open_heaps[1]) > peak:
+            peak = len(open_heaps[0]) + len(open_heaps[1])
+        key, g, current = heapq.heappop(open_heaps[side])
+        pops += 1
+        if closed[side][current]:
+            continue
+        closed[side][current] = 1
+        expansions += 1
+        if level == 2:
+            visitedOrder.append(current)
+
+        ownG, otherG = gScore[side], gScore[other]
+        for offset, step_cost in (backMoves if side else cellMoves[current] if weighted else cellMoves):   # Backward: moves in reverse
+            neighbour = current + offset
+            if blocked[neighbour]:
+                continue
+            if side and weights is not None:
+                step_cost *= weights[neighbour]
+            neighbourG = g + step_cost
+
+            if otherG[neighbour] < math.inf and neighbourG + otherG[neighbour] < best:
+                best = neighbourG + otherG[neighbour]
+                meet = (current, neighbour) if side == 0 else (neighbour, current)
+
+            if closed[side][neighbour] or neighbourG >= ownG[neighbour]:
+                continue
+            came_from[side][neighbour] = current
+            ownG[neighbour] = neighbourG
+            key = neighbourG if heuristic is None else neighbourG + potential(side, neighbour)
+            heapq.heappush(open_heaps[side], (key, neighbourG, neighbour))
+
+    closedEither = None
+    if level:
+        closedEither = bytearray(np.frombuffer(closed[0], dtype=np.uint8) | np.frombuffer(closed[1], dtype=np.uint8))
+    path = sg.joinPath(came_from[0], came_from[1], *meet) if meet is not None else None
+    return sg.result(trace, path, closedEither, visitedOrder, expansions, (pops, len(open_heaps[0]) + len(open_heaps[1]), peak))
+
+
+# Connected components of the free cells under a motion model, as an int32 (H, W) array of component ids
+# (-1 on obstacles). Vectorised union-find: every round hooks the larger root of each still-split edge onto the
+# smaller one, then pointer-jumps until every cell points at its root
+def labelComponents(grid, motion):
+    free = freeMask(grid)
+    height, width = free.shape
+    ids = np.arange(height * width, dtype=np.int64).reshape(height, width)
+
+    us, vs = [], []
+    for dy, dx in motion:
+        if (-dy, -dx) in motion and (dy, dx) < (0, 0):     # Each undirected edge once
+            continue
+        ya, yb = max(0, -dy), height - max(0, dy)
+        xa, xb = max(0, -dx), width - max(0, dx)
+        both = free[ya:yb, xa:xb] & free[ya + dy:yb + dy, xa + dx:xb + dx]
+        us.append(ids[ya:yb, xa:xb][both])
+        vs.append(ids[ya + dy:yb + dy, xa + dx:xb + dx][both])
+    u = np.concatenate(us) if us else np.zeros(0, dtype=np.int64)
+    v = np.concatenate(vs) if vs else np.zeros(0, dtype=np.int64)
+
+    parent = ids.ravel().copy()
+    while True:
+        rootU, rootV = parent[u], parent[v]
+        split = rootU != rootV
+        if not split.any():
+            break
+        u, v, rootU, rootV = u[split], v[split], rootU[split], rootV[split]    # Joined edges stay joined
+        parent[np.maximum(rootU, rootV)] = np.minimum(rootU, rootV)
+        while True:                                         # Pointers only go to smaller ids, so this terminates
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+    labels = np.full(height * width, -1, dtype=np.int32)
+    flatFree = free.ravel()
+    _, labels[flatFree] = np.unique(parent[flatFree], return_inverse=True)
+    return labels.reshape(height, width)
+
+
+def connected(labels, a, b):                                # O(1) reachability test on a label array
+    return labels[a] >= 0 and labels[a] == labels[b]
+
+
+# Wraps any planner so queries whose endpoints lie in different components return (None, set(), []) without searching
+class ReachabilityCheck:
+    def __init__(self, planner, labels):
+        self.planner = planner
+        self.labels = labels
+
+    def traversal(self, grid, start, goal, trace = None):
+        if start != goal and not connected(self.labels, start, goal):
+            if trace is None:
+                return None, set(), []
+            traceLevel(trace)
+            return None, Trace(trace, np.asarray(grid).shape[1] + 2)
+        if trace is None:                                   # Wrapped planners without trace support still work
+            return self.planner.traversal(grid, start, goal)
+        return self.planner.traversal(grid, start, goal, trace)
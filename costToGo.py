@@ -0,0 +1,153 @@
+import hashlib
+import heapq
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+from core import SearchGrid, isCostMap
+
+
+def gridKey(grid):                                          # Content hash of the obstacle layout (any non-zero cell is blocked)
+    grid = np.asarray(grid)
+    layout = np.ascontiguousarray(grid) if isCostMap(grid) else np.packbits(grid != 0)     # Cost maps: every multiplier counts
+    digest = hashlib.blake2b(layout.tobytes(), digest_size=16)
+    digest.update(repr(grid.shape).encode())
+    return digest.hexdigest()
+
+
+# Whole-grid Dijkstra cost-to-go field rooted at the goal. Each cell stores its cost to the goal and the
+# next cell on a cheapest path, so any start resolves by following next-hops in O(path length)
+class CostToGoField:
+    def __init__(self, grid, goal, motion):
+        sg = SearchGrid(grid, motion)
+        self.sg = sg
+        self.goal = (int(goal[0]), int(goal[1]))
+        self.motion = motion
+        self.root = sg.index(goal)
+
+        blocked = sg.blocked
+        neighbours = sg.neighbours
+        weights = sg.weights()                              # Multiplier of the cell a step leaves (1 on binary grids)
+        gScore = sg.gScores()                               # Cost from cell to goal
+        nextHop = sg.parents()                              # Next cell towards the goal, -1 at the goal / unreachable
+        closed = sg.flags()
+
+        gScore[self.root] = 0
+        open_heap = [(0, self.root)]
+        while open_heap:
+            g, current = heapq.heappop(open_heap)
+            if closed[current]:
+                continue
+            closed[current] = 1
+
+            for offset, step_cost in neighbours:            # Search backwards: a move from previous to current uses this offset
+                previous = current - offset
+                if blocked[previous] or closed[previous]:
+                    continue
+                previousG = g + step_cost * weights[previous]
+                if previousG < gScore[previous]:
+                    gScore[previous] = previousG
+                    nextHop[previous] = current
+                    heapq.heappush(open_heap, (previousG, previous))
+
+        self.cost = np.frombuffer(gScore, dtype=np.float64)     # Zero-copy views of the search buffers
+        self.next = np.frombuffer(nextHop, dtype=np.int32)
+        self.nbytes = self.cost.nbytes + self.next.nbytes + len(blocked)
+
+    def indices(self, starts):                              # (k, 2) array of (y, x) -> flat indices
+        starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+        return (starts[:, 0] + 1) * self.sg.stride + starts[:, 1] + 1
+
+    def costAt(self, start):
+        return float(self.cost[self.sg.index(start)])
+
+    def costs(self, starts):                                # Vectorised cost lookup, inf where unreachable
+        return self.cost[self.indices(starts)]
+
+    def path(self, start):
+        current = self.sg.index(start)
+        if current == self.root:
+            return [self.goal]
+        if self.next[current] < 0:
+            return None                                     # Unreachable from this start
+        nextHop = self.next
+        path = [current]
+        while current != self.root:
+            current = int(nextHop[current])
+            path.append(current)
+        return self.sg.cells(path)
+
+    def paths(self, starts):                                # Walk every start in lockstep, one NumPy step per hop
+        current = self.indices(starts).astype(np.int32)
+        reachable = (self.next[current] >= 0) | (current == self.root)
+        active = reachable & (current != self.root)
+
+        steps = [current]
+        while active.any():
+            current = np.where(active, self.next[current], current)
+            steps.append(current)
+            active &= current != self.root
+        walk = np.stack(steps)                              # (max hops + 1, k)
+        lengths = np.argmax(walk == self.root, axis=0) + 1
+
+        ys, xs = np.divmod(walk, self.sg.stride)
+        cells = np.stack((ys - 1, xs - 1), axis=-1)         # (max hops + 1, k, 2)
+        return [cells[:length, i] if ok else None
+                for i, (length, ok) in enumerate(zip(lengths.tolist(), reachable.tolist()))]
+
+
+# LRU of cost-to-go fields keyed by (grid content hash, goal, motion), bounded by a memory budget in bytes
+class FieldCache:
+    def __init__(self, maxBytes = 512 * 2**20):
+        self.maxBytes = maxBytes
+        self.fields = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, grid, goal, motion):
+        return (gridKey(grid), (int(goal[0]), int(goal[1])), tuple(motion))
+
+    def get(self, grid, goal, motion):
+        key = self.key(grid, goal, motion)
+        field = self.fields.get(key)
+        if field is not None:
+            self.hits += 1
+            self.fields.move_to_end(key)                    # Most recently used goes to the back
+            return field
+
+        self.misses += 1
+        field = CostToGoField(grid, goal, motion)
+        if field.nbytes <= self.maxBytes:                   # Fields larger than the whole budget are returned but not kept
+            self.fields[key] = field
+            self.nbytes += field.nbytes
+            while self.nbytes > self.maxBytes:
+                _, evicted = self.fields.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return field
+
+    def clear(self):
+        self.fields.clear()
+        self.nbytes = 0
+
+
+defaultCache = FieldCache()
+
+
+# Planner front-end with the usual traversal signature. No search runs per query once the goal's field is cached,
+# so visited / visitedList are empty and a trace reports no expansions
+class CostToGoPlanner:
+    def __init__(self, motion, cache = None):
+        self.motion = motion
+        self.cache = cache if cache is not None else defaultCache
+
+    def field(self, grid, goal):
+        return self.cache.get(grid, goal, self.motion)
+
+    def traversal(self, grid, start, goal, trace = None):
+        field = self.field(grid, goal)
+        return field.sg.result(trace, field.path(start), field.sg.flags(), array('i'), 0)
+
+    def batch(self, grid, starts, goal):                    # Paths for many starts sharing one goal
+        return self.field(grid, goal).paths(starts)
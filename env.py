@@ -1,31 +1,165 @@
-import numpy as np  
-import matplotlib.pyplot as plt
-from matplotlib.colors import ListedColormap    # For visualisation
-import time                                     # For measuring execution time
+import argparse
+import functools
 import json
+import os
+import sys
+import time                                     # For measuring execution time
+
+import numpy as np
 
 # Import algorithms
 from BFS import BFSGraph, BFSTree
-from DFS import DFSGraph, DFSTree
-from AStar import AStarGraph, AStarTree
+from DFS import DFSGraph, DFSTree, IDDFSTree
+from AStar import AStarGraph, AStarTree, ARAStarGraph, IDAStarTree
 from UCS import UCSGraph, UCSTree
+from JPS import JPSGraph
+from ThetaStar import ThetaStarGraph
+from core import IMPASSABLE, labelComponents, pathCost, pathLength
+from mapfile import loadMap, saveMap
+
+
+CONFIG_FILE = "MapAssignment.json"
+
+
+@functools.cache
+def loadConfig(path = CONFIG_FILE):
+    # Map settings from the JSON config, read on first use rather than at import; {} if the file is missing
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def defaultDistance(width, height):
+    # Smallest Manhattan distance between start and goal when the caller passes none: a quarter of the map's
+    # width + height. Callers that read a config pass its "distance" explicitly
+    return (width + height) / 4
+
+
+def setUpEnv(width, height, obstacle_prob, border=True, seed=None, out=None, tileRows=1024, legacy=False,
+             reachable=False, motion=None, returnLabels=False, costs=False, save=None, packed=False, distance=None):
+    # Obstacles are drawn a tile of rows at a time from one Generator stream, so the map only depends on the seed
+    # (not on tileRows). With out set to a .npy path the grid is streamed into a memory-mapped file instead of RAM.
+    # legacy=True reproduces the maps of the original per-cell np.random loop for the same seed.
+    # reachable=True labels the connected components (under motion, 4-directional by default, which is also safe
+    # for 8) and picks start and goal inside the largest one; returnLabels=True also returns the label array.
+    # costs=True (or a dict of costField options) returns a float32 cost map in place of the binary grid; its
+    # terrain is drawn after everything else, so the obstacles, start and goal match the binary map for the seed.
+    # save writes the finished map to a map file (see mapfile.py; packed=True bit-packs it) for loadMap to replay.
+    # distance is the smallest Manhattan distance from start to goal (defaultDistance when None)
+    if distance is None:
+        distance = defaultDistance(width, height)
+    if legacy:
+        if reachable or returnLabels or costs:
+            raise ValueError("legacy maps do not support reachable / returnLabels / costs")
+        grid, start, goal = legacySetUpEnv(width, height, obstacle_prob, border, seed, distance)
+        if save:
+            saveMap(save, grid, start, goal, motion, seed, packed)
+        return grid, start, goal
+
+    if reachable:
+        return reachableSetUpEnv(width, height, obstacle_prob, border, seed, out, tileRows, motion, returnLabels, costs,
+                                 save, packed, distance)
+
+    rng = np.random.default_rng(seed)
+
+    Sy, Sx = int(rng.integers(1, height-2)), int(rng.integers(1, width-2))
+    Gy, Gx = int(rng.integers(1, height-2)), int(rng.integers(1, width-2))
+    start = (Sy, Sx)
+
+    # Ensure goal is distinct and reasonably far
+    while abs(Sy-Gy) + abs(Sx-Gx) < distance:
+        Gy, Gx = int(rng.integers(1, height-2)), int(rng.integers(1, width-2))
+    goal = (Gy, Gx)
+
+    if out is None:
+        grid = np.empty((height, width), dtype=np.uint8)   # 1 byte per cell
+    else:
+        grid = np.lib.format.open_memmap(out, mode="w+", dtype=np.uint8, shape=(height, width))
+
+    for y in range(0, height, tileRows):                    # Fill grid with obstacles based on probability, one tile at a time
+        rows = min(tileRows, height - y)
+        grid[y:y + rows] = rng.random((rows, width)) < obstacle_prob
+
+    grid[start] = 0                                         # Start and goal are always free
+    grid[goal] = 0
+
+    if border:                              # Add border walls if specified
+        grid[0, :] = 1
+        grid[-1, :] = 1
+        grid[:, 0] = 1
+        grid[:, -1] = 1
+
+    if out is not None:
+        grid.flush()
+
+    labels = labelComponents(grid, motion or getMotion(4)) if returnLabels else None
+    if costs:
+        grid = costField(grid, rng, **(costs if isinstance(costs, dict) else {}))
+    if save:
+        saveMap(save, grid, start, goal, motion, seed, packed)
+
+    if returnLabels:
+        return grid, start, goal, labels
+    return grid, start, goal
 
+def reachableSetUpEnv(width, height, obstacle_prob, border, seed, out, tileRows, motion, returnLabels, costs=False,
+                      save=None, packed=False, distance=None):
+    if distance is None:
+        distance = defaultDistance(width, height)
+    rng = np.random.default_rng(seed)
+    if out is None:
+        grid = np.empty((height, width), dtype=np.uint8)
+    else:
+        grid = np.lib.format.open_memmap(out, mode="w+", dtype=np.uint8, shape=(height, width))
 
-with open("MapAssignment.json") as file:    # Load configuration from JSON file
-    config = json.load(file)
+    for y in range(0, height, tileRows):
+        rows = min(tileRows, height - y)
+        grid[y:y + rows] = rng.random((rows, width)) < obstacle_prob
 
+    if border:
+        grid[0, :] = 1
+        grid[-1, :] = 1
+        grid[:, 0] = 1
+        grid[:, -1] = 1
 
-width = config["map_width"]                 # Map dimensions
-height = config["map_height"]
-prob = config["obstacle_probability"]       # Obstacle probability
-border = config["border_walls"]             # Border walls (boolean)
-seed = config.get("seed", None)             # Random seed (optional)
-distance = config.get("distance", (width + height) / 4)
+    labels = labelComponents(grid, motion or getMotion(4))
+
+    # Candidate cells use the same ranges as the random start / goal draws, inside the largest component there
+    inner = labels[1:height-2, 1:width-2]
+    sizes = np.bincount(inner[inner >= 0])
+    if sizes.size == 0:
+        raise ValueError("Map has no free cells to place start and goal")
+    ys, xs = np.nonzero(inner == np.argmax(sizes))
+    ys, xs = ys + 1, xs + 1
+
+    pick = int(rng.integers(len(ys)))
+    start = (int(ys[pick]), int(xs[pick]))
+    far = np.abs(ys - start[0]) + np.abs(xs - start[1])
+    candidates = np.flatnonzero(far >= distance)
+    if candidates.size:                                     # Goal reasonably far, or the farthest cell if none is
+        pick = int(candidates[rng.integers(candidates.size)])
+    else:
+        pick = int(np.argmax(far))
+    goal = (int(ys[pick]), int(xs[pick]))
 
+    if out is not None:
+        grid.flush()
 
+    if costs:
+        grid = costField(grid, rng, **(costs if isinstance(costs, dict) else {}))
+    if save:
+        saveMap(save, grid, start, goal, motion, seed, packed)
 
+    if returnLabels:
+        return grid, start, goal, labels
+    return grid, start, goal
 
-def setUpEnv(width, height, obstacle_prob, border=True, seed=None):
+def legacySetUpEnv(width, height, obstacle_prob, border=True, seed=None, distance=None):
+    # Same stream as the original double loop (one np.random.rand() per cell, none for start and goal), drawn in one call
+    if distance is None:
+        distance = defaultDistance(width, height)
     if seed is not None:
         np.random.seed(seed)
 
@@ -33,22 +167,18 @@ def setUpEnv(width, height, obstacle_prob, border=True, seed=None):
     Gy, Gx = np.random.randint(1, height-2), np.random.randint(1, width-2)
     start = (Sy, Sx)
 
-    # Ensure goal is distinct and reasonably far
     while abs(Sy-Gy) + abs(Sx-Gx) < distance:
         Gy, Gx = np.random.randint(1, height-2), np.random.randint(1, width-2)
     goal = (Gy, Gx)
 
-    grid = np.zeros((height, width), dtype=int)
-
+    drawn = np.ones(height * width, dtype=bool)            # Cells that consumed a random number
+    drawn[Sy * width + Sx] = False
+    drawn[Gy * width + Gx] = False
+    grid = np.zeros(height * width, dtype=np.uint8)
+    grid[drawn] = np.random.random_sample(int(drawn.sum())) < obstacle_prob
+    grid = grid.reshape(height, width)
 
-    for y in range(height):                 # Fill grid with obstacles based on probability
-        for x in range(width):
-            if (y, x) == start or (y, x) == goal:
-                continue
-            if np.random.rand() < obstacle_prob:
-                grid[y, x] = 1
-    
-    if border:                              # Add border walls if specified  
+    if border:
         grid[0, :] = 1
         grid[-1, :] = 1
         grid[:, 0] = 1
@@ -56,6 +186,32 @@ def setUpEnv(width, height, obstacle_prob, border=True, seed=None):
 
     return grid, start, goal
 
+def costField(grid, rng, zones=None, slowCost=3.0, lanes=None, laneCost=0.5):
+    # float32 cost map over a binary grid: obstacles are IMPASSABLE and free cells cost 1, except inside rectangular
+    # slow zones (slowCost) and along full-length preferred lanes on random rows / columns (laneCost, wins where they cross).
+    # By default about one zone per 400 cells and one lane per 40 cells of height + width
+    height, width = grid.shape
+    costs = np.ones((height, width), dtype=np.float32)
+    zones = max(1, height * width // 400) if zones is None else zones
+    lanes = max(1, (height + width) // 40) if lanes is None else lanes
+
+    sizes = rng.integers(2, max(3, min(height, width) // 5), size=(zones, 2))
+    corners = rng.random((zones, 2))
+    for (h, w), (fy, fx) in zip(sizes, corners):
+        y, x = int(fy * (height - h + 1)), int(fx * (width - w + 1))
+        costs[y:y + h, x:x + w] = slowCost
+
+    rows = rng.random(lanes) < 0.5
+    spots = rng.random(lanes)
+    for row, spot in zip(rows, spots):
+        if row:
+            costs[int(spot * height), :] = laneCost
+        else:
+            costs[:, int(spot * width)] = laneCost
+
+    costs[np.asarray(grid) != 0] = IMPASSABLE
+    return costs
+
 def getMotion(directions):
     if directions == 4:
         return [(-1, 0), (0, 1), (1, 0), (0, -1)] # North, East, South, West
@@ -64,119 +220,131 @@ def getMotion(directions):
                 (1, 0), (1, -1), (0, -1), (-1, -1)]
     return []
 
-if __name__ == "__main__":
 
-    motion = None                   # Get user input for motion model
-    while motion is None:
+# Planners the command line can run, in menu order, with their constructor arguments
+MODELS = {
+    "BFS Graph": (BFSGraph, {}),
+    "BFS Tree": (BFSTree, {}),
+    "DFS Graph": (DFSGraph, {}),
+    "DFS Tree": (DFSTree, {"max_depth": 500}),                  # Set a higher depth limit for larger maps
+    "A* Graph": (AStarGraph, {}),
+    "A* Tree": (AStarTree, {}),
+    "UCS Graph": (UCSGraph, {}),
+    "UCS Tree": (UCSTree, {}),
+    "JPS Graph": (JPSGraph, {}),                                # Falls back to A* for 4 directions
+    "IDDFS Tree": (IDDFSTree, {"table_size": 1 << 16}),         # O(depth) memory plus a capped transposition table
+    "IDA* Tree": (IDAStarTree, {"table_size": 1 << 16}),
+    "Weighted A* Graph": (AStarGraph, {"epsilon": 1.5}),        # Path cost at most 1.5x optimal, usually far fewer expansions
+    "ALT A* Graph": (AStarGraph, {"landmarks": 8}),             # Optimal; landmark heuristic precomputed once per map
+    "ARA* Graph": (ARAStarGraph, {"epsilon": 3.0, "time_limit": 1.0}),
+    "Theta* Graph": (ThetaStarGraph, {}),                       # Any-angle: returns the turning points only
+}
+MENU_NOTES = {"BFS Tree": " (Please reduce map size to 20x20 or lower)", "DFS Tree": " (Please reduce map size to 20x20 or lower)",
+              "JPS Graph": " (8-directional)", "ARA* Graph": " (anytime)",
+              "Theta* Graph": " (8-directional, any-angle)"}
+
+
+def askMotion():                                            # Interactive fallback when --motion is not given
+    while True:
         directions = input("4-directional or 8-directional? (4 or 8): ")
-        motion = getMotion(int(directions))
-        if not motion:
-            print("Invalid choice. Please enter 4 or 8.")
-            motion = None
-
-    chosenModel = None                   
-    while chosenModel not in ["BFS Graph", "BFS Tree", "DFS Graph", "DFS Tree", "A* Graph", "A* Tree", "UCS Graph", "UCS Tree"]:
-        choice = input("Choose a model: \n1. BFS Graph \n2. BFS Tree (Please reduce map size to 20x20 or lower) \n3. DFS Graph\n4. DFS Tree (Please reduce map size to 20x20 or lower) \n5. A* Graph\n6. A* Tree\n7. UCS Graph\n8. UCS Tree\nEnter 1, 2, 3, 4, 5, 6, 7, or 8: ")
-        match choice:
-            case "1":
-                chosenModel = "BFS Graph"
-            case "2":
-                chosenModel = "BFS Tree"
-            case "3":
-                chosenModel = "DFS Graph"
-            case "4":
-                chosenModel = "DFS Tree"
-            case "5":
-                chosenModel = "A* Graph"
-            case "6":
-                chosenModel = "A* Tree"
-            case "7":
-                chosenModel = "UCS Graph"
-            case "8":
-                chosenModel = "UCS Tree"
-
-            
-            case _:
-                print("Invalid choice. Please enter 1-8: ")
-
-    grid, start, goal = setUpEnv(width, height, prob, border)# Generate random map
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-    start_time = time.time()                                  # Start timer
-    match chosenModel:
-        case "BFS Graph":
-            GBFS = BFSGraph(motion)                                  # instantiate BFS class
-            path, visited, visitedList = GBFS.traversal(grid, start, goal)
-        case "BFS Tree":
-            TBFS = BFSTree(motion)
-            path, visited, visitedList = TBFS.traversal(grid, start, goal)
-        case "DFS Graph":
-            GDFS = DFSGraph(motion)                                  # instantiate DFS class
-            path, visited, visitedList = GDFS.traversal(grid, start, goal)
-        case "DFS Tree":
-            TDFS = DFSTree(motion, max_depth =500)                   # set a higher depth limit for larger maps
-            path, visited, visitedList = TDFS.traversal(grid, start, goal)
-        case "A* Graph":
-            GAStar = AStarGraph(motion)                              # instantiate A* class
-            path, visited, visitedList = GAStar.traversal(grid, start, goal)
-        case  "A* Tree":
-            TAStar = AStarTree(motion)  
-            path, visited, visitedList = TAStar.traversal(grid, start, goal)
-        case  "UCS Graph":
-            GUCS = UCSGraph(motion)                                  # instantiate UCS class
-            path, visited, visitedList = GUCS.traversal(grid, start, goal)
-        case  "UCS Tree":
-            TUCS = UCSTree(motion)
-            path, visited, visitedList = TUCS.traversal(grid, start, goal)
-        case _:
-            print("No valid model chosen.")
-            path, visited, visitedList = None, set(), []
-    end_time = time.time()                                     # End timer 
-
-
+        if directions in ("4", "8"):
+            return int(directions)
+        print("Invalid choice. Please enter 4 or 8.")
+
+
+def askModel():                                             # Interactive fallback when --algorithm is not given
+    names = list(MODELS)
+    menu = "\n".join(f"{i}. {name}{MENU_NOTES.get(name, '')}" for i, name in enumerate(names, 1))
+    while True:
+        choice = input(f"Choose a model: \n{menu}\nEnter 1-{len(names)}: ")
+        if choice.isdigit() and 1 <= int(choice) <= len(names):
+            return names[int(choice) - 1]
+        print(f"Invalid choice. Please enter 1-{len(names)}: ")
+
+
+def main(argv = None):
+    # Plans one path and reports it. Map settings default to the config file; any flag overrides it. Without
+    # --algorithm / --motion it asks for them on a terminal. Rendering (matplotlib) is only imported for --show or
+    # --animation, so headless runs start fast. Exits 1 when no path exists
+    parser = argparse.ArgumentParser(description = "Plan a path on a generated or saved grid map")
+    parser.add_argument("-a", "--algorithm", choices = list(MODELS))
+    parser.add_argument("-m", "--motion", type = int, choices = [4, 8])
+    parser.add_argument("--config", default = CONFIG_FILE, help = "JSON map settings (default %(default)s)")
+    parser.add_argument("--map", metavar = "FILE", help = "replay a saved map file (see mapfile.py) instead of generating one")
+    parser.add_argument("--save-map", metavar = "FILE", help = "save the generated map as a map file")
+    parser.add_argument("--packed", action = "store_true", default = None, help = "bit-pack the saved map")
+    parser.add_argument("--width", type = int)
+    parser.add_argument("--height", type = int)
+    parser.add_argument("--prob", type = float, help = "obstacle probability")
+    parser.add_argument("--seed", type = int)
+    parser.add_argument("--costs", action = "store_true", default = None, help = "terrain cost map (slow zones and lanes)")
+    parser.add_argument("--format", choices = ["text", "json"], default = "text", help = "how the result is printed")
+    parser.add_argument("--show", action = "store_true", help = "animate the search in a window")
+    parser.add_argument("--animation", metavar = "FILE", help = "save the animation as .mp4 or .gif")
+    args = parser.parse_args(argv)
+
+    config = loadConfig(args.config)
+    interactive = args.algorithm is None or args.motion is None
+    if interactive and not sys.stdin.isatty():
+        parser.error("--algorithm and --motion are required when not running on a terminal")
+    motion = getMotion(args.motion or askMotion())
+    name = args.algorithm or askModel()
+
+    width = args.width or config.get("map_width", 40)
+    height = args.height or config.get("map_height", 40)
+    prob = config.get("obstacle_probability", 0.2) if args.prob is None else args.prob
+    seed = config.get("seed", None) if args.seed is None else args.seed
+    costs = config.get("terrain_costs", False) if args.costs is None else args.costs
+    packed = config.get("map_packed", False) if args.packed is None else args.packed
+    if packed and costs:
+        parser.error("cost maps cannot be bit-packed")
+
+    # Generate random map (reproducible for a given seed); "terrain_costs" adds slow zones and preferred lanes.
+    # With "map_file" set, the map is saved there on the first run and replayed from it (memory-mapped) after that
+    mapFile = args.map or config.get("map_file")
+    if mapFile and os.path.exists(mapFile):
+        grid, start, goal = loadMap(mapFile)
+    elif args.map:
+        parser.error(f"map file {args.map} does not exist")
+    else:
+        grid, start, goal = setUpEnv(width, height, prob, config.get("border_walls", True), seed, motion=motion, costs=costs,
+                                     save=args.save_map or mapFile, packed=packed,
+                                     distance=config.get("distance", defaultDistance(width, height)))
+
+    animationFile = args.animation or config.get("animation_file")     # Optional .mp4 / .gif, rendered offscreen
+    render = args.show or animationFile or (interactive and args.format == "text")
+    cls, kwargs = MODELS[name]
+    planner = cls(motion, **kwargs)
+
+    start_time = time.time()                                # Start timer
+    path, trace = planner.traversal(grid, start, goal, trace = "full" if render else "counts")
+    end_time = time.time()                                  # End timer
+
+    stats = getattr(planner, "stats", {})
+    if args.format == "json":
+        print(json.dumps({"algorithm": name, "motion": len(motion), "shape": list(grid.shape), "start": start, "goal": goal,
+                          "found": path is not None, "path": path, "length": pathLength(path),
+                          "cost": pathCost(grid, path) if path else None, "time_s": end_time - start_time,
+                          "trace": trace.stats(), "stats": stats}))
+    else:
+        print(path)
+        print("Time elapsed", end_time - start_time, "second(s)")
+        if "bound" in stats:
+            print("Cost", stats["cost"], "within", stats["bound"], "x optimal")
+        if path is None:
+            print("No path found")
 
     # Visualisation
+    if render and path is not None:
+        from render import Renderer                         # matplotlib is only loaded here
+        renderer = Renderer(grid, start, goal)              # Batches visited cells so the frame count stays bounded
+        if animationFile:
+            saved = renderer.save(trace.cells(), path, animationFile)
+            print("Saved animation to", saved, file = sys.stderr if args.format == "json" else sys.stdout)
+        else:
+            renderer.show(trace.cells(), path)
+    return 0 if path is not None else 1
 
-    # 0 = free, 1 = wall, 2 = visited, 3 = start, 4 = goal, 5 = path
-    cmap = ListedColormap(["white", "darkgrey", "blue", "red", "green", "cyan"])
-    print(path)
-    print("Time elapsed", end_time - start_time, "second(s)")
 
-    plt.ion()
-    fig, plot = plt.subplots()
-    grid[start] = 3                                            # Mark start (red) and goal (green) on grid
-    grid[goal] = 4
-
-    if path is None:
-        print("No path found")
-    else:
-        for vy, vx in visitedList:                             # Visualise visited nodes
-            if (vy, vx) != start and (vy, vx) != goal:
-                grid[vy, vx] = 2                               # Mark visited (blue)
-                plot.clear()
-                plot.imshow(grid, cmap = cmap, vmin = 0, vmax = 5)
-                plt.title(f"Visited tiles ({len(visited)})")
-                plt.pause(0.002)
-
-        for py, px in path[1:-1]:                               # Visualise final path
-            grid[py, px] = 5                                    # Mark path (cyan)  
-            plot.clear()
-            plot.imshow(grid, cmap = cmap)
-            plt.title(f"Final Path ({len(path)})")
-            plt.pause(0.005)
-
-
-    plt.ioff()
-    plt.show()
+if __name__ == "__main__":
+    sys.exit(main())
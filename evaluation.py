@@ -1,121 +1,116 @@
-import time
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import random
-import json
+import argparse
+import sys
+
+from env import CONFIG_FILE, loadConfig
+from runner import ALGORITHMS, COUNTERS, RESULTS_FILE, runBenchmark
+
+
+def main(argv = None):
+    # Runs the sweep and prints summary tables; pandas is imported for the report and matplotlib only for --plot / --figure.
+    # Settings default to the config file; any flag overrides it
+    parser = argparse.ArgumentParser(description = "Run every planner on shared random maps and compare them")
+    parser.add_argument("--config", default = CONFIG_FILE, help = "JSON map settings (default %(default)s)")
+    parser.add_argument("--trials", type = int, default = 5, help = "maps to test per direction mode")
+    parser.add_argument("--motions", type = int, nargs = "+", default = [4, 8], choices = [4, 8])
+    parser.add_argument("--algorithms", nargs = "+", choices = list(ALGORITHMS), help = "default: all")
+    parser.add_argument("--workers", type = int, help = "benchmark worker processes (default: one per CPU)")
+    parser.add_argument("--timeout", type = float, help = "seconds before a single run is abandoned")
+    parser.add_argument("--output", help = f"rows are streamed here as jobs finish (.csv, or .parquet with pyarrow; default {RESULTS_FILE})")
+    parser.add_argument("--map-dir", help = "save each map here and replay it on later runs instead of regenerating it")
+    parser.add_argument("--costs", action = "store_true", default = None, help = "terrain cost maps")
+    parser.add_argument("--memory", action = "store_true", default = None, help = "record peak allocations (slows every run)")
+    parser.add_argument("--plot", action = "store_true", help = "show the comparison charts in a window")
+    parser.add_argument("--figure", metavar = "FILE", help = "save the comparison charts to an image file")
+    args = parser.parse_args(argv)
+
+    config = loadConfig(args.config)
+    width = config.get("map_width", 40)                     # Map dimensions
+    height = config.get("map_height", 40)
+    prob = config.get("obstacle_probability", 0.2)          # Obstacle probability
+    seed = config.get("seed", None)                         # Random seed (optional)
+    trials = args.trials                                    # Number of maps to test per direction mode
+    workers = args.workers or config.get("workers", None)
+    timeout = args.timeout or config.get("timeout", 60)     # Stops BFS/DFS Tree stalling the sweep
+    output = args.output or config.get("results", RESULTS_FILE)
+    trackMemory = config.get("track_memory", False) if args.memory is None else args.memory
+    costs = config.get("terrain_costs", False) if args.costs is None else args.costs   # BFS / DFS only see the obstacles
+    mapDir = args.map_dir or config.get("map_dir", None)
+    distance = config.get("distance", None)                 # Smallest start-goal distance (None: a quarter of width + height)
+
+    print(f"Starting Evaluation: {trials} trials per mode on {width}x{height} grid")
+
+    # Every (map, algorithm) run is an independent job; all algorithms on a trial share the same map for fairness
+    # (start and goal are drawn from the same connected component, so every run can succeed)
+    results = runBenchmark(width, height, prob, trials, directions=tuple(args.motions), algorithms=args.algorithms,
+                           workers=workers, timeout=timeout, output=output, seed=seed, trackMemory=trackMemory, costs=costs,
+                           mapDir=mapDir, distance=distance)
+
+    # Compile results into a dataframe
+    import pandas as pd
+    df = pd.DataFrame(results)
+
+    # Filter out failed runs where there was no path found (maps are reachable, but depth-limited DFS Tree can still give up) and timed-out runs
+    valid_df = df[(df["Status"] == "ok") & (df["Path Length"] > 0)]
+
+    # Group by direction and algorithm for side by side bar plots
+    metrics = {
+        "Time (s)": "mean",
+        "Nodes Visited": "mean",
+        "Path Length": "mean",
+        "Path Cost": "mean"                     # Differs from the length on 8-way moves and on terrain cost maps
+    }
+    if trackMemory:
+        metrics["Peak Memory (B)"] = "max"      # Compare the O(depth) iterative-deepening planners against the heap-based ones
+    summary = valid_df.groupby(["Direction", "Algorithm"]).agg(metrics).reset_index()
 
-# Import algorithms
-from BFS import BFSGraph, BFSTree
-from DFS import DFSGraph, DFSTree
-from AStar import AStarGraph, AStarTree
-from UCS import UCSGraph, UCSTree
-from env import setUpEnv, getMotion
+    # P rint summary table
+    print(summary)
 
+    # Why an algorithm did the work it did: frontier traffic, stale heap entries, rejected relaxations and re-expanded cells
+    counters = valid_df.groupby(["Direction", "Algorithm"])[list(COUNTERS)].mean().reset_index()
+    print(counters)
 
-with open("MapAssignment.json") as file:    # Load config from JSON file
-    config = json.load(file)
+    if args.plot or args.figure:
+        plotSummary(summary, trials, width, height, args.figure)
+    return 0
 
 
-width = config["map_width"]                 # Map dimensions
-height = config["map_height"]
-prob = config["obstacle_probability"]       # Obstacle probability
-border = config["border_walls"]             # Border walls (boolean)
-seed = config.get("seed", None)             # Random seed (optional)
-distance = config.get("distance", (width + height) / 4)
+def plotSummary(summary, trials, width, height, figure = None):
+    import matplotlib
+    if figure:
+        matplotlib.use("Agg")                   # Headless: no window needed to save the file
+    import matplotlib.pyplot as plt
 
-trials = 5                                  # Number of maps to test per direction mode
+    # Set style
+    plt.style.use('ggplot')
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+    fig.suptitle(f'Algorithm Performance Comparison ({trials} trials, {width}x{height} Grid)', fontsize=16)
 
+    # Helper to plot grouped bar charts
+    def plot_metric(plot, metric_name, title, ylabel):
+        pivot_data = summary.pivot(index="Algorithm", columns="Direction", values=metric_name)
+        pivot_data.plot(kind='bar', ax=plot, width=0.8)
+        plot.set_title(title)
+        plot.set_ylabel(ylabel)
+        plot.set_xlabel("")
+        plot.tick_params(axis='x', rotation=45)
 
-results = []
+    # Time comparison
+    plot_metric(axes[0], "Time (s)", "Average Execution Time", "Seconds")
 
-print(f"Starting Evaluation: {trials} trials per mode on {width}x{height} grid")
+    # Memory Usage (Nodes Visited)
+    plot_metric(axes[1], "Nodes Visited", "Memory Usage (Nodes Visited)", "Count")
 
+    # Path Length
+    plot_metric(axes[2], "Path Length", "Average Path Length", "Steps")
 
-for direction in [4, 8]:
-    print(f"Evaluating {direction}-directional movement")
-    motion = getMotion(direction)
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+    if figure:
+        fig.savefig(figure)
+        print("Saved figure to", figure)
+    else:
+        plt.show()
 
-    # Instantiate classes
-    algos = {
-        "BFS Graph": BFSGraph(motion),
-        "BFS Tree": BFSTree(motion),
-        "DFS Graph": DFSGraph(motion),
-        "DFS Tree": DFSTree(motion),
-        "A* Graph": AStarGraph(motion),
-        "A* Tree": AStarTree(motion),
-        "UCS Graph": UCSGraph(motion),
-        "UCS Tree": UCSTree(motion)
-    }
 
-    for i in range(trials):
-        # Generate one random map for this trial that all algorithms will use for fairness
-        grid, start, goal = setUpEnv(width, height, prob)
-        
-        print(f"Trial {i+1}/{trials}: Start {start}, Goal {goal}")
-        
-        for name, algorithm in algos.items():
-            
-            # Run the algorithm and time it
-            start_time = time.time()
-            path, visited, visitedList = algorithm.traversal(grid, start, goal)
-            end_time = time.time()
-            
-            duration = end_time - start_time
-            path_len = len(path) if path else 0 # 0 if no path found
-            nodes_visited = len(visitedList)    # Proxy for memory usage
-            
-            # Record results
-            results.append({
-                "Direction": f"{direction}-Way",
-                "Algorithm": name,
-                "Trial": i,
-                "Time (s)": duration,
-                "Nodes Visited": nodes_visited,
-                "Path Length": path_len
-            })
-
-# Compile results into a dataframe
-
-df = pd.DataFrame(results)
-
-# Filter out failed runs where there was no path found (in case the goal was unreachable)
-valid_df = df[df["Path Length"] > 0]
-
-# Group by direction and algorithm for side by side bar plots
-summary = valid_df.groupby(["Direction", "Algorithm"]).agg({
-    "Time (s)": "mean",
-    "Nodes Visited": "mean",
-    "Path Length": "mean"
-}).reset_index()
-
-# P rint summary table
-print(summary)
-
-# Visualisation
-
-# Set style
-plt.style.use('ggplot')
-fig, axes = plt.subplots(1, 3, figsize=(18, 6))
-fig.suptitle(f'Algorithm Performance Comparison ({trials} trials, {width}x{height} Grid)', fontsize=16)
-
-# Helper to plot grouped bar charts
-def plot_metric(plot, metric_name, title, ylabel):
-    pivot_data = summary.pivot(index="Algorithm", columns="Direction", values=metric_name)
-    pivot_data.plot(kind='bar', ax=plot, width=0.8)
-    plot.set_title(title)
-    plot.set_ylabel(ylabel)
-    plot.set_xlabel("")
-    plot.tick_params(axis='x', rotation=45)
-
-# Time comparison
-plot_metric(axes[0], "Time (s)", "Average Execution Time", "Seconds")
-
-# Memory Usage (Nodes Visited)
-plot_metric(axes[1], "Nodes Visited", "Memory Usage (Nodes Visited)", "Count")
-
-# Path Length
-plot_metric(axes[2], "Path Length", "Average Path Length", "Steps")
-
-plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-plt.show()
\ No newline at end of file
+if __name__ == "__main__":                  # Guarded so benchmark worker processes can import this module safely
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import math
+
+import numpy as np
+
+from core import SearchGrid, isCostMap, labelComponents
+from costToGo import CostToGoField, gridKey
+
+UNREACHABLE = np.iinfo(np.uint16).max                        # uint16 distance of a cell that cannot reach the landmark
+
+
+# ALT lower bounds (Goldberg & Harrelson 2005, A* search meets graph theory). Exact costs from every cell to each of
+# count landmark cells are computed once per grid (one backward Dijkstra each). For a landmark L the triangle
+# inequality gives d(n, t) >= d(n, L) - d(t, L), and on binary grids, where every move costs the same both ways, also
+# d(n, t) >= d(t, L) - d(n, L). heuristic(target) takes the max of these over all landmarks, and of the usual
+# Euclidean / Manhattan bound, for every cell at once; estimator(target) gives the same bound for one cell at a time,
+# which is what the searches use so a query only pays for the cells it touches. Landmarks are picked farthest-first (each is the reachable cell farthest from those already
+# chosen), which spreads them around the edge of the map where the bounds are tightest.
+# dtype "float32" stores the distances at float precision, "uint16" quantises them to steps of 1 / scale for half
+# the memory. Rounding could push a bound over the true cost, or change it by more than a step costs between two
+# neighbours, which breaks the closed-set searches, so every bound has the rounding error taken off and is then shrunk
+# by cheapest / (cheapest + tolerance) so it stays admissible and consistent
+class LandmarkIndex:
+    def __init__(self, grid, motion, count = 8, dtype = "float32", seed = 0, build = True):
+        if dtype not in ("float32", "uint16"):
+            raise ValueError("dtype must be 'float32' or 'uint16'")
+        sg = SearchGrid(grid, motion)
+        self.motion = [tuple(m) for m in motion]
+        self.diagonal = (1,1) in self.motion
+        self.shape = (sg.height, sg.width)
+        self.stride = sg.stride
+        self.size = sg.size
+        self.minWeight = sg.minWeight
+        self.cheapest = min(sg.costs) * sg.minWeight if sg.costs else 1.0     # Cheapest single move
+        self.symmetric = not isCostMap(grid)                # Cost maps charge the cell left, so d(a, b) != d(b, a)
+        self.dtype = dtype
+        self.key = gridKey(grid)
+        self.count = count
+        self.landmarks = []                                 # Flat (padded) indices
+        self.dist = np.zeros((0, self.size), dtype=np.float32 if dtype == "float32" else np.uint16)
+        self.scale = 1.0                                    # uint16 units per unit of cost
+        self.tolerance = 0.0                                # Taken off every bound to cover the storage rounding
+        if build:
+            self.build(grid, seed)
+
+    def build(self, grid, seed):
+        # Landmarks come from the largest component: a seed in a single-cell component has nothing to be far from.
+        # With no component of two or more cells the index keeps zero landmarks and heuristic() is the plain distance
+        sg = SearchGrid(grid, self.motion)
+        labels = labelComponents(grid, self.motion).ravel()
+        sizes = np.bincount(labels[labels >= 0])
+        if not sizes.size or sizes.max() < 2:
+            return
+        ys, xs = np.divmod(np.flatnonzero(labels == sizes.argmax()), sg.width)
+        rng = np.random.default_rng(seed)
+        pick = int(rng.integers(ys.size))
+        nearest = self.field(grid, sg, sg.index((ys[pick], xs[pick])))     # Only used to pick the first landmark
+        landmarks, rows = [], []
+        for _ in range(self.count):
+            reach = np.where(np.isfinite(nearest), nearest, -1)
+            landmark = int(np.argmax(reach))
+            if reach[landmark] <= 0:                        # Every reachable cell is already a landmark
+                break
+            distance = self.field(grid, sg, landmark)
+            nearest = np.minimum(nearest, distance) if rows else distance
+            landmarks.append(landmark)
+            rows.append(distance)
+        if rows:
+            self.store(landmarks, np.stack(rows))
+
+    def field(self, grid, sg, landmark):                    # Cost from every cell to landmark, inf where unreachable
+        return CostToGoField(grid, sg.cell(landmark), self.motion).cost
+
+    def store(self, landmarks, distances):
+        self.landmarks = [int(n) for n in landmarks]
+        finite = distances[np.isfinite(distances)]
+        longest = float(finite.max()) if finite.size else 0.0
+        if self.dtype == "uint16":
+            self.scale = (UNREACHABLE - 1) / longest if longest > 0 else 1.0
+            quantised = np.floor(np.where(np.isfinite(distances), distances, 0) * self.scale)
+            self.dist = np.where(np.isfinite(distances), quantised, UNREACHABLE).astype(np.uint16)
+            self.tolerance = 1 / self.scale                 # Stored values are up to one unit below the distance
+        else:
+            self.dist = distances.astype(np.float32)
+            self.tolerance = longest * 2**-22               # Three float32 roundings of the largest distance
+
+    @property
+    def nbytes(self):
+        return self.dist.nbytes
+
+    def index(self, cell):
+        return (int(cell[0]) + 1) * self.stride + int(cell[1]) + 1
+
+    def bounds(self, target):
+        # Landmark lower bound on the cost from every (padded) cell to target, as a float64 array. Cells that cannot
+        # reach a landmark the target reaches get inf (they cannot reach the target either)
+        bound = np.zeros(self.size)
+        quantised = self.dtype == "uint16"
+        for row in self.dist:
+            rooted = row[target]
+            if quantised:
+                if rooted == UNREACHABLE:                   # Says nothing about the cells that can reach this landmark
+                    continue
+                difference = row.astype(np.float64) - float(rooted)
+                difference[row == UNREACHABLE] = math.inf
+                difference /= self.scale
+            else:
+                if not math.isfinite(rooted):
+                    continue
+                difference = row - rooted                   # float32; inf where a cell cannot reach the landmark
+            np.maximum(bound, difference, out=bound)
+            if self.symmetric:
+                np.maximum(bound, -difference, out=bound)
+        bound -= self.tolerance
+        np.maximum(bound, 0, out=bound)
+        bound *= self.cheapest / (self.cheapest + self.tolerance)
+        return bound
+
+    def heuristic(self, target):
+        # bounds() combined with the distance heuristic the planners use (Euclidean with diagonals, else Manhattan,
+        # times the cheapest multiplier), so ALT is never weaker than plain A*
+        ty, tx = divmod(target, self.stride)
+        dy = np.abs(np.arange(self.size // self.stride, dtype=np.float64) - ty)[:, None] * self.minWeight
+        dx = np.abs(np.arange(self.stride, dtype=np.float64) - tx) * self.minWeight
+        geometric = (np.hypot(dy, dx) if self.diagonal else dy + dx).ravel()    # Row and column offsets broadcast
+        return np.maximum(self.bounds(target), geometric, out=geometric)
+
+    def estimator(self, target):
+        # heuristic(target) one cell at a time: returns h(n) for a padded index n, with the same bound up to float
+        # rounding (still admissible and consistent). A query then only pays for the cells its search pushes, where
+        # heuristic() tabulates the whole grid, which dominates short queries on large maps
+        quantised = self.dtype == "uint16"
+        missing = UNREACHABLE if quantised else math.inf
+        rows = []                                           # (distances to landmark, target's distance) per useful landmark
+        for row in self.dist:
+            rooted = row[target]
+            if rooted != missing:
+                rows.append((memoryview(row), float(rooted)))
+        unit = self.scale if quantised else 1.0
+        tolerance, shrink = self.tolerance, self.cheapest / (self.cheapest + self.tolerance)
+        symmetric, diagonal, minWeight, stride = self.symmetric, self.diagonal, self.minWeight, self.stride
+        ty, tx = divmod(target, stride)
+
+        def h(n):
+            bound = 0.0
+            for row, rooted in rows:
+                distance = row[n]
+                if distance == missing:                     # Cannot reach a landmark the target reaches
+                    return math.inf
+                difference = distance - rooted
+                if symmetric and difference < 0:
+                    difference = -difference
+                if difference > bound:
+                    bound = difference
+            bound = max(bound / unit - tolerance, 0.0) * shrink
+            y, x = divmod(n, stride)
+            dy, dx = abs(y - ty), abs(x - tx)
+            geometric = (math.hypot(dy, dx) if diagonal else dy + dx) * minWeight
+            return bound if bound > geometric else geometric
+
+        return h
+
+    def matches(self, grid, motion, key = None):
+        return [tuple(m) for m in motion] == self.motion and (key or gridKey(grid)) == self.key
+
+    # Persistence
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            shape=np.array(self.shape),
+            motion=np.array(self.motion),
+            key=np.array(self.key),
+            dtype=np.array(self.dtype),
+            landmarks=np.array(self.landmarks, dtype=np.int64),
+            dist=self.dist,
+            scale=np.array(self.scale),
+            tolerance=np.array(self.tolerance),
+        )
+
+    @classmethod
+    def load(cls, path, grid):
+        # The distances only make sense on the grid they were computed on, so it is passed in and checked
+        data = np.load(path)
+        index = cls(grid, [tuple(m) for m in data["motion"].tolist()], len(data["landmarks"]), str(data["dtype"]), build=False)
+        if tuple(data["shape"]) != index.shape or str(data["key"]) != index.key:
+            raise ValueError(f"{path} holds landmarks for a different grid")
+        index.landmarks = data["landmarks"].tolist()
+        index.dist = data["dist"]
+        index.scale = float(data["scale"])
+        index.tolerance = float(data["tolerance"])
+        return index
@@ -0,0 +1,89 @@
+import struct
+
+import numpy as np
+
+from core import isCostMap
+
+
+# Binary map files: a fixed 64-byte little-endian header followed by the grid, row-major.
+#   magic "GMAP", version, encoding, motion (4, 8, or 0 if unknown), height, width, start (y, x), goal (y, x),
+#   seed (-1 if the map did not come from an integer seed)
+# Encodings: UINT8 is one byte per cell (0 free, 1 obstacle), BITS packs each row into ceil(width / 8) bytes
+# (np.packbits order, most significant bit first), FLOAT32 is a cost map (see core.isCostMap).
+# The header is 64 bytes so the body is aligned for float32, and UINT8 / FLOAT32 bodies load as a read-only np.memmap:
+# opening a 20000x20000 map reads only the header, and pages come in as the planner touches them
+MAGIC = b"GMAP"
+VERSION = 1
+UINT8, BITS, FLOAT32 = range(3)
+HEADER = struct.Struct("<4sBBBxIIiiiiq")
+HEADER_SIZE = 64
+
+
+def rowBytes(encoding, width):
+    if encoding == BITS:
+        return (width + 7) // 8
+    return 4 * width if encoding == FLOAT32 else width
+
+
+def saveMap(path, grid, start, goal, motion = None, seed = None, packed = False, tileRows = 1024):
+    # Writes a tile of rows at a time, so a memory-mapped grid is never loaded whole. packed=True bit-packs a binary
+    # grid (8x smaller on disk, but loading it has to unpack a copy)
+    if isCostMap(grid):
+        if packed:
+            raise ValueError("cost maps cannot be bit-packed")
+        encoding = FLOAT32
+    else:
+        encoding = BITS if packed else UINT8
+    height, width = grid.shape
+    seed = int(seed) if isinstance(seed, (int, np.integer)) and seed >= 0 else -1
+    header = HEADER.pack(MAGIC, VERSION, encoding, len(motion) if motion else 0, height, width, *start, *goal, seed)
+
+    with open(path, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        for y in range(0, height, tileRows):
+            tile = np.asarray(grid[y:y + tileRows])
+            if encoding == FLOAT32:
+                body = tile.astype("<f4", copy=False)
+            elif encoding == BITS:
+                body = np.packbits(tile != 0, axis=1)   # Each row starts on a byte boundary
+            else:
+                body = (tile != 0).view(np.uint8)
+            file.write(body.tobytes())
+    return path
+
+
+def readHeader(path):
+    with open(path, "rb") as file:
+        raw = file.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:4] != MAGIC:
+        raise ValueError(f"{path} is not a map file")
+    magic, version, encoding, directions, height, width, sy, sx, gy, gx, seed = HEADER.unpack_from(raw)
+    if version != VERSION:
+        raise ValueError(f"{path} has map format version {version}, expected {VERSION}")
+    if encoding not in (UINT8, BITS, FLOAT32):
+        raise ValueError(f"{path} has unknown encoding {encoding}")
+    return {"shape": (height, width), "encoding": encoding, "motion": directions or None,
+            "start": (sy, sx), "goal": (gy, gx), "seed": None if seed < 0 else seed}
+
+
+def loadMap(path, returnHeader = False):
+    # (grid, start, goal), plus the header dict with returnHeader=True. UINT8 and FLOAT32 grids are zero-copy
+    # read-only memmaps; BITS grids are unpacked into a fresh uint8 array
+    header = readHeader(path)
+    height, width = header["shape"]
+    encoding = header["encoding"]
+    body = np.memmap(path, dtype=np.uint8, mode="r")
+    if body.size != HEADER_SIZE + height * rowBytes(encoding, width):
+        raise ValueError(f"{path} is truncated or has trailing data")
+
+    if encoding == FLOAT32:
+        grid = np.memmap(path, dtype="<f4", mode="r", offset=HEADER_SIZE, shape=(height, width))
+    elif encoding == BITS:
+        packed = np.asarray(body[HEADER_SIZE:]).reshape(height, rowBytes(BITS, width))
+        grid = np.unpackbits(packed, axis=1, count=width)
+    else:
+        grid = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_SIZE, shape=(height, width))
+
+    if returnHeader:
+        return grid, header["start"], header["goal"], header
+    return grid, header["start"], header["goal"]
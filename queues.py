@@ -0,0 +1,120 @@
+import heapq
+from array import array
+
+
+# Priority queue backends for the graph searches. They all hold entry tuples (key, ..., node) with node a flat
+# cell index and are driven heapq style: push(queue, entry), pop(queue), len(queue). The default "heap" is a plain
+# list with heapq's own functions and lazy deletion (a cheaper path to a queued cell pushes a second entry and the old
+# one is skipped when popped), so it costs exactly what the inlined heapq calls did. Entries come out in the same order
+# from every backend, so a planner finds the same path whichever it uses; they differ in how many entries they hold
+# and what a push costs
+
+
+# Monotone bucket queue (Dial; Dinitz for real-valued costs): bucket i holds keys in [i * width, (i + 1) * width),
+# in a ring just long enough to cover the largest jump between the popped key and a pushed one. Each bucket is a small
+# heap, so pops are in exact heapq order. Keys below the current bucket (an inflated heuristic, or float rounding)
+# go into the current bucket, whose heap still pops them first
+class BucketQueue:
+    def __init__(self, width, span):
+        self.scale = 1 / width
+        self.ring = [[] for _ in range(int(span * self.scale) + 2)]
+        self.current = 0                                    # Absolute index of the lowest bucket that may be non-empty
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, entry):
+        i = int(entry[0] * self.scale)
+        if i < self.current:
+            i = self.current
+        heapq.heappush(self.ring[i % len(self.ring)], entry)
+        self.size += 1
+
+    def pop(self):
+        ring = self.ring
+        count = len(ring)
+        i = self.current
+        while not ring[i % count]:
+            i += 1
+        self.current = i
+        self.size -= 1
+        return heapq.heappop(ring[i % count])
+
+
+# Binary heap with decrease-key on flat indices: at most one entry per cell, so there are no stale entries to push
+# or pop. position[node] is the node's slot in the heap, -1 when it is not queued. Pushing an entry for a queued node
+# replaces it if smaller and is ignored otherwise
+class IndexedHeap:
+    def __init__(self, size):
+        self.heap = []
+        self.position = array('i', [-1]) * size
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, entry):
+        heap, position = self.heap, self.position
+        i = position[entry[-1]]
+        if i < 0:
+            heap.append(entry)
+            i = len(heap) - 1
+        elif entry < heap[i]:
+            heap[i] = entry
+        else:
+            return
+        while i:                                            # Sift up
+            parent = (i - 1) >> 1
+            above = heap[parent]
+            if not entry < above:
+                break
+            heap[i] = above
+            position[above[-1]] = i
+            i = parent
+        heap[i] = entry
+        position[entry[-1]] = i
+
+    def pop(self):
+        heap, position = self.heap, self.position
+        last = heap.pop()
+        if not heap:
+            position[last[-1]] = -1
+            return last
+        top = heap[0]
+        position[top[-1]] = -1
+
+        size = len(heap)                                    # Sift the last entry down from the root
+        i = 0
+        child = 1
+        while child < size:
+            right = child + 1
+            if right < size and heap[right] < heap[child]:
+                child = right
+            below = heap[child]
+            if not below < last:
+                break
+            heap[i] = below
+            position[below[-1]] = i
+            i = child
+            child = 2 * i + 1
+        heap[i] = last
+        position[last[-1]] = i
+        return top
+
+
+QUEUES = ("heap", "bucket", "indexed")
+
+
+def makeQueue(kind, sg, heuristic = 0):
+    # (queue, push, pop) for a search on sg; heuristic is the weight on h (0 for Dijkstra, 1 for A*, epsilon for
+    # weighted A*). Bucket width is the cheapest step; a push can land at most one step plus the weighted
+    # heuristic's change over that step (no more than heuristic * the step) above the popped key
+    if kind == "heap":
+        return [], heapq.heappush, heapq.heappop
+    if kind == "bucket":
+        cheapest = min(sg.costs) * sg.minWeight
+        dearest = max(sg.costs) * sg.maxWeight
+        return BucketQueue(cheapest, (1 + heuristic) * dearest), BucketQueue.push, BucketQueue.pop
+    if kind == "indexed":
+        return IndexedHeap(sg.size), IndexedHeap.push, IndexedHeap.pop
+    raise ValueError(f"queue must be one of {list(QUEUES)}")
@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+from matplotlib import animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
+
+from core import freeMask
+
+
+# 0 = free, 1 = wall, 2 = visited, 3 = start, 4 = goal, 5 = path
+FREE, WALL, VISITED, START, GOAL, PATH = range(6)
+CMAP = ListedColormap(["white", "darkgrey", "blue", "red", "green", "cyan"])
+
+
+# Animates a search on one persistent AxesImage: each frame paints a whole batch of cells into the image array and
+# calls set_data, so the number of frames (and so the rendering time) is capped by maxFrames + pathFrames however
+# many cells the search visited
+class Renderer:
+    def __init__(self, grid, start, goal, maxFrames = 300, pathFrames = 60):
+        self.image = (~freeMask(grid)).astype(np.uint8)     # WALL where blocked, FREE elsewhere (cost maps too)
+        self.start = tuple(start)
+        self.goal = tuple(goal)
+        self.maxFrames = maxFrames
+        self.pathFrames = pathFrames
+
+    def frames(self, visited, path):
+        # Yields (image, title) per frame. visited: (k, 2) cells in expansion order, e.g. Trace.cells()
+        image = self.image.copy()
+        image[self.start] = START
+        image[self.goal] = GOAL
+        yield image, "Start and goal"
+
+        visited = np.asarray(visited, dtype=np.int64).reshape(-1, 2)
+        batch = max(1, math.ceil(len(visited) / self.maxFrames))
+        for first in range(0, len(visited), batch):
+            ys, xs = visited[first:first + batch].T
+            image[ys, xs] = VISITED
+            image[self.start] = START                       # Expansions include the endpoints; keep their colours
+            image[self.goal] = GOAL
+            yield image, f"Visited tiles ({min(first + batch, len(visited))}/{len(visited)})"
+
+        if path:
+            inner = np.asarray(path[1:-1], dtype=np.int64).reshape(-1, 2)
+            batch = max(1, math.ceil(len(inner) / self.pathFrames))
+            for first in range(0, len(inner), batch):
+                ys, xs = inner[first:first + batch].T
+                image[ys, xs] = PATH
+                yield image, f"Final Path ({len(path)})"
+            yield image, f"Final Path ({len(path)})"
+
+    def draw(self, axes):                                   # The one AxesImage every frame updates
+        axes.set_axis_off()
+        return axes.imshow(self.image, cmap = CMAP, vmin = 0, vmax = 5, interpolation = "nearest")
+
+    def show(self, visited, path, pause = 0.001):           # Interactive window (needs a GUI backend)
+        import matplotlib.pyplot as plt
+        plt.ion()
+        fig, axes = plt.subplots()
+        artist = self.draw(axes)
+        for image, title in self.frames(visited, path):
+            artist.set_data(image)
+            axes.set_title(title)
+            plt.pause(pause)
+        plt.ioff()
+        plt.show()
+
+    def save(self, visited, path, filename, fps = 30, dpi = 100):
+        # Offscreen: an Agg canvas that never touches pyplot, streamed frame by frame into an .mp4 (ffmpeg) or .gif (Pillow)
+        if filename.endswith(".gif"):
+            writer = animation.PillowWriter(fps = fps)
+        elif filename.endswith(".mp4"):
+            if not animation.FFMpegWriter.isAvailable():
+                raise RuntimeError("Saving .mp4 needs ffmpeg on the PATH; save a .gif instead")
+            writer = animation.FFMpegWriter(fps = fps)
+        else:
+            raise ValueError("filename must end in .mp4 or .gif")
+
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        axes = fig.add_subplot()
+        artist = self.draw(axes)
+        with writer.saving(fig, filename, dpi):
+            for image, title in self.frames(visited, path):
+                artist.set_data(image)
+                axes.set_title(title)
+                writer.grab_frame()
+        return filename
@@ -0,0 +1,250 @@
+import csv
+import os
+import signal
+import time
+import tracemalloc
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# Import algorithms
+from BFS import BFSGraph, BFSTree
+from DFS import DFSGraph, DFSTree, IDDFSTree
+from AStar import AStarGraph, AStarTree, ARAStarGraph, IDAStarTree
+from UCS import UCSGraph, UCSTree
+from JPS import JPSGraph
+from ThetaStar import ThetaStarGraph
+from env import setUpEnv, getMotion
+from core import pathCost, pathLength
+from mapfile import loadMap
+
+
+RESULTS_FILE = os.path.join("output", "results.csv")       # Default results path; output/ is git-ignored
+
+# Planner classes by display name, with any extra constructor arguments
+ALGORITHMS = {
+    "BFS Graph": (BFSGraph, {}),
+    "BFS Tree": (BFSTree, {}),
+    "DFS Graph": (DFSGraph, {}),
+    "DFS Tree": (DFSTree, {}),
+    "A* Graph": (AStarGraph, {}),
+    "A* Tree": (AStarTree, {}),
+    "Weighted A* Graph": (AStarGraph, {"epsilon": 1.5}),
+    "ALT A* Graph": (AStarGraph, {"landmarks": 8}),            # Every job is a fresh planner, so its time includes the landmark build
+    "ARA* Graph": (ARAStarGraph, {"epsilon": 3.0}),
+    "UCS Graph": (UCSGraph, {}),
+    "UCS Tree": (UCSTree, {}),
+    "JPS Graph": (JPSGraph, {}),
+    "Theta* Graph": (ThetaStarGraph, {}),
+    "IDDFS Tree": (IDDFSTree, {"table_size": 1 << 16}),
+    "IDA* Tree": (IDAStarTree, {"table_size": 1 << 16}),
+}
+
+# Search counters from the planners' instrumentation (see core.searchStats), blank for runs that did not finish
+COUNTERS = {"Pushes": "pushes", "Max Frontier": "max_frontier", "Stale Pops": "stale_pops", "Pruned": "pruned", "Re-expansions": "reexpansions"}
+
+FIELDS = ["Direction", "Algorithm", "Trial", "Start", "Goal", "Status", "Time (s)", "Nodes Visited", "Path Length", "Path Cost", "Peak Memory (B)"] + list(COUNTERS)
+
+
+def makePlanner(name, motion, instrument = False):
+    cls, kwargs = ALGORITHMS[name]
+    if instrument and cls not in (IDDFSTree, IDAStarTree, ARAStarGraph):   # The iterative planners always keep their stats
+        kwargs = dict(kwargs, instrument = True)
+    return cls(motion, **kwargs)
+
+
+# Worker side
+
+class JobTimeout(Exception):
+    pass
+
+
+def raiseTimeout(signum, frame):
+    raise JobTimeout()
+
+
+attached = OrderedDict()                                    # Shared grids this worker has mapped, most recent last
+
+
+def attachGrid(name, shape, dtype):
+    if name in attached:
+        attached.move_to_end(name)
+        return attached[name][1]
+    try:
+        shm = SharedMemory(name=name, track=False)          # Python 3.13+: the parent owns the segment
+    except TypeError:
+        shm = SharedMemory(name=name)                       # Older Pythons: workers share the parent's resource tracker
+    attached[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    while len(attached) > 4:
+        _, (old, _) = attached.popitem(last=False)
+        old.close()
+    return attached[name][1]
+
+
+def runJob(job):
+    grid = attachGrid(job["shm"], job["shape"], job["dtype"])
+    row = {
+        "Direction": f"{job['direction']}-Way",
+        "Algorithm": job["algorithm"],
+        "Trial": job["trial"],
+        "Start": job["start"],
+        "Goal": job["goal"],
+        "Peak Memory (B)": None,
+    }
+    row.update(dict.fromkeys(COUNTERS))
+    planner = makePlanner(job["algorithm"], getMotion(job["direction"]), instrument = True)
+
+    timeout = job["timeout"]
+    useAlarm = timeout and hasattr(signal, "SIGALRM")       # Per-job timeouts need SIGALRM (not available on Windows)
+    if useAlarm:
+        signal.signal(signal.SIGALRM, raiseTimeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    if job["memory"]:                                       # Python-level allocations only; slows the run down, so times are inflated
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    elapsed = None
+    try:
+        path, trace = planner.traversal(grid, job["start"], job["goal"], trace="counts")
+        elapsed = time.perf_counter() - start_time          # The planner only, not the bookkeeping below
+        if job["memory"]:
+            row["Peak Memory (B)"] = tracemalloc.get_traced_memory()[1]
+        row.update({"Status": "ok", "Path Length": pathLength(path), "Path Cost": pathCost(grid, path),
+                    "Nodes Visited": trace.expansions})
+        stats = dict(trace.stats(), stale_pops = 0, pruned = 0, reexpansions = 0)
+        if isinstance(planner, (IDDFSTree, IDAStarTree, ARAStarGraph)):    # Each iteration re-expands cells of the ones before it
+            stats["reexpansions"] = trace.expansions - trace.unique
+        stats.update(planner.stats)
+        row.update({column: stats[key] for column, key in COUNTERS.items()})
+    except JobTimeout:
+        row.update({"Status": "timeout", "Path Length": 0, "Path Cost": None, "Nodes Visited": 0})
+    except MemoryError:
+        row.update({"Status": "memory", "Path Length": 0, "Path Cost": None, "Nodes Visited": 0})
+    finally:
+        if elapsed is None:                                 # Timed out, out of memory, or the planner raised
+            elapsed = time.perf_counter() - start_time
+        if useAlarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if job["memory"]:                                   # Always stop, or every later job in this worker runs traced
+            if row["Peak Memory (B)"] is None:
+                row["Peak Memory (B)"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    row["Time (s)"] = elapsed
+    return row
+
+
+# Parent side
+
+class ResultWriter:                                         # Streams rows to CSV, or Parquet when the path ends in .parquet
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path is not None and path.endswith(".parquet")
+        self.file = None
+        self.writer = None
+        if path is None:
+            return
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.parquet:
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError as error:
+                raise ImportError("Writing .parquet results needs pyarrow; use a .csv path instead") from error
+            self.pa = pyarrow
+            self.schema = pyarrow.schema([(f, pyarrow.string() if f in ("Direction", "Algorithm", "Start", "Goal", "Status")
+                                           else pyarrow.float64()) for f in FIELDS])
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.file = open(path, "w", newline="")
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.writer is None:
+            return
+        if self.parquet:
+            record = {f: [str(row[f]) if f in ("Direction", "Algorithm", "Start", "Goal", "Status") else None if row[f] is None else float(row[f])] for f in FIELDS}
+            self.writer.write_table(self.pa.table(record, schema=self.schema))
+        else:
+            self.writer.writerow(row)
+            self.file.flush()                               # Rows are on disk as soon as each job finishes
+
+    def close(self):
+        if self.parquet and self.writer is not None:
+            self.writer.close()
+        if self.file is not None:
+            self.file.close()
+
+
+def mapName(width, height, prob, direction, trial, costs, distance=None):
+    spacing = "" if distance is None else f"-d{distance:g}"
+    return f"{width}x{height}-p{prob:g}{spacing}-{direction}way{'-costs' if costs else ''}-{trial}.gmap"
+
+
+def runBenchmark(width, height, prob, trials, directions=(4, 8), algorithms=None, workers=None, timeout=60,
+                 output=RESULTS_FILE, seed=None, trackMemory=False, costs=False, mapDir=None, distance=None,
+                 progress=print):
+    # Fans every (map, algorithm) job out over a process pool. Each map lives in one shared-memory block that all of
+    # its jobs read, and is released once they finish; at most a couple of maps per worker are alive at a time.
+    # costs is passed to setUpEnv: the maps become float32 cost maps (see env.costField). So is distance, the smallest
+    # Manhattan distance from start to goal (env.defaultDistance of the map size when None).
+    # With mapDir set, each map is saved there as a map file (see mapfile.py) and later runs replay it instead of
+    # generating it again; delete the directory to draw fresh maps
+    algorithms = list(algorithms or ALGORITHMS)
+    workers = workers or os.cpu_count()
+    seeds = np.random.SeedSequence(seed).spawn(len(directions) * trials)     # Independent, reproducible map streams
+    maps = [(direction, trial) for direction in directions for trial in range(trials)]
+    if mapDir:
+        os.makedirs(mapDir, exist_ok=True)
+
+    writer = ResultWriter(output)
+    results = []
+    live = {}                                               # shm name -> [SharedMemory, jobs outstanding]
+    pending = {}                                            # future -> shm name
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for number, (direction, trial) in enumerate(maps):
+                while len(live) >= 2 * workers:             # Bound how many maps sit in shared memory
+                    drain(wait(pending, return_when=FIRST_COMPLETED).done, pending, live, writer, results)
+
+                mapFile = os.path.join(mapDir, mapName(width, height, prob, direction, trial, costs, distance)) if mapDir else None
+                if mapFile and os.path.exists(mapFile):
+                    grid, start, goal = loadMap(mapFile)
+                else:
+                    grid, start, goal = setUpEnv(width, height, prob, seed=seeds[number], reachable=True,
+                                                 motion=getMotion(direction), costs=costs, save=mapFile,
+                                                 distance=distance)
+                shm = SharedMemory(create=True, size=grid.nbytes)
+                np.ndarray(grid.shape, dtype=grid.dtype, buffer=shm.buf)[:] = grid
+                live[shm.name] = [shm, len(algorithms)]
+                if progress:
+                    progress(f"{direction}-directional, trial {trial+1}/{trials}: Start {start}, Goal {goal}")
+
+                for name in algorithms:
+                    job = {"shm": shm.name, "shape": grid.shape, "dtype": grid.dtype.str, "direction": direction, "trial": trial,
+                           "algorithm": name, "start": start, "goal": goal, "timeout": timeout, "memory": trackMemory}
+                    pending[pool.submit(runJob, job)] = shm.name
+
+            while pending:
+                drain(wait(pending, return_when=FIRST_COMPLETED).done, pending, live, writer, results)
+    finally:
+        writer.close()
+        for shm, _ in live.values():
+            shm.close()
+            shm.unlink()
+    return results
+
+
+def drain(done, pending, live, writer, results):
+    for future in done:
+        name = pending.pop(future)
+        row = future.result()
+        writer.write(row)
+        results.append(row)
+        live[name][1] -= 1
+        if live[name][1] == 0:                              # Last job on this map: release it
+            shm, _ = live.pop(name)
+            shm.close()
+            shm.unlink()